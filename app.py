@@ -1,147 +1,218 @@
-from sqlalchemy import cast, String
-from sklearn.metrics.pairwise import cosine_distances
-from flask import Flask, render_template, request, flash, redirect, url_for, jsonify
-from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from database import db
-from models import User, Categoria, Subcategoria, Evento, Articulo, articulo_evento
-from sqlalchemy import desc, and_, distinct, func
-from flask_wtf.csrf import CSRFProtect
-from flask_caching import Cache
-from flask_apscheduler import APScheduler
+import hmac
 import logging
-import json
-from datetime import datetime, timedelta
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Initialize Flask app
-app = Flask(__name__)
-app.config.from_object('config.Config')
+from datetime import date, datetime
+from functools import wraps
+from urllib.parse import urlencode
 
-# Initialize extensions
-csrf = CSRFProtect(app)
-db.init_app(app)
-
-# Initialize cache with configuration
-cache = Cache()
-cache.init_app(app, config={
-    'CACHE_TYPE': 'simple',
-    'CACHE_DEFAULT_TIMEOUT': 300,  # 5 minutes default timeout
-    'CACHE_THRESHOLD': 500  # Maximum number of items to store in the cache
-})
-
-# Initialize APScheduler
-scheduler = APScheduler()
-scheduler.init_app(app)
-scheduler.start()
-from flask_caching import Cache
-from sklearn.manifold import TSNE
-from sklearn.cluster import KMeans
-import numpy as np
-import pandas as pd
-from statistics import mode
-from collections import Counter
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for
+from flask import Blueprint, Flask, current_app, flash, g, jsonify, redirect, render_template, request, send_from_directory, url_for
 from flask_caching import Cache
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_wtf.csrf import CSRFProtect
-from sqlalchemy import func, and_, desc, distinct
-from sklearn.manifold import TSNE
-from sklearn.cluster import KMeans
-from collections import Counter
-import numpy as np
-import json
-import logging
-from datetime import datetime, timedelta
-from config import Config
+from sqlalchemy import func, and_, desc
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
 from database import db
-from models import User, Articulo, Evento, Categoria, Subcategoria, Periodico, Periodista, articulo_evento
+from db_pool import configure_pool
+from models import User, Articulo, Evento, Categoria, Subcategoria, Periodico, articulo_evento
+from embeddings import add_articulo_embedding, row_embedding
+from article_details import ArticleDetailCache, current_versions
+from category_counts import NULL_DAY, category_counts, subcategory_counts, window_days
+from time_window import DEFAULT_TIME_FILTER, current_bucket, request_time_window, time_window
+from pagination import decode_cursor, encode_cursor, keyset_after, page_limit
+from conditional import articles_version, counts_version, is_not_modified, make_etag, posturas_version, set_validators
+from instrumentation import init_instrumentation
+from replicas import init_replicas, replica_reads
+from search import article_summaries, search_articles, semantic_search
+from vector_index import VectorIndex
+# Map artefacts come from the map pipeline (mapa/pipeline.py), run by map_builder.py.
+# scikit-learn is only imported inside the reducers and clustering, so workers
+# that just serve pages and artefacts never load it.
+from mapa.artifacts import get_artifact_store
+from mapa.builder import build_and_store, latest_or_build, new_build_processes, new_profiler, resolve_reducer
+from mapa.formats import FORMATS, gunzip_chunks
+from mapa.profiling import list_profile_names, load_summary
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your_secret_key_here'  # Change this in production
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
-
-
-app = Flask(__name__)
-app.config.from_object(Config)
-
-# Initialize cache with 1 hour timeout
-cache = Cache(config={
-    'CACHE_TYPE': 'simple',
-    'CACHE_DEFAULT_TIMEOUT': 3600  # 1 hour in seconds
-})
-cache.init_app(app)
-
-# Initialize scheduler
-scheduler = APScheduler()
-scheduler.init_app(app)
-scheduler.start()
-
-# Initialize extensions
-csrf = CSRFProtect(app)
-# Initialize cache
-cache = Cache(app, config={'CACHE_TYPE': 'simple', 'CACHE_DEFAULT_TIMEOUT': 60})
-db.init_app(app)
-cache = Cache(app, config={'CACHE_TYPE': 'simple', 'CACHE_DEFAULT_TIMEOUT': 60})
+# Extensions are created once here and bound to each app in create_app()
+# Shared cache, configured from Config.CACHE_* (see cache_backends.py)
+cache = Cache()
+csrf = CSRFProtect()
 
 # Initialize Flask-Login
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
-# Initialize cache on server start
-def initialize_map_cache():
-    """Initialize map data cache for all time filters."""
-    try:
-        logger.info("Initializing map data cache...")
-        time_filters = ['24h', '48h', '72h']
-        for filter in time_filters:
-            calculate_and_cache_map_data(filter)
-        logger.info("Map data cache initialized successfully")
-    except Exception as e:
-        logger.error(f"Error initializing cache: {str(e)}")
-
-# Initialize cache when app starts
-with app.app_context():
-    initialize_map_cache()
-
-@scheduler.task('interval', id='refresh_map_cache', hours=1)
-def refresh_map_cache():
-    """Refresh map data cache every hour."""
-    with app.app_context():
-        initialize_map_cache()
+login_manager.login_view = 'main.login'
+login_manager.login_message = 'Please log in to access this page.'
 
-@scheduler.task('interval', id='refresh_cache', hours=1)
-def refresh_cache():
+main = Blueprint('main', __name__)
+
+
+def create_app(config_object='config.Config'):
+    """Application factory: `gunicorn 'app:create_app()'`, main.py or `python app.py`."""
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+
+    configure_pool(app)
+    db.init_app(app)
+    cache.init_app(app)
+    csrf.init_app(app)
+    login_manager.init_app(app)
+    init_instrumentation(app)
+    init_replicas(app)
+
+    app.extensions['map_artifacts'] = get_artifact_store(app.config)
+    # CPU-bound stages of in-request map builds (see mapa/builder.py)
+    app.extensions['map_build_processes'] = new_build_processes(app.config)
+    # Memory-mapped nearest-neighbour index, built by map_builder.py (see vector_index.py)
+    app.extensions['vector_index'] = VectorIndex(app.config['VECTOR_INDEX_DIR'],
+                                                 nprobe=app.config['VECTOR_INDEX_NPROBE'])
+    app.extensions['article_details'] = ArticleDetailCache(app.config['ARTICLE_DETAIL_CACHE_SIZE'])
+
+    app.register_blueprint(main)
+    return app
+
+def _endpoint_cache_key(namespace, bucketed):
+    def make_cache_key(*args, **kwargs):
+        query = urlencode(sorted(request.args.items(multi=True)))
+        if bucketed:
+            return f'{namespace}:{current_bucket(current_app.config)}:{request.path}?{query}'
+        return f'{namespace}:{request.path}?{query}'
+    return make_cache_key
+
+def _is_success(rv):
+    status = rv[1] if isinstance(rv, tuple) else getattr(rv, 'status_code', 200)
+    return status == 200
+
+def cached_endpoint(namespace, timeout=None, bucketed=True):
+    """Cache a view's successful responses under '<namespace>:<bucket>:<path>?<sorted query>'.
+
+    Bucketed entries only live for one time bucket, matching the time window
+    the view queried; pass bucketed=False for views that don't depend on it.
+    """
+    def decorator(view):
+        cached_view = cache.cached(
+            timeout=timeout,
+            make_cache_key=_endpoint_cache_key(namespace, bucketed),
+            response_filter=_is_success
+        )(view)
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # The bucket length is only known once there is an app
+            if bucketed and timeout is None:
+                cached_view.cache_timeout = current_app.config['TIME_BUCKET_SECONDS']
+            return cached_view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def current_map_artifacts():
+    return current_app.extensions['map_artifacts']
+
+def current_vector_index():
+    return current_app.extensions['vector_index']
+
+def page_time_window():
+    """Time window for an HTML page, falling back to the default on a bad ?time_filter=."""
     try:
-        logger.info("Refreshing map data cache...")
-        time_filters = ['24h', '48h', '72h']
-        for filter in time_filters:
-            mapa_data(time_filter=filter)
-        logger.info("Map data cache refreshed successfully")
-    except Exception as e:
-        logger.error(f"Error refreshing cache: {str(e)}")
-login_manager.login_message = 'Please log in to access this page.'
+        return request_time_window()
+    except ValueError:
+        return time_window(DEFAULT_TIME_FILTER, current_app.config)
+
+def invalid_time_filter(e):
+    return jsonify({'error': 'invalid_time_filter', 'message': str(e)}), 400
+
+def conditional_endpoint(namespace, version):
+    """ETag/Last-Modified and Cache-Control for a view, answering 304 without running it.
+
+    version(**view_args) returns (version, last_modified) of the data the view
+    reads, or None (or raises ValueError) to skip validation, e.g. for
+    parameters the view itself rejects. Any other error computing it is
+    logged and the view runs without validators, so it still answers with
+    its own JSON error. See conditional.py.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                current = version(**kwargs)
+            except ValueError:
+                current = None
+            except Exception as e:
+                logger.error(f"Error computing the {namespace} version: {str(e)}", exc_info=True)
+                db.session.rollback()
+                current = None
+            if current is None:
+                return view(*args, **kwargs)
+
+            data_version, last_modified = current
+            etag = make_etag(namespace, data_version)
+            max_age = current_app.config['API_MAX_AGE'].get(namespace, 0)
+            if is_not_modified(etag, last_modified):
+                return set_validators(current_app.response_class(status=304), etag, last_modified, max_age)
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                set_validators(response, etag, last_modified, max_age)
+            return response
+        return wrapper
+    return decorator
+
+def bucket_memo(namespace, key, compute):
+    """compute(), memoized for the current time bucket like the responses."""
+    cache_key = f'{namespace}:{current_bucket(current_app.config)}:{key}'
+    current = cache.get(cache_key)
+    if current is None:
+        current = compute()
+        cache.set(cache_key, current, timeout=current_app.config['TIME_BUCKET_SECONDS'])
+    return current
+
+def data_version(start=None, end=None, key='all'):
+    """articles_version() of a window, memoized for the current time bucket."""
+    return bucket_memo('data_version', key, lambda: articles_version(start, end))
+
+def bucket_started(window):
+    return datetime.fromtimestamp(window.bucket * current_app.config['TIME_BUCKET_SECONDS'])
+
+def window_version(**kwargs):
+    window = request_time_window()
+    version, last_modified = data_version(window.start, window.end, window.time_filter)
+    # The window slides every bucket, and articles that age out of it don't
+    # touch updated_on: Last-Modified is never before the bucket started, so
+    # an If-Modified-Since from an earlier bucket gets the new window
+    started = bucket_started(window)
+    return version, max(last_modified, started) if last_modified else started
+
+def posturas_window_version(**kwargs):
+    """Version of the events /api/posturas reads; they carry no timestamp, so
+    Last-Modified is the start of the bucket the (cached) response belongs to."""
+    window = request_time_window()
+    first_day, last_day = window_days(window.start, window.end)
+    version = bucket_memo('posturas_version', window.time_filter,
+                          lambda: posturas_version(first_day, last_day))
+    return version, bucket_started(window)
+
+def counts_window_version(**kwargs):
+    """Version of the materialized counts /api/subcategories reads (refreshed by map_builder.py)."""
+    window = request_time_window()
+    first_day, last_day = window_days(window.start, window.end)
+    refreshed = bucket_memo('counts_version', 'all', counts_version)
+    return f'{first_day}:{last_day}:{refreshed}', bucket_started(window)
 
 @login_manager.user_loader
 def load_user(user_id):
     try:
-        return User.query.get(int(user_id))
+        # Right after /register or /login the replica may not have the user yet
+        with replica_reads(False):
+            return User.query.get(int(user_id))
     except Exception as e:
         logger.error(f"Error loading user: {str(e)}")
         return None
 
-@app.route('/register', methods=['GET', 'POST'])
+@main.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     if request.method == 'POST':
         nombre = request.form.get('nombre')
@@ -150,23 +221,23 @@ def register():
 
         if not nombre or not email or not password:
             flash('Please fill in all fields', 'error')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
 
         # Validate email format
         if not User.validate_email(email):
             flash('Invalid email format', 'error')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
 
         # Check if email already exists
         if User.query.filter_by(email=email).first():
             flash('Email already registered', 'error')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
 
         # Validate password
         is_valid, message = User.validate_password(password)
         if not is_valid:
             flash(message, 'error')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
 
         # Create new user
         try:
@@ -176,18 +247,18 @@ def register():
             db.session.commit()
 
             flash('Registration successful! Please log in.', 'success')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         except Exception as e:
             db.session.rollback()
             flash('Error creating user account', 'error')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
 
     return render_template('auth/register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@main.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
 
     if request.method == 'POST':
         email = request.form.get('email')
@@ -195,53 +266,61 @@ def login():
 
         if not email or not password:
             flash('Please fill in all fields', 'error')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
 
         user = User.query.filter_by(email=email).first()
         if user and user.check_password(password):
             login_user(user)
             flash('Logged in successfully!', 'success')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         else:
             flash('Invalid email or password', 'error')
 
     return render_template('auth/login.html')
 
-@app.route('/logout')
+@main.route('/logout')
 @login_required
 def logout():
     logout_user()
     flash('You have been logged out.', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/posturas')
+@main.route('/admin/cache-stats')
+@login_required
+def cache_stats():
+    """Hit/miss counters per cache namespace, summed over all workers."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Forbidden'}), 403
+    # Only the backends of cache_backends.py keep counters
+    stats = getattr(cache.cache, 'stats', None)
+    if stats is None:
+        return jsonify({'error': 'Cache stats not available',
+                        'cache_type': current_app.config['CACHE_TYPE']}), 404
+    return jsonify(stats())
+
+@main.route('/metrics')
+def metrics():
+    """Per-endpoint request metrics of all workers, in Prometheus text format.
+
+    Scrapers authenticate with `Authorization: Bearer <METRICS_TOKEN>`; admins
+    can also read it from the browser. Without METRICS_TOKEN only admins can.
+    """
+    token = current_app.config['METRICS_TOKEN']
+    sent = request.headers.get('Authorization', '')
+    scraper = bool(token) and hmac.compare_digest(sent.encode(), f'Bearer {token}'.encode())
+    if not scraper and not (current_user.is_authenticated and current_user.is_admin):
+        return jsonify({'error': 'Forbidden'}), 403
+    request_metrics = current_app.extensions['request_metrics']
+    return current_app.response_class(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@main.route('/posturas')
 def posturas():
     try:
-        time_filter = request.args.get('time_filter', '72h')
-        end_date = datetime.now()
-        start_date = end_date - timedelta(hours=int(time_filter[:-1]))
-
-        # Query categories with event counts
-        categories_query = db.session.query(
-            Categoria,
-            func.count(distinct(Evento.evento_id)).label('event_count')
-        ).outerjoin(
-            Subcategoria, Categoria.categoria_id == Subcategoria.categoria_id
-        ).outerjoin(
-            Evento, and_(
-                Evento.subcategoria_id == Subcategoria.subcategoria_id,
-                Evento.gpt_desinformacion.isnot(None)
-            )
-        ).group_by(
-            Categoria.categoria_id,
-            Categoria.nombre,
-            Categoria.descripcion
-        ).order_by(
-            desc('event_count'),
-            Categoria.nombre
-        )
+        window = page_time_window()
+        time_filter = window.time_filter
 
-        categories_result = categories_query.all()
+        # Categories with event counts in the window, from the materialized counts
+        categories_result = category_counts('postura_count', window.start, window.end)
 
         if not categories_result:
             logger.warning("No categories found in the database")
@@ -254,7 +333,7 @@ def posturas():
                     'nombre': 'All',
                     'descripcion': 'All categories'
                 },
-                'article_count': sum(cat.event_count or 0 for cat in categories_result)
+                'article_count': sum(cat.postura_count or 0 for cat in categories_result)
             }]
             # Then add the rest of the categories
             for category in categories_result:
@@ -264,7 +343,7 @@ def posturas():
                         'nombre': category.Categoria.nombre,
                         'descripcion': category.Categoria.descripcion
                     },
-                    'article_count': category.event_count or 0
+                    'article_count': category.postura_count or 0
                 })
             logger.info(f"Found {len(categories)} categories for posturas page")
 
@@ -277,23 +356,33 @@ def posturas():
         flash('Error loading categories. Please try again later.', 'error')
         return render_template('posturas.html',
                            categories=[],
-                           time_filter='72h')
+                           time_filter=DEFAULT_TIME_FILTER)
 
-@app.route('/api/posturas')
+@main.route('/api/posturas')
+@conditional_endpoint('api_posturas', posturas_window_version)
+@cached_endpoint('api_posturas')
 def get_posturas():
+    """Events of the window with posturas, newest first, paginated with ?cursor= and ?limit=."""
     try:
-        time_filter = request.args.get('time_filter', '72h')
+        try:
+            window = request_time_window()
+        except ValueError as e:
+            return invalid_time_filter(e)
         category_id = request.args.get('category_id', type=int)
         subcategory_id = request.args.get('subcategory_id', type=int)
+        limit = page_limit(request.args.get('limit', type=int),
+                           current_app.config['POSTURAS_PAGE_SIZE'], current_app.config['ARTICLES_MAX_PAGE_SIZE'])
 
-        end_date = datetime.now()
-        start_date = end_date - timedelta(hours=int(time_filter[:-1]))
-
-        # Modificar la query para incluir información del evento
+        # Posturas are parsed ahead of time into Evento.posturas (see posturas.py)
+        first_day, last_day = window_days(window.start, window.end)
         query = db.session.query(
-            Evento,
-            Subcategoria,
-            Categoria
+            Evento.evento_id,
+            Evento.titulo,
+            Evento.descripcion,
+            Evento.fecha_evento,
+            Evento.posturas,
+            Subcategoria.nombre.label('subcategoria_nombre'),
+            Categoria.nombre.label('categoria_nombre')
         ).join(
             Subcategoria,
             Evento.subcategoria_id == Subcategoria.subcategoria_id
@@ -301,82 +390,58 @@ def get_posturas():
             Categoria,
             Subcategoria.categoria_id == Categoria.categoria_id
         ).filter(
-            Evento.gpt_desinformacion.isnot(None)
+            Evento.posturas.isnot(None),
+            Evento.fecha_evento.between(first_day, last_day)
         )
 
-        # Aplicar filtros de categoría
+        # Aplicar filtros de categoría (0 is "All")
         if category_id:
-            if category_id != 0:  # Skip for "All" category
-                query = query.filter(Categoria.categoria_id == category_id)
-
+            query = query.filter(Categoria.categoria_id == category_id)
         if subcategory_id:
             query = query.filter(Evento.subcategoria_id == subcategory_id)
 
-        eventos = query.order_by(desc(Evento.fecha_evento)).all()
-
-        eventos_data = []
-        for evento, subcategoria, categoria in eventos:
+        sort_keys = [(Evento.fecha_evento, True), (Evento.evento_id, True)]
+        cursor = request.args.get('cursor')
+        if cursor:
             try:
-                if evento.gpt_desinformacion:
-                    json_str = evento.gpt_desinformacion.replace('\"', '"').replace('\\', '')
-                    if json_str.startswith('"') and json_str.endswith('"'):
-                        json_str = json_str[1:-1]
-
-                    posturas = json.loads(json_str)
-
-                    eventos_data.append({
-                        'evento_id': evento.evento_id,
-                        'titulo': evento.titulo,
-                        'descripcion': evento.descripcion,
-                        'fecha': evento.fecha_evento.strftime('%Y-%m-%d') if evento.fecha_evento else None,
-                        'categoria_nombre': categoria.nombre,
-                        'subcategoria_nombre': subcategoria.nombre,
-                        'posturas': posturas if isinstance(posturas, list) else [posturas]
-                    })
-            except Exception as e:
-                logger.error(f"Error processing evento {evento.evento_id}: {str(e)}")
-                continue
+                day, evento_id = decode_cursor(cursor, 2)
+                query = query.filter(keyset_after(sort_keys, [date.fromisoformat(day), int(evento_id)]))
+            except (TypeError, ValueError):
+                return jsonify({'error': 'invalid_cursor', 'message': 'Invalid cursor'}), 400
 
-        return jsonify(eventos_data)
+        eventos = query.order_by(desc(Evento.fecha_evento), desc(Evento.evento_id)).limit(limit + 1).all()
+        next_cursor = None
+        if len(eventos) > limit:
+            eventos = eventos[:limit]
+            next_cursor = encode_cursor([eventos[-1].fecha_evento.isoformat(), eventos[-1].evento_id])
+
+        return jsonify({
+            'eventos': [{
+                'evento_id': evento.evento_id,
+                'titulo': evento.titulo,
+                'descripcion': evento.descripcion,
+                'fecha': evento.fecha_evento.strftime('%Y-%m-%d'),
+                'categoria_nombre': evento.categoria_nombre,
+                'subcategoria_nombre': evento.subcategoria_nombre,
+                'posturas': evento.posturas
+            } for evento in eventos],
+            'next_cursor': next_cursor
+        })
 
     except Exception as e:
-        logger.error(f"Error fetching posturas: {str(e)}")
-        return jsonify([])  # Return empty list instead of 500 error
+        logger.error(f"Error fetching posturas: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Internal server error'}), 500
 
-@app.route('/')
+@main.route('/')
 def index():
     try:
-        time_filter = request.args.get('time_filter', '72h')
-        end_date = datetime.now()
-        start_date = end_date - timedelta(hours=int(time_filter[:-1]))
+        window = page_time_window()
+        time_filter = window.time_filter
 
         logger.info(f"Loading index page with time_filter: {time_filter}")
 
-        # Query categories with article counts using correct schema references
-        categories_query = db.session.query(
-            Categoria,
-            func.count(distinct(Articulo.articulo_id)).label('article_count')
-        ).outerjoin(
-            Subcategoria, Categoria.categoria_id == Subcategoria.categoria_id
-        ).outerjoin(
-            Evento, Evento.subcategoria_id == Subcategoria.subcategoria_id
-        ).outerjoin(
-            articulo_evento, articulo_evento.c.evento_id == Evento.evento_id
-        ).outerjoin(
-            Articulo, and_(
-                Articulo.articulo_id == articulo_evento.c.articulo_id,
-                Articulo.fecha_publicacion.between(start_date, end_date)
-            )
-        ).group_by(
-            Categoria.categoria_id,
-            Categoria.nombre,
-            Categoria.descripcion
-        ).order_by(
-            desc('article_count'),
-            Categoria.nombre
-        )
-
-        categories_result = categories_query.all()
+        # Categories with article counts, from the materialized counts
+        categories_result = category_counts('article_count', window.start, window.end)
 
         if not categories_result:
             logger.warning("No categories found in the database")
@@ -417,63 +482,27 @@ def index():
                            categories=[],
                            initial_data={'categories': []},
                            selected_date=datetime.now().date(),
-                           time_filter=time_filter)
+                           time_filter=DEFAULT_TIME_FILTER)
 
 
 
 
-@app.route('/api/subcategories')
+@main.route('/api/subcategories')
+@conditional_endpoint('api_subcategories', counts_window_version)
+@cached_endpoint('api_subcategories')
 def get_subcategories():
     try:
         category_id = request.args.get('category_id', type=int)
-        time_filter = request.args.get('time_filter', '72h')
+        try:
+            window = request_time_window()
+        except ValueError as e:
+            return invalid_time_filter(e)
 
         if category_id is None:  # Change condition to check for None instead
             return jsonify({'error': 'Category ID is required'}), 400
 
-        end_date = datetime.now()
-        start_date = end_date - timedelta(hours=int(time_filter[:-1]))
-
-        # For "All" category, return all subcategories
-        if category_id == 0:
-            subcategories = db.session.query(
-                Subcategoria.subcategoria_id.label('id'),
-                Subcategoria.nombre,
-                func.count(distinct(Articulo.articulo_id)).label('article_count')
-            ).outerjoin(
-                Evento, Evento.subcategoria_id == Subcategoria.subcategoria_id
-            ).outerjoin(
-                articulo_evento, articulo_evento.c.evento_id == Evento.evento_id
-            ).outerjoin(
-                Articulo, and_(
-                    Articulo.articulo_id == articulo_evento.c.articulo_id,
-                    Articulo.fecha_publicacion.between(start_date, end_date)
-                )
-            ).group_by(
-                Subcategoria.subcategoria_id,
-                Subcategoria.nombre
-            ).order_by(desc('article_count')).all()
-        else:
-            # Existing query for specific category
-            subcategories = db.session.query(
-                Subcategoria.subcategoria_id.label('id'),
-                Subcategoria.nombre,
-                func.count(distinct(Articulo.articulo_id)).label('article_count')
-            ).outerjoin(
-                Evento, Evento.subcategoria_id == Subcategoria.subcategoria_id
-            ).outerjoin(
-                articulo_evento, articulo_evento.c.evento_id == Evento.evento_id
-            ).outerjoin(
-                Articulo, and_(
-                    Articulo.articulo_id == articulo_evento.c.articulo_id,
-                    Articulo.fecha_publicacion.between(start_date, end_date)
-                )
-            ).filter(
-                Subcategoria.categoria_id == category_id
-            ).group_by(
-                Subcategoria.subcategoria_id,
-                Subcategoria.nombre
-            ).order_by(desc('article_count')).all()
+        # For "All" category (0), return all subcategories
+        subcategories = subcategory_counts(window.start, window.end, category_id or None)
 
         return jsonify([{
             'id': s.id,
@@ -485,27 +514,15 @@ def get_subcategories():
         logger.error(f"Error fetching subcategories: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
-# Required imports for t-SNE visualization
-import numpy as np
-from sklearn.manifold import TSNE
-from sklearn.cluster import KMeans
-from collections import Counter
-import plotly.express as px
-import json
-import ast
-from statistics import mode
-
-@app.route('/mapa')
+@main.route('/mapa')
 def mapa():
     """Render the map visualization page."""
     try:
-        time_filter = request.args.get('time_filter', '72h')
-        end_date = datetime.now()
-        start_date = end_date - timedelta(hours=int(time_filter[:-1]))
+        window = page_time_window()
 
         # Count articles with valid embeddings
         articles_count = db.session.query(Articulo).filter(
-            Articulo.fecha_publicacion.between(start_date, end_date),
+            Articulo.fecha_publicacion.between(window.start, window.end),
             Articulo.embeddings.isnot(None)
         ).count()
 
@@ -514,591 +531,101 @@ def mapa():
         logger.error(f"Error in mapa route: {str(e)}")
         return render_template('mapa.html', articles_count=0)
 
-from flask import jsonify, request
-from datetime import datetime, timedelta
-import numpy as np
-@cache.memoize(timeout=300)  # Cache for 5 minutes
-def calculate_map_data(time_filter):
-    """Calculate map visualization data for the given time filter."""
+def latest_map_artifact(time_filter, reducer, fmt='json'):
+    """Latest artefact for the window, building it here only if none exists yet."""
+    if not current_app.config['MAP_BUILD_ON_MISS']:
+        return current_map_artifacts().latest(time_filter, reducer, fmt=fmt)
+    return latest_or_build(current_map_artifacts(), time_filter, reducer, current_app.config, fmt=fmt,
+                           processes=current_app.extensions['map_build_processes'])
+
+def map_version(**kwargs):
+    """Version of the artefact /api/mapa-data would send; None if it has to be built first."""
+    return current_map_artifacts().latest_version(request.args.get('time_filter', DEFAULT_TIME_FILTER),
+                                        resolve_reducer(current_app.config, request.args.get('reducer')))
+
+def map_artifact_response(artifact, fmt='json'):
+    """Send the stored gzip payload as-is, or stream it decompressed for clients without gzip."""
+    mimetype = FORMATS[fmt][1]
+    if 'gzip' in request.accept_encodings:
+        response = current_app.response_class(artifact['payload'], mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = current_app.response_class(gunzip_chunks(artifact['payload']), mimetype=mimetype)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['X-Map-Version'] = str(artifact['version'])
+    return response
+
+@main.route('/admin/map-profiles', methods=['GET', 'POST'])
+# JSON endpoint without a form to carry a CSRF token; still admin-only
+@csrf.exempt
+@login_required
+def map_profiles():
+    """List the saved map build profiles, or (POST) run one profiled build of ?time_filter=&reducer=."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Forbidden'}), 403
+    profile_dir = current_app.config['MAP_PROFILE_DIR']
+    if request.method == 'GET':
+        return jsonify({'profiles': [load_summary(profile_dir, name) for name in list_profile_names(profile_dir)]})
+
+    time_filter = request.args.get('time_filter', DEFAULT_TIME_FILTER)
+    if time_filter not in current_app.config['MAP_TIME_FILTERS']:
+        return jsonify({'error': 'invalid_time_filter', 'message': f"Unknown time filter: {time_filter}"}), 400
     try:
-        logger.info(f"Calculating map data for time filter: {time_filter}")
-        end_date = datetime.now()
-        start_date = end_date - timedelta(hours=int(time_filter[:-1]))
-
-        # Query articles with embeddings
-        articles = db.session.query(
-            Articulo.articulo_id,
-            Articulo.titular,
-            Articulo.gpt_resumen,
-            Articulo.palabras_clave_embeddings,
-            Articulo.gpt_palabras_clave,
-            Categoria.nombre.label('categoria'),
-            Subcategoria.nombre.label('subcategoria'),
-            Periodico.nombre.label('periodico')
-        ).join(
-            articulo_evento, Articulo.articulo_id == articulo_evento.c.articulo_id
-        ).join(
-            Evento, Evento.evento_id == articulo_evento.c.evento_id
-        ).join(
-            Subcategoria, Evento.subcategoria_id == Subcategoria.subcategoria_id
-        ).join(
-            Categoria, Subcategoria.categoria_id == Categoria.categoria_id
-        ).join(
-            Periodico, Articulo.periodico_id == Periodico.periodico_id
-        ).filter(
-            Articulo.fecha_publicacion.between(start_date, end_date),
-            Articulo.palabras_clave_embeddings.isnot(None)
-        ).all()
-
-        if not articles:
-            logger.warning("No articles found with valid embeddings")
-            return {"error": "no_articles", "message": "No hay suficientes artículos para generar la visualización"}
-
-        # Process embeddings and create visualization data
-        embeddings_list = []
-        articles_data = []
-
-        for article in articles:
-            try:
-                embedding = np.fromstring(article.palabras_clave_embeddings.strip('{}'), sep=',')
-                if len(embedding) > 0:
-                    embeddings_list.append(embedding)
-                    articles_data.append({
-                        'id': article.articulo_id,
-                        'titular': article.titular,
-                        'categoria': article.categoria,
-                        'subcategoria': article.subcategoria,
-                        'periodico': article.periodico,
-                        'keywords': article.gpt_palabras_clave,
-                        'resumen': article.gpt_resumen
-                    })
-            except Exception as e:
-                logger.error(f"Error processing embedding for article {article.articulo_id}: {str(e)}")
-                continue
-
-        if not embeddings_list:
-            logger.warning("No valid embeddings found")
-            return {"error": "no_embeddings", "message": "No hay suficientes embeddings válidos para generar la visualización"}
-
-        # Convert to numpy array and perform t-SNE
-        embeddings_array = np.vstack(embeddings_list)
-        tsne = TSNE(n_components=2, random_state=42)
-        embeddings_2d = tsne.fit_transform(embeddings_array)
-
-        # Perform clustering
-        n_clusters = min(16, len(embeddings_list))
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        clusters = kmeans.fit_predict(embeddings_array)
-
-        # Calculate cluster centers and keywords
-        cluster_data = []
-        for i in range(n_clusters):
-            cluster_indices = np.where(clusters == i)[0]
-            cluster_center = np.mean(embeddings_2d[cluster_indices], axis=0)
-
-            # Get most common keywords for cluster
-            cluster_keywords = []
-            for idx in cluster_indices:
-                if articles_data[idx]['keywords']:
-                    try:
-                        keywords = articles_data[idx]['keywords'].split(',')
-                        cluster_keywords.extend(keywords)
-                    except:
-                        continue
-
-            if cluster_keywords:
-                most_common = Counter(cluster_keywords).most_common(1)[0][0]
-                cluster_data.append({
-                    'center': cluster_center.tolist(),
-                    'keyword': most_common
-                })
-
-        # Prepare points data
-        points = [
-            {
-                'id': article['id'],
-                'coordinates': embeddings_2d[i].tolist(),
-                'titular': article['titular'],
-                'categoria': article['categoria'],
-                'subcategoria': article['subcategoria'],
-                'periodico': article['periodico'],
-                'keywords': article['keywords'],
-                'resumen': article['resumen']
-            }
-            for i, article in enumerate(articles_data)
-        ]
-
-        return {
-            'points': points,
-            'clusters': cluster_data
-        }
-
-    except Exception as e:
-        logger.error(f"Error calculating map data: {str(e)}")
-        return {"error": "calculation_error", "message": str(e)}
-
-    logger.info(f"Calculating map data for time filter: {time_filter}")
-    logger.info(f"Date range: {start_date} to {end_date}")
-
-    # Query articles with embeddings
-    articles = db.session.query(
-        Articulo.articulo_id,
-        Articulo.titular,
-        Articulo.gpt_resumen,
-        Articulo.palabras_clave_embeddings,
-        Articulo.gpt_palabras_clave,
-        Periodico.nombre.label('periodico'),
-        Categoria.nombre.label('categoria'),
-        Subcategoria.nombre.label('subcategoria')
-    ).join(
-        Periodico, Articulo.periodico_id == Periodico.periodico_id
-    ).join(
-        articulo_evento, Articulo.articulo_id == articulo_evento.c.articulo_id
-    ).join(
-        Evento, articulo_evento.c.evento_id == Evento.evento_id
-    ).join(
-        Subcategoria, Evento.subcategoria_id == Subcategoria.subcategoria_id
-    ).join(
-        Categoria, Subcategoria.categoria_id == Categoria.categoria_id
-    ).filter(
-        Articulo.fecha_publicacion.between(start_date, end_date),
-        Articulo.palabras_clave_embeddings.isnot(None)
-    ).all()
-
-    if not articles:
-        return {'error': 'no_articles', 'message': 'No articles found for the specified time period'}
-
-    # Process embeddings
-    embeddings_list = []
-    articles_data = []
-
-    for article in articles:
-        try:
-            if article.palabras_clave_embeddings:
-                embedding = np.fromstring(article.palabras_clave_embeddings.strip('{}'), sep=',')
-                if len(embedding) > 0:
-                    embeddings_list.append(embedding)
-                    articles_data.append({
-                        'id': article.articulo_id,
-                        'titular': article.titular,
-                        'periodico': article.periodico,
-                        'categoria': article.categoria,
-                        'subcategoria': article.subcategoria,
-                        'keywords': article.gpt_palabras_clave,
-                        'resumen': article.gpt_resumen
-                    })
-        except Exception as e:
-            logger.error(f"Error processing article {article.articulo_id}: {str(e)}")
-            continue
-
-    if not embeddings_list:
-        return {'error': 'no_embeddings', 'message': 'No valid embeddings found'}
-
-    # Convert to numpy array and calculate t-SNE
-    embeddings_array = np.vstack(embeddings_list)
-    tsne = TSNE(n_components=2, random_state=42)
-    embeddings_2d = tsne.fit_transform(embeddings_array)
-
-    # Perform clustering
-    kmeans = KMeans(n_clusters=16, random_state=42)
-    clusters = kmeans.fit_predict(embeddings_array)
-
-    # Calculate cluster centers and keywords
-    cluster_info = []
-    for i in range(16):
-        cluster_mask = clusters == i
-        if np.any(cluster_mask):
-            center = embeddings_2d[cluster_mask].mean(axis=0)
-            # Get most common keywords in cluster
-            cluster_keywords = [art['keywords'] for j, art in enumerate(articles_data) if clusters[j] == i]
-            keywords = ' '.join(filter(None, cluster_keywords))
-            if keywords:
-                cluster_info.append({
-                    'center': center.tolist(),
-                    'keyword': keywords[:50] + '...' if len(keywords) > 50 else keywords
-                })
-
-    # Prepare points data
-    points = [
-        {
-            'id': article['id'],
-            'coordinates': embeddings_2d[i].tolist(),
-            'titular': article['titular'],
-            'categoria': article['categoria'],
-            'subcategoria': article['subcategoria'],
-            'periodico': article['periodico'],
-            'keywords': article['keywords'],
-            'resumen': article['resumen'],
-            'cluster': int(clusters[i])
-        }
-        for i, article in enumerate(articles_data)
-    ]
-
-    return {
-        'points': points,
-        'clusters': cluster_info
-    }
-
-def calculate_and_cache_map_data(time_filter):
-    """Calculate and cache map data for a specific time filter."""
+        reducer = resolve_reducer(current_app.config, request.args.get('reducer'))
+    except ValueError as e:
+        return jsonify({'error': 'invalid_reducer', 'message': str(e)}), 400
+    profiler = new_profiler(time_filter, reducer, current_app.config)
+    build_and_store(current_map_artifacts(), time_filter, reducer, current_app.config, profiler=profiler)
+    return jsonify(load_summary(profile_dir, profiler.name))
+
+@main.route('/admin/map-profiles/<name>.prof')
+@login_required
+def download_map_profile(name):
+    """pstats dump of a map build profile."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Forbidden'}), 403
     try:
-        data = calculate_map_data(time_filter)
-        if 'error' not in data:
-            cache.set(f'mapa_data_{time_filter}', data)
-            logger.info(f"Successfully cached map data for time filter: {time_filter}")
-        return data
-    except Exception as e:
-        logger.error(f"Error calculating map data for {time_filter}: {str(e)}")
-        return {'error': 'calculation_error', 'message': str(e)}
+        load_summary(current_app.config['MAP_PROFILE_DIR'], name)
+    except (ValueError, FileNotFoundError):
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_from_directory(current_app.config['MAP_PROFILE_DIR'], f'{name}.prof', as_attachment=True)
 
-@app.route('/api/mapa-data')
-@cache.cached(timeout=3600, query_string=True)  # Cache for 1 hour
+@main.route('/api/mapa-data')
+@conditional_endpoint('api_mapa_data', map_version)
 def mapa_data():
-    """API endpoint for map visualization data with caching."""
+    """API endpoint for map visualization data, served from the precomputed artefacts."""
     try:
-        time_filter = request.args.get('time_filter', '72h')
-        cached_data = cache.get(f'mapa_data_{time_filter}')
-
-        if cached_data is not None:
-            logger.info(f"Cache hit for time filter: {time_filter}")
-            return jsonify(cached_data)
-
-        # If cache miss, calculate data and cache it
-        logger.info(f"Cache miss for time filter: {time_filter}")
-        data = calculate_and_cache_map_data(time_filter)
-        return jsonify(data)
+        time_filter = request.args.get('time_filter', DEFAULT_TIME_FILTER)
+        if time_filter not in current_app.config['MAP_TIME_FILTERS']:
+            return jsonify({'error': 'invalid_time_filter', 'message': f"Unknown time filter: {time_filter}"}), 400
+        try:
+            reducer = resolve_reducer(current_app.config, request.args.get('reducer'))
+        except ValueError as e:
+            return jsonify({'error': 'invalid_reducer', 'message': str(e)}), 400
+        fmt = request.args.get('format', 'json')
+        if fmt not in FORMATS:
+            return jsonify({'error': 'invalid_format', 'message': f"Unknown format: {fmt}"}), 400
+
+        artifact = latest_map_artifact(time_filter, reducer, fmt)
+        if artifact is None:
+            return jsonify({'error': 'not_ready', 'message': 'El mapa todavía se está generando'}), 503
+        return map_artifact_response(artifact, fmt)
     except Exception as e:
         logger.error(f"Error in mapa_data endpoint: {str(e)}")
         return jsonify({'error': 'server_error', 'message': 'Internal server error'}), 500
 
-        # Query articles with embeddings
-        articles = db.session.query(
-            Articulo.articulo_id,
-            Articulo.titular,
-            Articulo.palabras_clave_embeddings,
-            Articulo.gpt_palabras_clave,
-            Articulo.gpt_resumen,
-            Categoria.nombre.label('categoria'),
-            Subcategoria.nombre.label('subcategoria'),
-            Periodico.nombre.label('periodico')
-        ).join(
-            Periodico
-        ).outerjoin(
-            articulo_evento
-        ).outerjoin(
-            Evento
-        ).outerjoin(
-            Subcategoria
-        ).outerjoin(
-            Categoria
-        ).filter(
-            Articulo.updated_on.between(start_date, end_date),
-            Articulo.palabras_clave_embeddings.isnot(None),
-            Articulo.palabras_clave_embeddings != ''
-        ).all()
-
-        logger.info(f"Total de artículos encontrados: {len(articles)}")
-
-        # Convert to DataFrame for processing
-        df = pd.DataFrame([{
-            'id': article.articulo_id,
-            'titular': article.titular,
-            'palabras_clave_embeddings': article.palabras_clave_embeddings,
-            'keywords': article.gpt_palabras_clave,
-            'resumen': article.gpt_resumen,
-            'categoria': article.categoria or 'Sin categoría',
-            'subcategoria': article.subcategoria,
-            'periodico': article.periodico
-        } for article in articles])
-
-        # Process embeddings
-        embeddings = df['palabras_clave_embeddings'].apply(safe_parse_embeddings)
-        embeddings = embeddings[embeddings.apply(lambda x: len(x) > 0)]
-
-        if embeddings.empty:
-            return jsonify({
-                'error': 'no_articles',
-                'message': 'No hay suficientes artículos con embeddings válidos.'
-            })
-
-        # Log processing info
-        logger.info(f"Artículos con embeddings: {len(embeddings)}")
-        if not embeddings.empty:
-            logger.info(f"Muestra de embedding: {embeddings.iloc[0][:5]}")
-
-        # Convert embeddings to numpy array and filter invalid ones
-        embeddings_array = np.vstack(embeddings.to_numpy())
-
-        # Calculate cosine distances
-        distance_matrix = cosine_distances(embeddings_array)
-
-        # Use t-SNE with proper parameters
-        tsne = TSNE(
-            n_components=2, 
-            random_state=42,
-            perplexity=min(30, len(distance_matrix) - 1)
-        )
-        embeddings_2d = tsne.fit_transform(distance_matrix)
-
-        # Keep only the articles with valid embeddings
-        valid_indices = embeddings.index
-        articles_data = df.loc[valid_indices].to_dict('records')
-
-        # Perform clustering for keywords
-        n_clusters = min(16, len(embeddings_array))
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        clusters = kmeans.fit_predict(embeddings_array)
-
-        # Get cluster centers and most common keywords
-        cluster_info = []
-        for i in range(n_clusters):
-            cluster_mask = clusters == i
-            if np.any(cluster_mask):
-                center = embeddings_2d[cluster_mask].mean(axis=0)
-                cluster_articles = [art for j, art in enumerate(articles_data) if clusters[j] == i]
-
-                # Get keywords for cluster
-                all_keywords = []
-                for art in cluster_articles:
-                    if art['keywords']:
-                        try:
-                            keywords = art['keywords'].split(',')
-                            all_keywords.extend([k.strip() for k in keywords if k.strip()])
-                        except:
-                            continue
-
-                if all_keywords:
-                    most_common = Counter(all_keywords).most_common(1)[0][0]
-                else:
-                    most_common = f"Cluster {i+1}"
-
-                cluster_info.append({
-                    'center': center.tolist(),
-                    'keyword': most_common
-                })
-
-        # Prepare points data
-        points = [
-            {
-                'id': article['id'],
-                'coordinates': embeddings_2d[i].tolist(),
-                'titular': article['titular'],
-                'periodico': article['periodico'],
-                'categoria': article['categoria'],
-                'subcategoria': article['subcategoria'],
-                'keywords': article['keywords'],
-                'resumen': article['resumen'],
-                'cluster': int(clusters[i])
-            }
-            for i, article in enumerate(articles_data)
-        ]
-
-        logger.info(f"Procesamiento completado: {len(points)} válidos, {len(articles) - len(points)} errores")
-
-        return jsonify({
-            'points': points,
-            'clusters': cluster_info
-        })
-
-    except Exception as e:
-        logger.error(f"Error in mapa_data: {str(e)}", exc_info=True)
-        return jsonify({
-            'error': 'processing_error',
-            'message': 'Error procesando los datos para la visualización.'
-        }), 500
-import ast
-import json
-from collections import Counter
-from sklearn.manifold import TSNE
-from sklearn.cluster import KMeans
-from sqlalchemy.orm import joinedload
-from statistics import mode
-from sqlalchemy import func
-
-# Removed duplicate endpoint implementation
-import logging
-
-def safe_parse_embeddings(x):
-    if x is None or not isinstance(x, str):
-        return np.array([])
-    try:
-        return np.fromstring(x.strip('{}'), sep=',')
-    except Exception:
-        return np.array([])
-
-@app.route('/api/mapa-data')
-def get_mapa_data():
-    """Generate t-SNE visualization data from article embeddings using cosine distances."""
-    try:
-        # Parse time filter
-        time_filter = request.args.get('time_filter', '72h')
-        end_date = datetime.now()
-        start_date = end_date - timedelta(hours=int(time_filter[:-1]))
-
-        logger.info(f"Buscando artículos entre {start_date} y {end_date}")
-
-        # Query base para artículos con embeddings
-        articles_query = db.session.query(
-            Articulo.articulo_id,
-            Articulo.titular,
-            Articulo.palabras_clave_embeddings,  # Cambiar embeddings por palabras_clave_embeddings
-            Articulo.gpt_palabras_clave,
-            Articulo.gpt_resumen,
-            Periodico.nombre.label('periodico_nombre'),
-            Categoria.nombre.label('categoria_nombre'),
-            Subcategoria.nombre.label('subcategoria_nombre')
-        ).join(
-            Periodico,
-            Articulo.periodico_id == Periodico.periodico_id
-        ).outerjoin(
-            articulo_evento,
-            Articulo.articulo_id == articulo_evento.c.articulo_id
-        ).outerjoin(
-            Evento,
-            articulo_evento.c.evento_id == Evento.evento_id
-        ).outerjoin(
-            Subcategoria,
-            Evento.subcategoria_id == Subcategoria.subcategoria_id
-        ).outerjoin(
-            Categoria,
-            Subcategoria.categoria_id == Categoria.categoria_id
-        ).filter(
-            Articulo.updated_on.between(start_date, end_date)
-        )
-
-        # Log total de artículos antes de filtrar por embeddings
-        total_articles = articles_query.count()
-        logger.info(f"Total de artículos encontrados: {total_articles}")
-
-        # Agregar filtro de embeddings
-        articles = articles_query.filter(
-            Articulo.palabras_clave_embeddings.isnot(None),
-            Articulo.palabras_clave_embeddings != '',
-            func.length(Articulo.palabras_clave_embeddings) > 2  # Asegurar que no sea '[]' o '{}'
-        ).all()
-
-        logger.info(f"Artículos con embeddings: {len(articles)}")
-
-        # Log de muestra de embeddings
-        if articles:
-            sample_embedding = articles[0].palabras_clave_embeddings
-            logger.info(f"Muestra de embedding: {sample_embedding[:100]}")
-
-        if not articles:
-            logging.warning("No articles found with valid embeddings")
-            return jsonify({
-                'error': 'no_articles',
-                'message': 'No se encontraron artículos con embeddings válidos para el período seleccionado'
-            })
-
-        embeddings_list = []
-        articles_data = []
-        valid_count = 0
-        error_count = 0
-
-        for article in articles:
-            try:
-                embedding = parse_embedding(article.palabras_clave_embeddings)
-                if embedding is not None and embedding.size > 0:
-                    embeddings_list.append(embedding)
-                    articles_data.append({
-                        'id': article.articulo_id,
-                        'titular': article.titular,
-                        'periodico': article.periodico_nombre,
-                        'categoria': article.categoria_nombre,
-                        'subcategoria': article.subcategoria_nombre,
-                        'keywords': article.gpt_palabras_clave,
-                        'resumen': article.gpt_resumen
-                    })
-                    valid_count += 1
-                else:
-                    error_count += 1
-            except Exception as e:
-                error_count += 1
-                logger.error(f"Error procesando artículo {article.articulo_id}: {str(e)}")
-
-        logger.info(f"Procesamiento completado: {valid_count} válidos, {error_count} errores")
-
-        if not embeddings_list:
-            return jsonify({
-                'error': 'no_articles',
-                'message': 'No se encontraron artículos con embeddings válidos'
-            })
-
-        # Pad or trim embeddings to a consistent size
-        embedding_lengths = [len(emb) for emb in embeddings_list]
-        target_length = mode(embedding_lengths)
-
-        def pad_embedding(embedding, target_length):
-            if len(embedding) < target_length:
-                return np.pad(embedding, (0, target_length - len(embedding)), mode='constant')
-            return embedding[:target_length]
-
-        # Convert embeddings to numpy array
-        embeddings_array = np.vstack([pad_embedding(emb, target_length) for emb in embeddings_list])
-
-        # Calculate cosine distances
-        distance_matrix = cosine_distances(embeddings_array)
-
-        # Apply t-SNE on the distance matrix
-        tsne = TSNE(n_components=2, random_state=42, perplexity=min(30, len(distance_matrix) - 1))
-        embeddings_2d = tsne.fit_transform(distance_matrix)
-
-        # Create DataFrame for visualization
-        plot_df = pd.DataFrame(embeddings_2d, columns=['x', 'y'])
-        plot_df['categoria'] = [art['categoria'] for art in articles_data]
-
-        # Calculate cluster centers and keywords
-        n_clusters = min(16, len(embeddings_array))
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        cluster_labels = kmeans.fit_predict(embeddings_2d)
-
-        # Get keywords for each cluster
-        clusters = []
-        for i in range(n_clusters):
-            cluster_points = [articles_data[j]['keywords'] for j in range(len(articles_data)) if cluster_labels[j] == i]
-            if cluster_points:
-                # Join all keywords and get most common
-                all_keywords = ' '.join(filter(None, cluster_points)).split(',')
-                if all_keywords:
-                    most_common = Counter(all_keywords).most_common(1)[0][0].strip()
-                    clusters.append({
-                        'center': kmeans.cluster_centers_[i].tolist(),
-                        'keyword': most_common
-                    })
-
-        # Prepare response with simplified structure
-        points = [
-            {
-                'id': article['id'],
-                'coordinates': embeddings_2d[i].tolist(),
-                'titular': article['titular'],
-                'categoria': article['categoria'],
-                'subcategoria': article['subcategoria'],
-                'keywords': article['keywords'],
-                'resumen': article['resumen']
-            }
-            for i, article in enumerate(articles_data)
-        ]
-
-        return jsonify({'points': points, 'clusters': clusters})
-
-    except Exception as e:
-        logging.error(f"Error generating map data: {str(e)}")
-        return jsonify({'error': 'processing_error', 'message': 'Error interno en el servidor'}), 500
-
-
-
-@app.route('/api/articles')
+@main.route('/api/articles')
+@conditional_endpoint('api_articles', window_version)
+@cached_endpoint('api_articles')
 def get_articles():
     try:
-        time_filter = request.args.get('time_filter', '72h')
+        try:
+            window = request_time_window()
+        except ValueError as e:
+            return invalid_time_filter(e)
         category_id = request.args.get('category_id', type=int)
         subcategory_id = request.args.get('subcategory_id', type=int)
 
-        end_date = datetime.now()
-        start_date = end_date - timedelta(hours=int(time_filter[:-1]))
-
         # Get category and subcategory info if provided
         category_info = None
         subcategory_info = None
@@ -1124,25 +651,28 @@ def get_articles():
             if not subcategory_info:
                 return jsonify({'error': 'Subcategory not found'}), 404
 
-        # Query events with related articles
-        events_query = db.session.query(
-            Evento.evento_id,
-            Evento.titulo,
-            Evento.descripcion,
-            Evento.fecha_evento,
-            Evento.gpt_sujeto_activo,
-            Evento.gpt_sujeto_pasivo,
-            Evento.gpt_importancia,
-            Evento.gpt_tiene_contexto,
-            Evento.gpt_palabras_clave,
-            Articulo.articulo_id,
-            Articulo.titular,
-            Articulo.url,
-            Articulo.fecha_publicacion,
-            Articulo.paywall,
-            Articulo.gpt_opinion,
-            Periodico.nombre,
-            Periodico.logo_url
+        # Page parameters: ?limit= events per page, ?cursor= from the previous page
+        limit = page_limit(request.args.get('limit', type=int),
+                           current_app.config['ARTICLES_PAGE_SIZE'], current_app.config['ARTICLES_MAX_PAGE_SIZE'])
+        order = request.args.get('order', 'desc').lower()
+        event_day = func.coalesce(Evento.fecha_evento, NULL_DAY)
+
+        # Articles of the window per event, ranked newest first
+        ranked_query = db.session.query(
+            Evento.evento_id.label('evento_id'),
+            Articulo.articulo_id.label('id'),
+            Articulo.titular.label('titular'),
+            Articulo.url.label('url'),
+            Articulo.fecha_publicacion.label('fecha_publicacion'),
+            Articulo.paywall.label('paywall'),
+            Articulo.gpt_opinion.label('gpt_opinion'),
+            Periodico.nombre.label('periodico_nombre'),
+            Periodico.logo_url.label('periodico_logo'),
+            func.row_number().over(
+                partition_by=Evento.evento_id,
+                order_by=(Articulo.fecha_publicacion.desc(), Articulo.articulo_id.desc())
+            ).label('rank'),
+            func.count().over(partition_by=Evento.evento_id).label('article_count')
         ).join(
             Subcategoria, Evento.subcategoria_id == Subcategoria.subcategoria_id
         ).join(
@@ -1150,89 +680,98 @@ def get_articles():
         ).join(
             Articulo, and_(
                 Articulo.articulo_id == articulo_evento.c.articulo_id,
-                Articulo.fecha_publicacion.between(start_date, end_date)
+                Articulo.fecha_publicacion.between(window.start, window.end)
             )
         ).join(
             Periodico, Periodico.periodico_id == Articulo.periodico_id
         )
 
-        # Get the order parameter (default to descending if not provided)
-        order = request.args.get('order', 'desc').lower()
-
-        # Apply order
-        if order == 'asc':
-            events_query = events_query.order_by(Evento.fecha_evento.asc(), Articulo.fecha_publicacion.asc())
-        else:
-            events_query = events_query.order_by(Evento.fecha_evento.desc(), Articulo.fecha_publicacion.desc())
-
-
         # Apply filters
-        if category_id == 0:  # "All" category
-            # Remove category filter
-            events_query = events_query
-        elif category_id:
-            events_query = events_query.filter(Subcategoria.categoria_id == category_id)
+        if category_id:  # 0 is the "All" category
+            ranked_query = ranked_query.filter(Subcategoria.categoria_id == category_id)
         if subcategory_id:
-            events_query = events_query.filter(Subcategoria.subcategoria_id == subcategory_id)
-
-        # Execute query
-        events_results = events_query.order_by(
-            desc(Evento.fecha_evento),
-            desc(Articulo.fecha_publicacion)
-        ).all()
+            ranked_query = ranked_query.filter(Subcategoria.subcategoria_id == subcategory_id)
+        ranked = ranked_query.subquery()
+
+        # One row per event, with its first ARTICLES_PER_EVENT articles aggregated in SQL
+        article_json = func.json_build_object(
+            'id', ranked.c.id,
+            'titular', ranked.c.titular,
+            'url', ranked.c.url,
+            'fecha_publicacion', ranked.c.fecha_publicacion,
+            'paywall', ranked.c.paywall,
+            'gpt_opinion', ranked.c.gpt_opinion,
+            'periodico_nombre', ranked.c.periodico_nombre,
+            'periodico_logo', ranked.c.periodico_logo
+        )
+        grouped = db.session.query(
+            ranked.c.evento_id,
+            func.max(ranked.c.article_count).label('article_count'),
+            func.json_agg(aggregate_order_by(article_json, ranked.c.rank)).filter(
+                ranked.c.rank <= current_app.config['ARTICLES_PER_EVENT']
+            ).label('articles')
+        ).group_by(ranked.c.evento_id).subquery()
+
+        # Events with most articles first, then by date in the requested order
+        sort_keys = [
+            (grouped.c.article_count, True),
+            (event_day, order != 'asc'),
+            (Evento.evento_id, order != 'asc')
+        ]
+        events_query = db.session.query(
+            Evento.evento_id,
+            Evento.titulo,
+            Evento.descripcion,
+            Evento.fecha_evento,
+            Evento.gpt_sujeto_activo,
+            Evento.gpt_sujeto_pasivo,
+            Evento.gpt_importancia,
+            Evento.gpt_tiene_contexto,
+            Evento.gpt_palabras_clave,
+            grouped.c.article_count,
+            grouped.c.articles
+        ).join(
+            grouped, grouped.c.evento_id == Evento.evento_id
+        ).order_by(
+            *[column.desc() if descending else column.asc() for column, descending in sort_keys]
+        )
 
-        if not events_results:
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                count, day, evento_id = decode_cursor(cursor, 3)
+                events_query = events_query.filter(
+                    keyset_after(sort_keys, [int(count), date.fromisoformat(day), int(evento_id)])
+                )
+            except (TypeError, ValueError):
+                return jsonify({'error': 'invalid_cursor', 'message': 'Invalid cursor'}), 400
+
+        # One extra row tells whether there is a next page
+        events_results = events_query.limit(limit + 1).all()
+        next_cursor = None
+        if len(events_results) > limit:
+            events_results = events_results[:limit]
+            last = events_results[-1]
+            next_cursor = encode_cursor([
+                last.article_count, (last.fecha_evento or NULL_DAY).isoformat(), last.evento_id
+            ])
+
+        if not events_results and not cursor:
             logger.warning(f"No events found for category_id={category_id}, subcategory_id={subcategory_id}")
-            return jsonify({
-                'categories': [{
-                    'nombre': category_info.nombre if category_info else 'All Categories',
-                    'categoria_id': category_id,
-                    'subcategories': [{
-                        'nombre': subcategory_info.nombre if subcategory_info else 'All Subcategories',
-                        'subcategoria_id': subcategory_id,
-                        'events': []
-                    }]
-                }]
-            })
-
-        # Process results
-        events_dict = {}
-        for result in events_results:
-            evento_id = result[0]
-            if evento_id not in events_dict:
-                events_dict[evento_id] = {
-                    'titulo': result[1],
-                    'descripcion': result[2],
-                    'fecha_evento': result[3].isoformat() if result[3] else None,
-                    'gpt_sujeto_activo': result[4],
-                    'gpt_sujeto_pasivo': result[5],
-                    'gpt_importancia': result[6],
-                    'gpt_tiene_contexto': result[7],
-                    'gpt_palabras_clave': result[8],
-                    'article_count': 0,
-                    'articles': []
-                }
-
-            article_id = result[9]
-            article_exists = any(a['id'] == article_id for a in events_dict[evento_id]['articles'])
-            if not article_exists:
-                events_dict[evento_id]['articles'].append({
-                    'id': article_id,
-                    'titular': result[10],
-                    'url': result[11],
-                    'fecha_publicacion': result[12].isoformat() if result[12] else None,
-                    'paywall': result[13],
-                    'gpt_opinion': result[14],
-                    'periodico_nombre': result[15],
-                    'periodico_logo': result[16]
-                })
-                events_dict[evento_id]['article_count'] += 1
 
-        # Sort events by article count and date
-        sorted_events = sorted(
-            events_dict.values(),
-            key=lambda x: (-x['article_count'], x['fecha_evento'] or '1900-01-01')
-        )
+        sorted_events = [{
+            'evento_id': result.evento_id,
+            'titulo': result.titulo,
+            'descripcion': result.descripcion,
+            'fecha_evento': result.fecha_evento.isoformat() if result.fecha_evento else None,
+            'gpt_sujeto_activo': result.gpt_sujeto_activo,
+            'gpt_sujeto_pasivo': result.gpt_sujeto_pasivo,
+            'gpt_importancia': result.gpt_importancia,
+            'gpt_tiene_contexto': result.gpt_tiene_contexto,
+            'gpt_palabras_clave': result.gpt_palabras_clave,
+            'article_count': result.article_count,
+            'articles': result.articles or []
+        } for result in events_results]
 
         response_data = {
             'categories': [{
@@ -1243,7 +782,8 @@ def get_articles():
                     'subcategoria_id': subcategory_id,
                     'events': sorted_events
                 }]
-            }]
+            }],
+            'next_cursor': next_cursor
         }
 
         return jsonify(response_data)
@@ -1252,57 +792,193 @@ def get_articles():
         logger.error(f"Error in get_articles: {str(e)}", exc_info=True)
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
-@app.route('/api/article/<int:article_id>')
+def article_version(article_id):
+    # Kept in g so the detail cache doesn't read updated_on a second time
+    g.article_versions = current_versions([article_id])
+    if article_id not in g.article_versions:
+        return None
+    updated_on = g.article_versions[article_id]
+    return f"{article_id}-{updated_on.isoformat() if updated_on else ''}", updated_on
+
+@main.route('/api/article/<int:article_id>')
+@conditional_endpoint('api_article', article_version)
 def get_article(article_id):
+    """Details of one article, from the per-process detail cache (see article_details.py)."""
     try:
-        article = db.session.query(
-            Articulo.articulo_id,
-            Articulo.titular,
-            Articulo.subtitular,
-            Articulo.url,
-            Articulo.fecha_publicacion,
-            Articulo.agencia,
-            Articulo.paywall,
-            Articulo.gpt_resumen,
-            Articulo.gpt_opinion,
-            Periodista.nombre.label('periodista_nombre'),
-            Periodista.apellido.label('periodista_apellido'),
-            Periodico.nombre.label('periodico_nombre'),
-            Periodico.logo_url.label('periodico_logo')
-        ).outerjoin(
-            Periodista, cast(Articulo.periodista_id, String) == cast(Periodista.periodista_id, String)
-        ).join(
-            Periodico, Periodico.periodico_id == Articulo.periodico_id
-        ).filter(
-            Articulo.articulo_id == article_id
-        ).first()
-
+        article = current_app.extensions['article_details'].get(article_id, g.get('article_versions'))
         if not article:
             logger.warning(f"Article not found: {article_id}")
             return jsonify({'error': 'Article not found'}), 404
+        return jsonify(article)
+
+    except Exception as e:
+        logger.error(f"Error fetching article details: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
-        periodista_nombre = None
-        if article.periodista_nombre and article.periodista_apellido:
-            periodista_nombre = f"{article.periodista_nombre} {article.periodista_apellido}"
+def batch_ids():
+    """Article ids of ?ids=1,2,3 (or repeated ?ids=), in order and without duplicates."""
+    ids = []
+    for value in request.args.getlist('ids'):
+        for part in value.split(','):
+            if part.strip():
+                ids.append(int(part))
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise ValueError('Expected ?ids=1,2,3')
+    if len(ids) > current_app.config['ARTICLES_MAX_PAGE_SIZE']:
+        raise ValueError(f"At most {current_app.config['ARTICLES_MAX_PAGE_SIZE']} ids per request")
+    return ids
+
+def batch_version(**kwargs):
+    g.article_versions = current_versions(batch_ids())
+    updated_on = max(filter(None, g.article_versions.values()), default=None)
+    return f"{len(g.article_versions)}-{updated_on.isoformat() if updated_on else ''}", updated_on
+
+@main.route('/api/articles/batch')
+@conditional_endpoint('api_articles_batch', batch_version)
+def get_articles_batch():
+    """Details of several articles in one request (?ids=), e.g. the cards of a visible carousel."""
+    try:
+        try:
+            ids = batch_ids()
+        except ValueError as e:
+            return jsonify({'error': 'invalid_ids', 'message': str(e)}), 400
 
+        details = current_app.extensions['article_details'].get_many(ids, g.get('article_versions'))
         return jsonify({
-            'id': article.articulo_id,
-            'titular': article.titular,
-            'subtitular': article.subtitular,
-            'url': article.url,
-            'fecha_publicacion': article.fecha_publicacion.isoformat() if article.fecha_publicacion else None,
-            'periodista': periodista_nombre,
-            'agencia': article.agencia,
-            'paywall': article.paywall,
-            'gpt_resumen': article.gpt_resumen,
-            'gpt_opinion': article.gpt_opinion,
-            'periodico_nombre': article.periodico_nombre,
-            'periodico_logo': article.periodico_logo
+            'articles': [details[article_id] for article_id in ids if article_id in details],
+            'missing': [article_id for article_id in ids if article_id not in details]
         })
 
     except Exception as e:
-        logger.error(f"Error fetching article details: {str(e)}", exc_info=True)
-        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+        logger.error(f"Error fetching article details batch: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Internal server error'}), 500
+
+def search_result(row):
+    return {
+        'id': row.articulo_id,
+        'titular': row.titular,
+        'subtitular': row.subtitular,
+        'url': row.url,
+        'fecha_publicacion': row.fecha_publicacion.isoformat() if row.fecha_publicacion else None,
+        'paywall': row.paywall,
+        'gpt_resumen': row.gpt_resumen,
+        'gpt_opinion': row.gpt_opinion,
+        'periodico_nombre': row.periodico_nombre,
+        'periodico_logo': row.periodico_logo,
+        'rank': row.rank
+    }
+
+def index_version(**kwargs):
+    version = current_vector_index().version()
+    return (version, None) if version else None
+
+def search_version(**kwargs):
+    """Version of the articles /api/search reads, plus the vector index for ?semantic=1."""
+    if request.args.get('date'):
+        day = date.fromisoformat(request.args['date'])
+        version = data_version(day, day, f'date-{day.isoformat()}')
+    elif request.args.get('time_filter'):
+        version = window_version()
+    else:
+        version = data_version()
+    if request.args.get('semantic') == '1':
+        index = current_vector_index().version()
+        if index is None:
+            return None
+        return f'{version[0]}|{index}', version[1]
+    return version
+
+@main.route('/api/article/<int:article_id>/related')
+@conditional_endpoint('api_related', index_version)
+@cached_endpoint('api_related')
+def get_related_articles(article_id):
+    """Nearest articles to this one in embedding space (cosine similarity as 'rank')."""
+    try:
+        vector_index = current_vector_index()
+        if not vector_index.ready():
+            return jsonify({'error': 'not_ready', 'message': 'El índice vectorial todavía se está generando'}), 503
+
+        vector = vector_index.vector(article_id)
+        if vector is None:
+            # Not indexed yet: read its embedding directly
+            article = add_articulo_embedding(
+                db.session.query(Articulo.articulo_id).filter(Articulo.articulo_id == article_id),
+                'embeddings', current_app.config['EMBEDDING_STORAGE']
+            ).first()
+            if not article:
+                return jsonify({'error': 'Article not found'}), 404
+            vector = row_embedding(article.embedding_bin, article.embedding_text)
+            if vector.size == 0:
+                return jsonify({'article_id': article_id, 'related': []})
+
+        limit = page_limit(request.args.get('limit', type=int), 10, current_app.config['ARTICLES_MAX_PAGE_SIZE'])
+        neighbours = vector_index.search(vector, k=limit, exclude={article_id})
+        return jsonify({
+            'article_id': article_id,
+            'related': [search_result(row) for row in article_summaries(neighbours, limit)]
+        })
+
+    except Exception as e:
+        logger.error(f"Error fetching related articles: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Internal server error'}), 500
+
+@main.route('/api/search')
+@conditional_endpoint('api_search', search_version)
+@cached_endpoint('api_search')
+def search():
+    """Ranked full-text search over articles (?q=), paginated with ?cursor= and ?limit=.
+
+    With ?semantic=1 the results are the nearest neighbours of the best matches
+    in embedding space instead (one page, no cursor).
+    """
+    try:
+        start_date = end_date = None
+        if request.args.get('time_filter'):
+            try:
+                window = request_time_window()
+            except ValueError as e:
+                return invalid_time_filter(e)
+            start_date, end_date = window.start, window.end
+        if request.args.get('date'):
+            try:
+                start_date = end_date = date.fromisoformat(request.args['date'])
+            except ValueError:
+                return jsonify({'error': 'invalid_date', 'message': 'Expected a YYYY-MM-DD date'}), 400
+
+        limit = page_limit(request.args.get('limit', type=int),
+                           current_app.config['ARTICLES_PAGE_SIZE'], current_app.config['ARTICLES_MAX_PAGE_SIZE'])
+        if request.args.get('semantic') == '1':
+            vector_index = current_vector_index()
+            if not vector_index.ready():
+                return jsonify({'error': 'not_ready', 'message': 'El índice vectorial todavía se está generando'}), 503
+            try:
+                rows = semantic_search(vector_index, request.args.get('q'), limit,
+                                       start_date=start_date, end_date=end_date,
+                                       category_id=request.args.get('category_id', type=int))
+            except ValueError as e:
+                return jsonify({'error': 'invalid_search', 'message': str(e)}), 400
+            return jsonify({'results': [search_result(row) for row in rows], 'next_cursor': None})
+
+        try:
+            rows, next_cursor = search_articles(
+                request.args.get('q'), limit,
+                cursor=request.args.get('cursor'),
+                start_date=start_date,
+                end_date=end_date,
+                category_id=request.args.get('category_id', type=int)
+            )
+        except ValueError as e:
+            return jsonify({'error': 'invalid_search', 'message': str(e)}), 400
+
+        return jsonify({
+            'results': [search_result(row) for row in rows],
+            'next_cursor': next_cursor
+        })
+
+    except Exception as e:
+        logger.error(f"Error in search: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""Article details for the article modal: /api/article/<id> and /api/articles/batch.
+
+Details are read with integer joins on periodista_id and periodico_id (the
+old query cast both sides of the periodista join to text, so no index could
+be used) and kept in a bounded per-process LRU keyed by articulo_id. Each
+entry remembers the article's updated_on: a lookup first reads the current
+updated_on of the requested ids (primary key lookups) and reloads only the
+entries that are missing or whose timestamp changed, so edited articles are
+never served stale. The views already read those timestamps for their ETag
+(see article_version in app.py) and pass them in, so a cache hit costs a
+single query.
+"""
+import threading
+from collections import OrderedDict
+
+from database import db
+from models import Articulo, Periodico, Periodista
+
+
+def _detail_query(ids):
+    return db.session.query(
+        Articulo.articulo_id,
+        Articulo.updated_on,
+        Articulo.titular,
+        Articulo.subtitular,
+        Articulo.url,
+        Articulo.fecha_publicacion,
+        Articulo.agencia,
+        Articulo.paywall,
+        Articulo.gpt_resumen,
+        Articulo.gpt_opinion,
+        Periodista.nombre.label('periodista_nombre'),
+        Periodista.apellido.label('periodista_apellido'),
+        Periodico.nombre.label('periodico_nombre'),
+        Periodico.logo_url.label('periodico_logo')
+    ).outerjoin(
+        Periodista, Periodista.periodista_id == Articulo.periodista_id
+    ).join(
+        Periodico, Periodico.periodico_id == Articulo.periodico_id
+    ).filter(
+        Articulo.articulo_id.in_(ids)
+    )
+
+
+def article_detail(row):
+    """JSON shape of /api/article/<id>."""
+    periodista_nombre = None
+    if row.periodista_nombre and row.periodista_apellido:
+        periodista_nombre = f"{row.periodista_nombre} {row.periodista_apellido}"
+    return {
+        'id': row.articulo_id,
+        'titular': row.titular,
+        'subtitular': row.subtitular,
+        'url': row.url,
+        'fecha_publicacion': row.fecha_publicacion.isoformat() if row.fecha_publicacion else None,
+        'periodista': periodista_nombre,
+        'agencia': row.agencia,
+        'paywall': row.paywall,
+        'gpt_resumen': row.gpt_resumen,
+        'gpt_opinion': row.gpt_opinion,
+        'periodico_nombre': row.periodico_nombre,
+        'periodico_logo': row.periodico_logo
+    }
+
+
+def current_versions(ids):
+    """{articulo_id: updated_on} of the requested articles that exist."""
+    return dict(db.session.query(Articulo.articulo_id, Articulo.updated_on).filter(
+        Articulo.articulo_id.in_(ids)
+    ).all())
+
+
+class ArticleDetailCache:
+    """LRU of article details, checked against Articulo.updated_on on every lookup."""
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # articulo_id -> (updated_on, detail)
+        self._lock = threading.Lock()
+
+    def get_many(self, ids, current=None):
+        """{articulo_id: detail} of the requested articles that exist.
+
+        `current` is current_versions(ids) when the caller already read it.
+        """
+        if current is None:
+            current = current_versions(ids)
+
+        details, outdated = {}, []
+        with self._lock:
+            for article_id, updated_on in current.items():
+                entry = self._entries.get(article_id)
+                if entry is not None and entry[0] == updated_on:
+                    self._entries.move_to_end(article_id)
+                    details[article_id] = entry[1]
+                else:
+                    outdated.append(article_id)
+
+        if outdated:
+            rows = _detail_query(outdated).all()
+            with self._lock:
+                for row in rows:
+                    details[row.articulo_id] = article_detail(row)
+                    self._entries[row.articulo_id] = (row.updated_on, details[row.articulo_id])
+                    self._entries.move_to_end(row.articulo_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return details
+
+    def get(self, article_id, current=None):
+        return self.get_many([article_id], current).get(article_id)
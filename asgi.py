@@ -0,0 +1,105 @@
+"""ASGI serving mode, with separate thread pools for slow and fast endpoints.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+
+The views stay the synchronous Flask views of app.py (db.session, the
+replica routing and the response cache are all synchronous); a2wsgi runs
+them in threads. Each request goes to one of two lanes, each an a2wsgi
+WSGIMiddleware with its own thread pool:
+
+- HEAVY_ENDPOINTS (/api/mapa-data, which may build a missing map, and the
+  admin map builds) get ASGI_HEAVY_THREADS threads;
+- everything else gets the rest of WEB_THREADS.
+
+A slow map build can only hold threads of its own lane, so /api/subcategories,
+/api/articles... keep being served while it runs instead of queueing behind
+it; the CPU-bound map stages themselves run in a process pool
+(MAP_BUILD_PROCESSES, see mapa/builder.py). The database pool is sized for
+WEB_THREADS threads (see db_pool.py), so every thread of both lanes can get
+a connection.
+
+A lane admits at most its threads plus ASGI_QUEUE_LIMIT (ASGI_HEAVY_QUEUE_LIMIT
+for the heavy lane) requests at once; the next ones get a 503 with
+Retry-After instead of waiting in an unbounded queue. Requests in flight and
+rejected per lane are exported at /metrics (clickbait_asgi_lane_*).
+"""
+import json
+
+from a2wsgi import WSGIMiddleware
+from werkzeug.exceptions import HTTPException
+
+from app import create_app
+
+HEAVY_ENDPOINTS = {'main.mapa_data', 'main.map_profiles'}
+RETRY_AFTER_SECONDS = 5
+
+BUSY_BODY = json.dumps({'error': 'busy', 'message': 'Servidor ocupado, inténtelo de nuevo en unos segundos'}).encode()
+
+
+class Lane:
+    """WSGI thread pool for one class of requests, admitting at most `threads + queue_limit` at once."""
+
+    def __init__(self, name, flask_app, threads, queue_limit):
+        self.name = name
+        self.threads = threads
+        self.capacity = threads + queue_limit
+        self.in_flight = 0
+        self.rejected = 0
+        self.wsgi = WSGIMiddleware(flask_app, workers=threads)
+
+    async def __call__(self, scope, receive, send):
+        # Only the event loop thread touches in_flight, no lock needed
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            await send({'type': 'http.response.start', 'status': 503, 'headers': [
+                (b'content-type', b'application/json'),
+                (b'retry-after', str(RETRY_AFTER_SECONDS).encode()),
+            ]})
+            await send({'type': 'http.response.body', 'body': BUSY_BODY})
+            return
+        self.in_flight += 1
+        try:
+            await self.wsgi(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    def samples(self):
+        labels = f'lane="{self.name}"'
+        return [
+            ('gauge', 'asgi_lane_in_flight', labels, self.in_flight),
+            ('gauge', 'asgi_lane_threads', labels, self.threads),
+            ('gauge', 'asgi_lane_capacity', labels, self.capacity),
+            ('counter', 'asgi_lane_rejected_total', labels, self.rejected),
+        ]
+
+
+class LaneApp:
+    """ASGI application sending each request of a Flask app to the lane of its endpoint."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        config = flask_app.config
+        threads = config['WEB_THREADS']
+        heavy = max(min(config['ASGI_HEAVY_THREADS'], threads - 1), 1)
+        self.fast = Lane('fast', flask_app, max(threads - heavy, 1), config['ASGI_QUEUE_LIMIT'])
+        self.heavy = Lane('heavy', flask_app, heavy, config['ASGI_HEAVY_QUEUE_LIMIT'])
+        if 'request_metrics' in flask_app.extensions:
+            flask_app.extensions['request_metrics'].add_collector(
+                lambda: self.fast.samples() + self.heavy.samples())
+
+    def lane(self, scope):
+        try:
+            endpoint, _ = self.flask_app.url_map.bind('').match(scope['path'], method=scope['method'])
+        except HTTPException:
+            return self.fast
+        return self.heavy if endpoint in HEAVY_ENDPOINTS else self.fast
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self.lane(scope)(scope, receive, send)
+        else:
+            # lifespan and websocket (closed): nothing per lane
+            await self.fast.wsgi(scope, receive, send)
+
+
+app = LaneApp(create_app())
@@ -0,0 +1,233 @@
+"""HTTP load test of a running app, with latency and throughput reports.
+
+Each of --concurrency threads keeps one HTTP connection and runs steps of a
+traffic profile, picked at random by weight, until --duration seconds have
+passed. Every request is timed; the report gives requests/s and p50/p95/p99
+latency per step and overall, so runs on different hardware or settings can
+be compared (--output writes it as JSON, --baseline compares with one).
+
+Profiles (PROFILES below):
+
+    browse    home page, subcategory tabs and /api/articles, scrolling a few pages
+    posturas  /api/posturas listings of every category
+    map       /api/mapa-data in the json and binary formats
+    mixed     all of the above, weighted like ordinary traffic
+
+Fill a local database first with benchmarks/synthetic_data.py, run
+map_builder.py --once, start the app, then e.g.:
+
+    python -m benchmarks.load_test --url http://localhost:5000 --profile mixed \\
+        --concurrency 16 --duration 60 --output run.json
+
+With --revalidate, clients keep the ETag of each URL and send If-None-Match,
+like a browser with a warm cache.
+"""
+import argparse
+import gzip
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+TIME_FILTERS = ('24h', '48h', '72h')
+MAX_SCROLL_PAGES = 3
+
+
+class Client:
+    """One keep-alive connection; records (step, status, seconds, bytes) per request."""
+
+    def __init__(self, base_url, results, revalidate=False):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.prefix = parts.path.rstrip('/')
+        self.results = results
+        self.revalidate = revalidate
+        self.etags = {}
+        self.connection = None
+
+    def get(self, step, path, params=None):
+        """GET and record one request; returns the decoded JSON body (or None)."""
+        url = self.prefix + path + (f'?{urlencode(params)}' if params else '')
+        headers = {'Accept-Encoding': 'gzip'}
+        if self.revalidate and url in self.etags:
+            headers['If-None-Match'] = self.etags[url]
+
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = self.connection_class(self.host, self.port, timeout=60)
+            self.connection.request('GET', url, headers=headers)
+            response = self.connection.getresponse()
+            body = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            self.results.append((step, 0, time.perf_counter() - started, 0))
+            return None
+        self.results.append((step, status, time.perf_counter() - started, len(body)))
+
+        if self.revalidate and response.getheader('ETag'):
+            self.etags[url] = response.getheader('ETag')
+        if status != 200 or not (response.getheader('Content-Type') or '').startswith('application/json'):
+            return None
+        if response.getheader('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return json.loads(body)
+
+
+def home(client, rng, options):
+    client.get('home', '/', {'time_filter': rng.choice(TIME_FILTERS)})
+
+
+def subcategories(client, rng, options):
+    client.get('subcategories', '/api/subcategories', {
+        'category_id': rng.randint(1, options.categories),
+        'time_filter': rng.choice(TIME_FILTERS)
+    })
+
+
+def articles(client, rng, options):
+    """First page of a category, then up to MAX_SCROLL_PAGES more while there is a cursor."""
+    params = {'category_id': rng.randint(1, options.categories), 'time_filter': rng.choice(TIME_FILTERS)}
+    data = client.get('articles', '/api/articles', params)
+    for _ in range(rng.randint(0, MAX_SCROLL_PAGES)):
+        if not data or not data.get('next_cursor'):
+            break
+        data = client.get('articles (scroll)', '/api/articles', dict(params, cursor=data['next_cursor']))
+
+
+def posturas(client, rng, options):
+    client.get('posturas', '/api/posturas', {
+        'category_id': rng.randint(0, options.categories),
+        'time_filter': rng.choice(TIME_FILTERS)
+    })
+
+
+def map_json(client, rng, options):
+    client.get('mapa-data json', '/api/mapa-data', {'time_filter': rng.choice(TIME_FILTERS)})
+
+
+def map_binary(client, rng, options):
+    client.get('mapa-data binary', '/api/mapa-data', {'time_filter': rng.choice(TIME_FILTERS), 'format': 'binary'})
+
+
+# profile -> [(weight, step)]
+PROFILES = {
+    'browse': [(2, home), (3, subcategories), (6, articles)],
+    'posturas': [(1, posturas)],
+    'map': [(1, map_json), (3, map_binary)],
+    'mixed': [(2, home), (3, subcategories), (6, articles), (2, posturas), (1, map_binary)],
+}
+
+
+def _worker(base_url, steps, deadline, seed, options, results):
+    rng = random.Random(seed)
+    client = Client(base_url, results, revalidate=options.revalidate)
+    weights = [weight for weight, _ in steps]
+    functions = [step for _, step in steps]
+    while time.monotonic() < deadline:
+        rng.choices(functions, weights)[0](client, rng, options)
+
+
+def run(options):
+    steps = PROFILES[options.profile]
+    deadline = time.monotonic() + options.duration
+    per_thread = [[] for _ in range(options.concurrency)]
+    threads = [
+        threading.Thread(target=_worker, args=(options.url, steps, deadline, options.seed + i, options, per_thread[i]))
+        for i in range(options.concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    return report([r for results in per_thread for r in results], elapsed)
+
+
+def _summary(results, elapsed):
+    seconds = np.array([r[2] for r in results])
+    statuses = defaultdict(int)
+    for r in results:
+        statuses[r[1]] += 1
+    return {
+        'requests': len(results),
+        'rps': len(results) / elapsed,
+        'errors': sum(n for status, n in statuses.items() if status == 0 or status >= 400),
+        'statuses': {str(status): n for status, n in sorted(statuses.items())},
+        'p50_ms': float(np.percentile(seconds, 50) * 1000),
+        'p95_ms': float(np.percentile(seconds, 95) * 1000),
+        'p99_ms': float(np.percentile(seconds, 99) * 1000),
+        'mean_ms': float(seconds.mean() * 1000),
+        'kb_per_request': sum(r[3] for r in results) / len(results) / 1024
+    }
+
+
+def report(results, elapsed):
+    by_step = defaultdict(list)
+    for r in results:
+        by_step[r[0]].append(r)
+    return {
+        'seconds': elapsed,
+        'total': _summary(results, elapsed) if results else None,
+        'steps': {step: _summary(rs, elapsed) for step, rs in sorted(by_step.items())}
+    }
+
+
+def _change(value, previous):
+    if not previous:
+        return ''
+    return f' [{(value - previous) / previous * 100:+.0f}%]'
+
+
+def print_report(result, baseline=None):
+    rows = list(result['steps'].items()) + [('TOTAL', result['total'])]
+    previous = dict(baseline['steps'], TOTAL=baseline['total']) if baseline else {}
+    print(f"{'step':<20} {'req':>7} {'req/s':>8} {'err':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'KB/req':>7}")
+    for step, s in rows:
+        if s is None:
+            continue
+        before = previous.get(step) or {}
+        print(f"{step:<20} {s['requests']:>7} {s['rps']:>8.1f} {s['errors']:>5} {s['p50_ms']:>8.1f} "
+              f"{s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} {s['kb_per_request']:>7.1f}"
+              + _change(s['p95_ms'], before.get('p95_ms')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test a running app')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='mixed')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30, help='Seconds')
+    parser.add_argument('--categories', type=int, default=8, help='Category ids 1..N to request')
+    parser.add_argument('--revalidate', action='store_true', help='Send If-None-Match with known ETags')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the report to this JSON file')
+    parser.add_argument('--baseline', help='Compare p95 with a report written by --output')
+    options = parser.parse_args(argv)
+
+    result = run(options)
+    baseline = None
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+    if result['total'] is None:
+        print('No requests completed')
+    else:
+        print_report(result, baseline)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Benchmark of the map pipeline (mapa/pipeline.py) over synthetic embeddings.
+
+Runs decode -> reduce -> cluster -> label -> serialize for every size x
+dimension x reducer combination and reports wall time and peak traced memory
+per stage. Each combination is run twice: 'cold' (no previous state, full
+fit) and 'warm' (previous state with 5% of the articles replaced, i.e. the
+incremental refresh the map builder normally does). The fetch stage needs a
+database and is not included.
+
+    python -m benchmarks.map_pipeline                       # 1k/10k/50k x 384/1536
+    python -m benchmarks.map_pipeline --sizes 1000 --dims 384 --output base.json
+    python -m benchmarks.map_pipeline --sizes 1000 --dims 384 --baseline base.json
+
+With --baseline, each stage also shows the change against a previous
+--output file, so regressions stand out.
+"""
+import argparse
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from config import Config
+from embeddings import encode_embedding
+from mapa.pipeline import StageTimer, run_pipeline
+
+DEFAULT_SIZES = [1000, 10000, 50000]
+DEFAULT_DIMS = [384, 1536]
+N_TOPICS = 20
+REPLACED_FRACTION = 0.05
+
+
+def synthetic_rows(n, dim, rng, first_id=1, text=False):
+    """Rows shaped like pipeline.fetch() output, with embeddings around N_TOPICS topic centres."""
+    centres = np.random.default_rng(0).normal(size=(N_TOPICS, dim)).astype(np.float32)
+    topics = rng.integers(0, N_TOPICS, size=n)
+    vectors = centres[topics] + rng.normal(scale=0.5, size=(n, dim)).astype(np.float32)
+    rows = []
+    for i in range(n):
+        vector = vectors[i]
+        rows.append(SimpleNamespace(
+            articulo_id=first_id + i,
+            titular=f'Titular {first_id + i}',
+            gpt_resumen='Resumen',
+            gpt_palabras_clave=f'tema{topics[i]},palabra{i % 50}',
+            categoria=f'Categoria {topics[i] % 5}',
+            subcategoria=f'Subcategoria {topics[i]}',
+            periodico=f'Periodico {i % 10}',
+            embedding_bin=None if text else encode_embedding(vector),
+            embedding_text='{' + ','.join(f'{x:.6f}' for x in vector) + '}' if text else None
+        ))
+    return rows
+
+
+def run_case(rows, config, reducer, previous_state, now, track_memory):
+    timer = StageTimer(track_memory=track_memory)
+    started = time.perf_counter()
+    _, state = run_pipeline(rows, config, reducer, previous_state, now, timer)
+    total = time.perf_counter() - started
+    return state, {
+        'seconds': dict(timer.timings, total=total),
+        'peak_mb': {stage: peak / 2 ** 20 for stage, peak in timer.peak_memory.items()}
+    }
+
+
+def benchmark(sizes, dims, reducers, text=False, track_memory=True):
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    config['MAP_LAYOUT_MODE'] = 'incremental'
+    results = []
+    for n in sizes:
+        for dim in dims:
+            rng = np.random.default_rng(42)
+            rows = synthetic_rows(n, dim, rng, text=text)
+            for reducer in reducers:
+                now = datetime.now()
+                state, cold = run_case(rows, config, reducer, None, now, track_memory)
+                results.append(dict(cold, n=n, dim=dim, reducer=reducer, run='cold'))
+                print_result(results[-1])
+
+                replaced = int(n * REPLACED_FRACTION)
+                warm_rows = rows[replaced:] + synthetic_rows(replaced, dim, rng, first_id=n + 1, text=text)
+                _, warm = run_case(warm_rows, config, reducer, state, now + timedelta(minutes=60), track_memory)
+                results.append(dict(warm, n=n, dim=dim, reducer=reducer, run='warm'))
+                print_result(results[-1])
+    return results
+
+
+def _key(result):
+    return (result['n'], result['dim'], result['reducer'], result['run'])
+
+
+def print_result(result, baseline=None):
+    stages = ', '.join(
+        f"{stage} {seconds:.2f}s"
+        + (f" ({result['peak_mb'][stage]:.0f}MB)" if stage in result['peak_mb'] else '')
+        + _change(seconds, baseline['seconds'].get(stage) if baseline else None)
+        for stage, seconds in result['seconds'].items()
+    )
+    print(f"n={result['n']:>6} dim={result['dim']:>5} {result['reducer']:<17} {result['run']:<4} | {stages}")
+
+
+def _change(seconds, previous):
+    if not previous:
+        return ''
+    return f" [{(seconds - previous) / previous * 100:+.0f}%]"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the map pipeline on synthetic embeddings')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='Comma-separated article counts')
+    parser.add_argument('--dims', default=','.join(map(str, DEFAULT_DIMS)), help='Comma-separated embedding sizes')
+    parser.add_argument('--reducers', default=Config.MAP_REDUCER, help='Comma-separated reducers')
+    parser.add_argument('--text', action='store_true', help='Decode from text embeddings instead of float32 bytes')
+    parser.add_argument('--no-memory', action='store_true', help='Skip tracemalloc (it slows numpy-heavy stages)')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare with a JSON file written by --output')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = benchmark(
+        [int(n) for n in args.sizes.split(',')],
+        [int(d) for d in args.dims.split(',')],
+        args.reducers.split(','),
+        text=args.text,
+        track_memory=not args.no_memory
+    )
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {_key(r): r for r in json.load(f)}
+        print('\nAgainst baseline:')
+        for result in results:
+            print_result(result, baseline.get(_key(result)))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""EXPLAIN (ANALYZE, BUFFERS) of the SQL the app actually runs, with regression checks.
+
+Each case below requests a page or /api endpoint through the Flask test
+client (with the response cache disabled), records every SELECT the view
+sends to the database, and runs it again under
+EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON). So the plans are those of the
+exact queries built in app.py, category_counts.py, search.py... with the
+parameters of a real request, not hand-copied SQL that drifts from the code.
+
+For each statement the report gives execution time, shared buffers touched
+and the scans of the plan (e.g. 'Index Only Scan on articulo using
+ix_articulo_fecha'). --output saves it as JSON; with --baseline the run is
+compared with a saved one and the script exits with status 1 when a query
+
+- gained a Seq Scan on one of WATCHED_TABLES, or
+- touches more than --tolerance times more buffers (and MIN_BUFFERS more),
+
+so plan regressions from a code or schema change show up in CI before they
+reach production. Timings are reported but not checked, they are too noisy.
+
+    python -m benchmarks.query_plans --output plans.json
+    python -m benchmarks.query_plans --baseline plans.json --time-filter 24h
+
+Run it against a database with production-like volumes (a copy, or
+benchmarks/synthetic_data.py): on tiny tables the planner rightly prefers
+sequential scans.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import sys
+
+from sqlalchemy import event, func, select
+
+from app import create_app
+from config import Config
+from database import db
+from models import Articulo
+
+WATCHED_TABLES = ('articulo', 'articulo_evento', 'evento')
+MIN_BUFFERS = 50
+
+
+class PlanConfig(Config):
+    # Every request has to reach the database
+    CACHE_TYPE = 'NullCache'
+    MAP_BUILD_ON_MISS = False
+
+
+def cases(options, article_id):
+    """(label, path) of the requests whose queries are explained."""
+    tf = options.time_filter
+    category = options.category_id
+    return [
+        ('index', f'/?time_filter={tf}'),
+        ('posturas page', f'/posturas?time_filter={tf}'),
+        ('mapa page', f'/mapa?time_filter={tf}'),
+        ('subcategories', f'/api/subcategories?category_id={category}&time_filter={tf}'),
+        ('articles all', f'/api/articles?category_id=0&time_filter={tf}'),
+        ('articles category', f'/api/articles?category_id={category}&time_filter={tf}'),
+        ('posturas', f'/api/posturas?category_id={category}&time_filter={tf}'),
+        ('article', f'/api/article/{article_id}'),
+        ('related', f'/api/article/{article_id}/related'),
+        ('search', f'/api/search?q={options.query}'),
+        ('search window', f'/api/search?q={options.query}&time_filter={tf}'),
+        ('mapa-data', f'/api/mapa-data?time_filter={tf}&format=binary'),
+    ]
+
+
+class StatementRecorder:
+    """Records the SELECT statements sent through an engine while .active."""
+
+    def __init__(self, engine):
+        self.active = False
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            self.statements.append((statement, parameters))
+
+    def capture(self, client, path):
+        self.statements = []
+        self.active = True
+        try:
+            response = client.get(path)
+        finally:
+            self.active = False
+        return response, self.statements
+
+
+def _scans(node):
+    scans = []
+    if 'Relation Name' in node:
+        scan = f"{node['Node Type']} on {node['Relation Name']}"
+        if 'Index Name' in node:
+            scan += f" using {node['Index Name']}"
+        scans.append(scan)
+    elif 'Index Name' in node:
+        # Bitmap Index Scan, below the Bitmap Heap Scan of the table
+        scans.append(f"{node['Node Type']} using {node['Index Name']}")
+    for child in node.get('Plans', []):
+        scans.extend(_scans(child))
+    return scans
+
+
+def explain(connection, statement, parameters):
+    """Summary of EXPLAIN (ANALYZE, BUFFERS) of one statement."""
+    plan = connection.exec_driver_sql(
+        f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}', parameters
+    ).scalar()[0]
+    root = plan['Plan']
+    return {
+        'sql_hash': hashlib.sha1(statement.encode('utf-8')).hexdigest()[:12],
+        'sql': statement,
+        'execution_ms': round(plan['Execution Time'], 3),
+        'planning_ms': round(plan['Planning Time'], 3),
+        'cost': root['Total Cost'],
+        'rows': root['Actual Rows'],
+        'buffers': root.get('Shared Hit Blocks', 0) + root.get('Shared Read Blocks', 0),
+        'scans': sorted(set(_scans(root)))
+    }
+
+
+def run(app, options):
+    """{'<label> #<n>': explain summary} for every statement of every case."""
+    plans = {}
+    with app.app_context():
+        article_id = options.article_id or db.session.execute(select(func.max(Articulo.articulo_id))).scalar()
+        db.session.remove()
+        recorder = StatementRecorder(db.engine)
+        client = app.test_client()
+        with db.engine.connect() as connection:
+            for label, path in cases(options, article_id):
+                response, statements = recorder.capture(client, path)
+                if response.status_code >= 500:
+                    logging.warning(f"{path} returned {response.status_code}")
+                for n, (statement, parameters) in enumerate(statements, 1):
+                    plans[f'{label} #{n}'] = dict(explain(connection, statement, parameters), path=path)
+            # EXPLAIN ANALYZE executes the statements; nothing is kept
+            connection.rollback()
+    return plans
+
+
+def regressions(plans, baseline, tolerance):
+    """Human-readable list of plan regressions against a previous run."""
+    found = []
+    for key, plan in plans.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        for scan in sorted(set(plan['scans']) - set(before['scans'])):
+            if scan.startswith('Seq Scan') and scan.split(' on ', 1)[1] in WATCHED_TABLES:
+                found.append(f"{key}: new {scan}")
+        if plan['buffers'] > before['buffers'] * (1 + tolerance) + MIN_BUFFERS:
+            found.append(f"{key}: buffers {before['buffers']} -> {plan['buffers']}")
+    return found
+
+
+def _change(value, previous):
+    if not previous:
+        return ''
+    return f' [{(value - previous) / previous * 100:+.0f}%]'
+
+
+def print_report(plans, baseline=None):
+    baseline = baseline or {}
+    print(f"{'query':<24} {'ms':>8} {'buffers':>8} {'rows':>7}  scans")
+    for key, plan in plans.items():
+        before = baseline.get(key, {})
+        changed = ' (sql changed)' if before and before['sql_hash'] != plan['sql_hash'] else ''
+        print(f"{key:<24} {plan['execution_ms']:>8.2f} {plan['buffers']:>8} {plan['rows']:>7}  "
+              f"{', '.join(plan['scans']) or '-'}{changed}"
+              + _change(plan['buffers'], before.get('buffers')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='EXPLAIN ANALYZE the queries of the app and check for plan regressions')
+    parser.add_argument('--time-filter', default='72h')
+    parser.add_argument('--category-id', type=int, default=1)
+    parser.add_argument('--article-id', type=int, help='Article for /api/article (default: the newest)')
+    parser.add_argument('--query', default='gobierno', help='Search terms')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='Allowed relative growth of buffers')
+    parser.add_argument('--output', help='Write the plans to this JSON file')
+    parser.add_argument('--baseline', help='Compare with plans written by --output')
+    options = parser.parse_args(argv)
+    # app.py configures INFO logging on import; only problems matter here
+    logging.getLogger().setLevel(logging.WARNING)
+
+    plans = run(create_app(PlanConfig), options)
+
+    baseline = None
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+    print_report(plans, baseline)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(plans, f, indent=2)
+
+    if baseline is not None:
+        found = regressions(plans, baseline, options.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
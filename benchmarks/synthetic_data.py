@@ -0,0 +1,211 @@
+"""Synthetic news dataset for load tests (see benchmarks/load_test.py).
+
+Fills categoria, subcategoria, periodico, periodista, evento, articulo and
+articulo_evento of DATABASE_URL with reproducible fake data: articles spread
+over the last --days, grouped into events, with text embeddings drawn around
+one centre per event (so maps and related articles have real structure) and
+gpt_desinformacion strings on a share of the events, some of them in the
+malformed shape the GPT pipeline produces.
+
+The core news tables are normally created by the ingest pipeline; missing
+ones are created here from the models, then pending migrations are applied
+and the derived data (embedding sidecars, category counts, posturas) is
+refreshed, so the app can be started right away:
+
+    python -m benchmarks.synthetic_data --articles 50000 --days 3
+    python -m benchmarks.synthetic_data --articles 10000 --append
+
+Meant for a local, disposable database: it refuses to write into one that
+already has articles unless --append is given.
+"""
+import argparse
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, insert, select
+
+from category_counts import refresh_counts
+from database import create_db_app, db
+from embeddings import sync_embeddings
+from migrations import upgrade
+from models import Articulo, Categoria, Evento, Periodico, Periodista, Subcategoria, articulo_evento
+from posturas import normalize_posturas
+
+logger = logging.getLogger(__name__)
+
+CORE_TABLES = [Categoria.__table__, Subcategoria.__table__, Periodico.__table__, Periodista.__table__,
+               Evento.__table__, Articulo.__table__, articulo_evento]
+BATCH_SIZE = 1000
+WORDS = ('gobierno', 'elecciones', 'economía', 'inflación', 'empleo', 'vivienda', 'sanidad', 'educación',
+         'clima', 'energía', 'tecnología', 'fútbol', 'justicia', 'europa', 'migración', 'turismo',
+         'impuestos', 'pensiones', 'sequía', 'inteligencia artificial')
+
+
+def _vector_text(vector):
+    return '{' + ','.join(f'{x:.5f}' for x in vector) + '}'
+
+
+def _next_id(connection, column):
+    return (connection.execute(select(func.max(column))).scalar() or 0) + 1
+
+
+def _insert(connection, table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        connection.execute(insert(table), rows[start:start + BATCH_SIZE])
+
+
+def _posturas_string(rng, article_ids, malformed):
+    posturas = [{
+        'titulo': f'Debate sobre {rng.choice(WORDS)}',
+        'opinion_conjunto_1': 'A favor: ' + ' '.join(rng.choice(WORDS, size=12)),
+        'opinion_conjunto_2': 'En contra: ' + ' '.join(rng.choice(WORDS, size=12)),
+        'articulos_ids_conjunto_1': [int(i) for i in article_ids[::2]],
+        'articulos_ids_conjunto_2': [int(i) for i in article_ids[1::2]]
+    } for _ in range(int(rng.integers(1, 4)))]
+    text = json.dumps(posturas, ensure_ascii=False)
+    if malformed:
+        # Escaped and wrapped in quotes, as the GPT pipeline sometimes stores it
+        text = '"' + text.replace('"', '\\"') + '"'
+    return text
+
+
+def generate(connection, articles=10000, days=3, dim=384, categories=8, subcategories=5,
+             newspapers=20, articles_per_event=5, posturas_share=0.3, seed=42, now=None):
+    """Insert the synthetic rows; returns {table: rows inserted}."""
+    rng = np.random.default_rng(seed)
+    now = now or datetime.now()
+
+    first_categoria = _next_id(connection, Categoria.categoria_id)
+    categoria_rows = [{'categoria_id': first_categoria + i, 'nombre': f'Categoría {first_categoria + i}',
+                       'descripcion': 'Categoría sintética'} for i in range(categories)]
+    first_subcategoria = _next_id(connection, Subcategoria.subcategoria_id)
+    subcategoria_rows = [{
+        'subcategoria_id': first_subcategoria + i,
+        'categoria_id': categoria_rows[i // subcategories]['categoria_id'],
+        'nombre': f'Subcategoría {first_subcategoria + i}'
+    } for i in range(categories * subcategories)]
+    first_periodico = _next_id(connection, Periodico.periodico_id)
+    periodico_rows = [{'periodico_id': first_periodico + i, 'nombre': f'Diario {first_periodico + i}',
+                       'pais_iso_code': 'ES', 'idioma': 'es'} for i in range(newspapers)]
+    first_periodista = _next_id(connection, Periodista.periodista_id)
+    periodista_rows = [{'periodista_id': first_periodista + i, 'nombre': f'Periodista{i}',
+                        'apellido': f'Apellido{i}'} for i in range(newspapers * 5)]
+
+    n_events = max(1, articles // articles_per_event)
+    first_evento = _next_id(connection, Evento.evento_id)
+    event_ids = np.arange(first_evento, first_evento + n_events)
+    event_subcategory = rng.integers(0, len(subcategoria_rows), size=n_events)
+    event_time = [now - timedelta(days=days * r) for r in rng.random(size=n_events)]
+    centres = rng.normal(size=(n_events, dim)).astype(np.float32)
+
+    first_articulo = _next_id(connection, Articulo.articulo_id)
+    article_event = rng.integers(0, n_events, size=articles)
+    articulo_rows, link_rows = [], []
+    event_articles = [[] for _ in range(n_events)]
+    for i in range(articles):
+        articulo_id = first_articulo + i
+        e = article_event[i]
+        event_articles[e].append(articulo_id)
+        published = event_time[e] + timedelta(hours=float(rng.exponential(6)))
+        published = min(published, now)
+        keywords = rng.choice(WORDS, size=4, replace=False)
+        vector = centres[e] + rng.normal(scale=0.4, size=dim).astype(np.float32)
+        articulo_rows.append({
+            'articulo_id': articulo_id,
+            'periodico_id': periodico_rows[int(rng.integers(0, len(periodico_rows)))]['periodico_id'],
+            'periodista_id': (periodista_rows[int(rng.integers(0, len(periodista_rows)))]['periodista_id']
+                              if rng.random() < 0.7 else None),
+            'titular': f'{keywords[0].capitalize()} y {keywords[1]}: noticia {articulo_id}',
+            'subtitular': f'Claves sobre {keywords[2]} y {keywords[3]}',
+            'url': f'https://example.com/noticia/{articulo_id}',
+            'fecha_publicacion': published.date(),
+            'updated_on': published,
+            'paywall': bool(rng.random() < 0.2),
+            'gpt_resumen': 'Resumen sintético sobre ' + ', '.join(keywords),
+            'gpt_opinion': 'Opinión sintética',
+            'gpt_palabras_clave': ','.join(keywords),
+            'embeddings': _vector_text(vector),
+            'palabras_clave_embeddings': _vector_text(vector)
+        })
+        link_rows.append({'articulo_id': articulo_id, 'evento_id': int(event_ids[e])})
+        # A few articles cover two events
+        if rng.random() < 0.05 and n_events > 1:
+            other = int(rng.integers(0, n_events))
+            if other != e:
+                link_rows.append({'articulo_id': articulo_id, 'evento_id': int(event_ids[other])})
+
+    evento_rows = []
+    for e in range(n_events):
+        posturas = None
+        if event_articles[e] and rng.random() < posturas_share:
+            posturas = _posturas_string(rng, event_articles[e], malformed=rng.random() < 0.2)
+        evento_rows.append({
+            'evento_id': int(event_ids[e]),
+            'subcategoria_id': subcategoria_rows[event_subcategory[e]]['subcategoria_id'],
+            'titulo': f'Evento {event_ids[e]}',
+            'descripcion': 'Evento sintético',
+            'fecha_evento': event_time[e].date(),
+            'gpt_importancia': int(rng.integers(1, 11)),
+            'gpt_palabras_clave': ','.join(rng.choice(WORDS, size=3, replace=False)),
+            'embeddings': _vector_text(centres[e]),
+            'gpt_desinformacion': posturas
+        })
+
+    inserted = {}
+    for table, rows in [(Categoria.__table__, categoria_rows), (Subcategoria.__table__, subcategoria_rows),
+                        (Periodico.__table__, periodico_rows), (Periodista.__table__, periodista_rows),
+                        (Evento.__table__, evento_rows), (Articulo.__table__, articulo_rows),
+                        (articulo_evento, link_rows)]:
+        _insert(connection, table, rows)
+        inserted[table.name] = len(rows)
+    return inserted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fill the database with a synthetic news dataset')
+    parser.add_argument('--articles', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=3, help='Spread articles over the last N days')
+    parser.add_argument('--dim', type=int, default=384, help='Embedding size')
+    parser.add_argument('--categories', type=int, default=8)
+    parser.add_argument('--subcategories', type=int, default=5, help='Per category')
+    parser.add_argument('--newspapers', type=int, default=20)
+    parser.add_argument('--articles-per-event', type=int, default=5)
+    parser.add_argument('--posturas-share', type=float, default=0.3, help='Share of events with posturas')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--append', action='store_true', help='Add to a database that already has articles')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    app = create_db_app(__name__)
+    with app.app_context():
+        db.metadata.create_all(db.engine, tables=CORE_TABLES)
+        with db.engine.begin() as connection:
+            if not args.append and connection.execute(select(Articulo.articulo_id).limit(1)).first():
+                parser.error('The database already has articles; use --append to add to them')
+
+        started = time.perf_counter()
+        with db.engine.begin() as connection:
+            inserted = generate(
+                connection, articles=args.articles, days=args.days, dim=args.dim,
+                categories=args.categories, subcategories=args.subcategories,
+                newspapers=args.newspapers, articles_per_event=args.articles_per_event,
+                posturas_share=args.posturas_share, seed=args.seed
+            )
+        logger.info(f"Datos sintéticos insertados en {time.perf_counter() - started:.1f}s: {inserted}")
+
+        upgrade(db.engine)
+        with db.engine.begin() as connection:
+            sync_embeddings(connection)
+            normalize_posturas(connection)
+            refresh_counts(connection, full=True)
+        with db.engine.begin() as connection:
+            for table in CORE_TABLES:
+                connection.execute(db.text(f'ANALYZE {table.fullname}'))
+        logger.info("Datos derivados actualizados; arranca map_builder.py para los mapas y el índice vectorial")
+
+
+if __name__ == '__main__':
+    main()
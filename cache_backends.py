@@ -0,0 +1,237 @@
+"""Shared cache backends for Flask-Caching.
+
+Every web worker used to hold its own SimpleCache, so entries warmed by one
+worker were invisible to the others. These backends are shared between
+processes and keep hit/miss counters per key namespace (the part of the key
+before the first ':', e.g. 'api_articles:...'):
+
+- SQLiteLRUCache: one SQLite file (WAL mode) shared by every process on the
+  host, size-bounded to CACHE_THRESHOLD entries with least-recently-used
+  eviction. Needs nothing else running, so it is also the local stand-in for
+  Redis in development and tests. Connections are opened lazily, one per
+  thread of each process, so a cache created before gunicorn --preload forks
+  hands no SQLite connection down to the workers.
+- RedisStatsCache: Flask-Caching's RedisCache plus the counters, for several
+  hosts. LRU eviction is done by Redis itself (maxmemory-policy allkeys-lru).
+
+Select one with CACHE_TYPE='cache_backends.SQLiteLRUCache' (the default) or
+'cache_backends.RedisStatsCache'.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+from contextlib import closing
+import threading
+import time
+from collections import defaultdict
+
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.rediscache import RedisCache
+
+logger = logging.getLogger(__name__)
+
+STATS_FLUSH_SECONDS = 10
+EVICTION_CHECK_EVERY = 100
+
+
+def key_namespace(key):
+    return key.split(':', 1)[0] if ':' in key else 'other'
+
+
+class CacheStatsMixin:
+    """Per-namespace hit/miss counters, buffered in-process and flushed periodically."""
+
+    def _init_stats(self):
+        self._stats_lock = threading.Lock()
+        self._pending_stats = defaultdict(lambda: [0, 0])
+        self._last_stats_flush = time.monotonic()
+
+    def _count(self, key, hit):
+        with self._stats_lock:
+            self._pending_stats[key_namespace(key)][0 if hit else 1] += 1
+            due = time.monotonic() - self._last_stats_flush >= STATS_FLUSH_SECONDS
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        with self._stats_lock:
+            pending = dict(self._pending_stats)
+            self._pending_stats.clear()
+            self._last_stats_flush = time.monotonic()
+        if pending:
+            try:
+                self._store_stats(pending)
+            except Exception as e:
+                logger.error(f"Error flushing cache stats: {str(e)}")
+
+    def stats(self):
+        """{namespace: {'hits': n, 'misses': n}} summed over every process."""
+        self.flush_stats()
+        return self._load_stats()
+
+
+class SQLiteLRUCache(CacheStatsMixin, BaseCache):
+    """Size-bounded LRU cache in a SQLite file shared by all local processes."""
+
+    def __init__(self, path, threshold=5000, default_timeout=300, **kwargs):
+        # Newer Flask-Caching versions pass more options (ignore_delete_many_errors)
+        BaseCache.__init__(self, default_timeout=default_timeout, **kwargs)
+        self.path = path
+        self.threshold = threshold
+        self._local = threading.local()
+        self._init_stats()
+        self._touched = {}
+        self._touch_lock = threading.Lock()
+        self._sets = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed ON cache (accessed)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_stats ("
+                " namespace TEXT PRIMARY KEY, hits INTEGER DEFAULT 0, misses INTEGER DEFAULT 0)"
+            )
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        path = os.path.join(config.get('CACHE_DIR') or '/tmp', 'cache.sqlite3')
+        kwargs.update(threshold=config['CACHE_THRESHOLD'])
+        return cls(path, *args, **kwargs)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _connection(self):
+        # A forked child inherits the parent's thread-locals: check the pid too
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = self._connect()
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def _expires(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return time.time() + timeout if timeout else 0
+
+    def _touch(self, key):
+        # Access times are batched with the stats flush instead of a write per hit
+        with self._touch_lock:
+            self._touched[key] = time.time()
+
+    def _flush_touches(self):
+        with self._touch_lock:
+            touched = list(self._touched.items())
+            self._touched.clear()
+        if touched:
+            self._connection().executemany(
+                "UPDATE cache SET accessed = ? WHERE key = ?", [(t, k) for k, t in touched]
+            )
+
+    def _store_stats(self, pending):
+        self._flush_touches()
+        self._connection().executemany(
+            "INSERT INTO cache_stats (namespace, hits, misses) VALUES (?, ?, ?) "
+            "ON CONFLICT (namespace) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+            [(namespace, hits, misses) for namespace, (hits, misses) in pending.items()]
+        )
+
+    def _load_stats(self):
+        rows = self._connection().execute("SELECT namespace, hits, misses FROM cache_stats").fetchall()
+        return {namespace: {'hits': hits, 'misses': misses} for namespace, hits, misses in rows}
+
+    def _evict(self):
+        connection = self._connection()
+        count = connection.execute("SELECT count(*) FROM cache").fetchone()[0]
+        if count <= self.threshold:
+            return
+        self._flush_touches()
+        connection.execute("DELETE FROM cache WHERE expires != 0 AND expires <= ?", (time.time(),))
+        connection.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT "
+            "max(0, (SELECT count(*) FROM cache) - ?))", (self.threshold,)
+        )
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value, expires FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] and row[1] <= time.time()):
+            self._count(key, hit=False)
+            return None
+        self._count(key, hit=True)
+        self._touch(key)
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            return None
+
+    def set(self, key, value, timeout=None):
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expires(timeout), now)
+        )
+        self._sets += 1
+        if self._sets % EVICTION_CHECK_EVERY == 0:
+            self._evict()
+        return True
+
+    def add(self, key, value, timeout=None):
+        connection = self._connection()
+        connection.execute("DELETE FROM cache WHERE key = ? AND expires != 0 AND expires <= ?", (key, time.time()))
+        cursor = connection.execute(
+            "INSERT OR IGNORE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expires(timeout), time.time())
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        cursor = self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+        return cursor.rowcount == 1
+
+    def has(self, key):
+        row = self._connection().execute("SELECT expires FROM cache WHERE key = ?", (key,)).fetchone()
+        return row is not None and (not row[0] or row[0] > time.time())
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache")
+        return True
+
+
+class RedisStatsCache(CacheStatsMixin, RedisCache):
+    """RedisCache with per-namespace hit/miss counters stored in Redis hashes."""
+
+    def __init__(self, *args, **kwargs):
+        RedisCache.__init__(self, *args, **kwargs)
+        self._init_stats()
+
+    def _stats_key(self):
+        return f'{self.key_prefix}cache_stats'
+
+    def _store_stats(self, pending):
+        pipe = self._write_client.pipeline()
+        for namespace, (hits, misses) in pending.items():
+            pipe.hincrby(self._stats_key(), f'{namespace}:hits', hits)
+            pipe.hincrby(self._stats_key(), f'{namespace}:misses', misses)
+        pipe.execute()
+
+    def _load_stats(self):
+        stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+        for field, value in self._read_client.hgetall(self._stats_key()).items():
+            namespace, kind = field.decode().rsplit(':', 1)
+            stats[namespace][kind] = int(value)
+        return dict(stats)
+
+    def get(self, key):
+        value = RedisCache.get(self, key)
+        self._count(key, hit=value is not None)
+        return value
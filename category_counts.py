@@ -0,0 +1,180 @@
+"""Materialized article counts per (categoria, subcategoria, day).
+
+The badge counts on /, /posturas and /api/subcategories used to be a 4-5 table
+outer join with count(distinct) on every page view. They are now summed from
+public.conteo_categoria, which holds one row per day bucket:
+
+- article_count: distinct articles published that day (Articulo.fecha_publicacion).
+- postura_count: distinct events with parsed posturas dated that day
+  (Evento.fecha_evento, events without a date go to NULL_DAY); the same
+  events /api/posturas lists.
+
+Rows with subcategoria_id 0 hold the distinct count for the whole category, so
+articles linked to several subcategories are not counted twice. Since every
+article has a single publication day, summing day buckets gives the same
+distinct counts as the live query.
+
+refresh_counts() recomputes the recent days, any day with articles updated
+since the previous refresh and the `extra_days` it is given (map_builder.py
+passes the days of events whose posturas changed); refresh_counts(full=True)
+rebuilds everything.
+
+The incremental refresh only sees changes that leave a date behind. Linking
+an article to another event (articulo_evento), moving an event to another
+subcategory or a subcategory to another category, and changing an event's
+fecha_evento touch no timestamp, so older buckets keep the previous counts
+until the next full rebuild: map_builder.py runs one at startup and every
+COUNTS_FULL_REFRESH_HOURS (`--full-counts` with --once).
+"""
+import logging
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import delete, desc, distinct, func, insert, literal, select, union_all
+
+from database import db
+from models import Articulo, Categoria, ConteoCategoria, Evento, Subcategoria, articulo_evento
+
+logger = logging.getLogger(__name__)
+
+ALL_SUBCATEGORIES = 0
+NULL_DAY = datetime(1900, 1, 1).date()
+RECENT_DAYS = 4
+
+
+def window_days(start_date, end_date):
+    """Day buckets matching `Articulo.fecha_publicacion.between(start_date, end_date)`.
+
+    A date compares as its midnight, so the first included day is the first
+    midnight at or after start_date.
+    """
+    first_day = start_date.date()
+    if start_date.time() != time(0):
+        first_day += timedelta(days=1)
+    return first_day, end_date.date()
+
+
+def _count_selects(days):
+    article_day = Articulo.fecha_publicacion
+    event_day = func.coalesce(Evento.fecha_evento, NULL_DAY)
+
+    def articles(by_subcategory):
+        subcategory = Subcategoria.subcategoria_id if by_subcategory else literal(ALL_SUBCATEGORIES)
+        query = select(
+            article_day.label('fecha'),
+            Subcategoria.categoria_id.label('categoria_id'),
+            subcategory.label('subcategoria_id'),
+            func.count(distinct(Articulo.articulo_id)).label('article_count'),
+            literal(0).label('postura_count')
+        ).select_from(Articulo).join(
+            articulo_evento, articulo_evento.c.articulo_id == Articulo.articulo_id
+        ).join(
+            Evento, Evento.evento_id == articulo_evento.c.evento_id
+        ).join(
+            Subcategoria, Subcategoria.subcategoria_id == Evento.subcategoria_id
+        ).where(
+            article_day.isnot(None),
+            Subcategoria.categoria_id.isnot(None)
+        )
+        if days is not None:
+            query = query.where(article_day.in_(days))
+        keys = [article_day, Subcategoria.categoria_id] + ([subcategory] if by_subcategory else [])
+        return query.group_by(*keys)
+
+    def posturas(by_subcategory):
+        subcategory = Subcategoria.subcategoria_id if by_subcategory else literal(ALL_SUBCATEGORIES)
+        query = select(
+            event_day.label('fecha'),
+            Subcategoria.categoria_id.label('categoria_id'),
+            subcategory.label('subcategoria_id'),
+            literal(0).label('article_count'),
+            func.count(distinct(Evento.evento_id)).label('postura_count')
+        ).select_from(Evento).join(
+            Subcategoria, Subcategoria.subcategoria_id == Evento.subcategoria_id
+        ).where(
+            Evento.posturas.isnot(None),
+            Subcategoria.categoria_id.isnot(None)
+        )
+        if days is not None:
+            query = query.where(event_day.in_(days))
+        keys = [event_day, Subcategoria.categoria_id] + ([subcategory] if by_subcategory else [])
+        return query.group_by(*keys)
+
+    combined = union_all(articles(True), articles(False), posturas(True), posturas(False)).subquery()
+    return select(
+        combined.c.fecha,
+        combined.c.categoria_id,
+        combined.c.subcategoria_id,
+        func.sum(combined.c.article_count),
+        func.sum(combined.c.postura_count),
+        func.now()
+    ).group_by(combined.c.fecha, combined.c.categoria_id, combined.c.subcategoria_id)
+
+
+def _days_to_refresh(connection, now, extra_days=()):
+    last_refresh = connection.execute(select(func.max(ConteoCategoria.refreshed_on))).scalar()
+    days = {(now - timedelta(days=i)).date() for i in range(RECENT_DAYS)}
+    days.update(extra_days)
+    if last_refresh is not None:
+        updated_days = connection.execute(
+            select(distinct(Articulo.fecha_publicacion)).where(
+                Articulo.updated_on >= last_refresh - timedelta(minutes=5),
+                Articulo.fecha_publicacion.isnot(None)
+            )
+        ).scalars()
+        days.update(updated_days)
+    return sorted(days)
+
+
+def refresh_counts(connection, full=False, now=None, extra_days=()):
+    """Recompute the count buckets; returns the number of days refreshed (None for a full rebuild)."""
+    table = ConteoCategoria.__table__
+    days = None if full else _days_to_refresh(connection, now or datetime.now(), extra_days)
+
+    if days is None:
+        connection.execute(delete(table))
+    else:
+        connection.execute(delete(table).where(table.c.fecha.in_(days)))
+
+    connection.execute(insert(table).from_select(
+        ['fecha', 'categoria_id', 'subcategoria_id', 'article_count', 'postura_count', 'refreshed_on'],
+        _count_selects(days)
+    ))
+    logger.info(f"Conteos por categoría actualizados ({'completo' if days is None else f'{len(days)} días'})")
+    return None if days is None else len(days)
+
+
+def _bucket_sums(column, first_day=None, last_day=None, by_subcategory=False):
+    key = ConteoCategoria.subcategoria_id if by_subcategory else ConteoCategoria.categoria_id
+    query = select(key.label('id'), func.sum(column).label('total'))
+    if by_subcategory:
+        query = query.where(ConteoCategoria.subcategoria_id != ALL_SUBCATEGORIES)
+    else:
+        query = query.where(ConteoCategoria.subcategoria_id == ALL_SUBCATEGORIES)
+    if first_day is not None:
+        query = query.where(ConteoCategoria.fecha.between(first_day, last_day))
+    return query.group_by(key).subquery()
+
+
+def category_counts(column='article_count', start_date=None, end_date=None):
+    """Rows of (Categoria, <column>) ordered by count desc then name; no dates means all time."""
+    days = window_days(start_date, end_date) if start_date else (None, None)
+    sums = _bucket_sums(getattr(ConteoCategoria, column), *days)
+    count = func.coalesce(sums.c.total, 0).label(column)
+    return db.session.query(Categoria, count).outerjoin(
+        sums, sums.c.id == Categoria.categoria_id
+    ).order_by(desc(column), Categoria.nombre).all()
+
+
+def subcategory_counts(start_date, end_date, category_id=None):
+    """Subcategories (id, nombre, article_count) in the window, optionally for one category."""
+    sums = _bucket_sums(ConteoCategoria.article_count, *window_days(start_date, end_date), by_subcategory=True)
+    query = db.session.query(
+        Subcategoria.subcategoria_id.label('id'),
+        Subcategoria.nombre,
+        func.coalesce(sums.c.total, 0).label('article_count')
+    ).outerjoin(
+        sums, sums.c.id == Subcategoria.subcategoria_id
+    )
+    if category_id:
+        query = query.filter(Subcategoria.categoria_id == category_id)
+    return query.order_by(desc('article_count')).all()
@@ -0,0 +1,89 @@
+"""HTTP validators (ETag / Last-Modified) and Cache-Control for the /api views.
+
+Every /api response carries a weak ETag derived from the endpoint, its query
+string and a version of the data it reads: the map artefact version, the
+vector index manifest, articles_version() of the time window, which
+changes whenever an article of the window is added, removed or updated,
+posturas_version() of the events /api/posturas lists, or counts_version()
+of the materialized counts behind /api/subcategories.
+Requests whose If-None-Match (or If-Modified-Since) still matches get an
+empty 304 before the view runs, so a browser or a front proxy can revalidate
+repeat requests without the database doing the real query.
+
+max(updated_on) alone is not a valid Last-Modified for a time window: its
+start moves every bucket and drops articles without any updated_on changing.
+Windowed listings (window_version in app.py) send at least the start of the
+current bucket, so If-Modified-Since only matches within the same bucket.
+
+ETags are weak because the same representation may be sent gzip-encoded or
+not (see /api/mapa-data).
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from flask import request
+from sqlalchemy import String, cast, func, literal
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from database import db
+from models import Articulo, ConteoCategoria, Evento
+
+
+def articles_version(start=None, end=None):
+    """(version, last_modified) of the articles published in [start, end], or of all articles."""
+    query = db.session.query(func.count(Articulo.articulo_id), func.max(Articulo.updated_on))
+    if start is not None:
+        query = query.filter(Articulo.fecha_publicacion.between(start, end))
+    count, last_modified = query.one()
+    return f"{count}-{last_modified.isoformat() if last_modified else ''}", last_modified
+
+
+def posturas_version(first_day, last_day):
+    """Version of the events with posturas dated in [first_day, last_day].
+
+    Hashes each event's id with the md5 of its gpt_desinformacion, so it
+    changes when posturas are added, re-parsed or removed. Evento has no
+    timestamp, so edits to an event's title or description don't change it.
+    """
+    count, digest = db.session.query(
+        func.count(Evento.evento_id),
+        func.md5(func.string_agg(cast(Evento.evento_id, String) + ':' + Evento.posturas_md5,
+                                 aggregate_order_by(literal(','), Evento.evento_id)))
+    ).filter(
+        Evento.posturas.isnot(None),
+        Evento.fecha_evento.between(first_day, last_day)
+    ).one()
+    return f"{count}-{digest or ''}"
+
+
+def counts_version():
+    """Version of public.conteo_categoria: the time of its last refresh (see category_counts.py)."""
+    refreshed_on = db.session.query(func.max(ConteoCategoria.refreshed_on)).scalar()
+    return refreshed_on.isoformat() if refreshed_on else ''
+
+
+def make_etag(namespace, version):
+    """ETag of the current request's path and sorted query string for a data version."""
+    query = urlencode(sorted(request.args.items(multi=True)))
+    key = f'{namespace}|{request.path}?{query}|{version}'
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]
+
+
+def is_not_modified(etag, last_modified=None):
+    """Whether the request's validators still match (If-None-Match wins over If-Modified-Since)."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified and request.if_modified_since:
+        # HTTP dates have no sub-second part
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def set_validators(response, etag, last_modified=None, max_age=0):
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.vary.add('Accept-Encoding')
+    return response
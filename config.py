@@ -9,11 +9,133 @@ class Config:
         db_url = db_url.replace('postgres://', 'postgresql://', 1)
 
     SQLALCHEMY_DATABASE_URI = db_url
+
+    # Optional streaming replica for the reads of GET requests and map builds,
+    # with fallback to the primary while it lags more than REPLICA_MAX_LAG_SECONDS
+    # (checked every REPLICA_CHECK_SECONDS). See replicas.py.
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    if replica_url and replica_url.startswith('postgres://'):
+        replica_url = replica_url.replace('postgres://', 'postgresql://', 1)
+    SQLALCHEMY_BINDS = {'replica': replica_url} if replica_url else {}
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 10))
+    REPLICA_CHECK_SECONDS = float(os.environ.get('REPLICA_CHECK_SECONDS', 5))
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
         "pool_recycle": 300,
-        "pool_pre_ping": True,
-        "pool_size": 10,
-        "max_overflow": 20,
         "pool_timeout": 30
     }
+
+    # Connection pools (see db_pool.py). 'queue' sizes each worker's pool so
+    # WEB_CONCURRENCY workers x WEB_THREADS threads fit in DB_MAX_CONNECTIONS,
+    # keeping DB_RESERVED_CONNECTIONS for map_builder.py, migrations and psql;
+    # 'pgbouncer' opens a connection per checkout and leaves pooling to PgBouncer.
+    DB_POOL_MODE = os.environ.get('DB_POOL_MODE', 'queue')
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', 8))
+    DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 100))
+    DB_RESERVED_CONNECTIONS = int(os.environ.get('DB_RESERVED_CONNECTIONS', 10))
+    DB_POOL_SIZE = int(os.environ['DB_POOL_SIZE']) if os.environ.get('DB_POOL_SIZE') else None
+    DB_MAX_OVERFLOW = int(os.environ['DB_MAX_OVERFLOW']) if os.environ.get('DB_MAX_OVERFLOW') else None
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'false').lower() == 'true'
+    # Of the WEB_THREADS of an ASGI worker (asgi.py), those reserved for the
+    # map endpoints, so slow builds don't hold up the fast ones
+    ASGI_HEAVY_THREADS = int(os.environ.get('ASGI_HEAVY_THREADS', 2))
+    # Requests each lane queues beyond its busy threads before answering 503
+    ASGI_QUEUE_LIMIT = int(os.environ.get('ASGI_QUEUE_LIMIT', 64))
+    ASGI_HEAVY_QUEUE_LIMIT = int(os.environ.get('ASGI_HEAVY_QUEUE_LIMIT', 4))
+
+    # Allowed ?time_filter= values. Windows end at the next TIME_BUCKET_SECONDS
+    # boundary so requests within a bucket share queries and cache entries
+    # (see time_window.py).
+    TIME_FILTERS = os.environ.get('TIME_FILTERS', '24h,48h,72h').split(',')
+    TIME_BUCKET_SECONDS = int(os.environ.get('TIME_BUCKET_SECONDS', 300))
+
+    # /api/articles pages: events per page (?limit= up to the maximum) and
+    # articles returned per event
+    ARTICLES_PAGE_SIZE = int(os.environ.get('ARTICLES_PAGE_SIZE', 20))
+    ARTICLES_MAX_PAGE_SIZE = int(os.environ.get('ARTICLES_MAX_PAGE_SIZE', 100))
+    ARTICLES_PER_EVENT = int(os.environ.get('ARTICLES_PER_EVENT', 50))
+
+    # 'binary' reads embeddings from the float32 sidecar tables (falling back to
+    # the text column for rows not synced yet); 'text' always parses the strings.
+    EMBEDDING_STORAGE = os.environ.get('EMBEDDING_STORAGE', 'binary')
+
+    # 'incremental' keeps the previous map coordinates and only places new
+    # articles, with a full t-SNE refit every MAP_FULL_REFIT_HOURS; 'full'
+    # refits on every build.
+    MAP_LAYOUT_MODE = os.environ.get('MAP_LAYOUT_MODE', 'incremental')
+    MAP_FULL_REFIT_HOURS = int(os.environ.get('MAP_FULL_REFIT_HOURS', 24))
+
+    # Dimensionality reduction for the map: 'tsne', 'umap' or 'random_projection'
+    # (overridable per request with ?reducer=). See mapa/reducers.py.
+    MAP_REDUCER = os.environ.get('MAP_REDUCER', 'tsne')
+    MAP_PCA_COMPONENTS = int(os.environ.get('MAP_PCA_COMPONENTS', 50))
+
+    # Map artefacts are built by map_builder.py and only streamed by the web app.
+    # MAP_ARTIFACT_STORE is 'db' (public.mapa_artefacto) or 'fs' (MAP_ARTIFACT_DIR).
+    MAP_ARTIFACT_STORE = os.environ.get('MAP_ARTIFACT_STORE', 'db')
+    MAP_ARTIFACT_DIR = os.environ.get('MAP_ARTIFACT_DIR', '/tmp/mapa_artefactos')
+    MAP_ARTIFACT_KEEP = int(os.environ.get('MAP_ARTIFACT_KEEP', 5))
+    MAP_TIME_FILTERS = TIME_FILTERS
+    MAP_BUILD_REDUCERS = os.environ.get('MAP_BUILD_REDUCERS', MAP_REDUCER).split(',')
+    MAP_BUILD_INTERVAL_MINUTES = int(os.environ.get('MAP_BUILD_INTERVAL_MINUTES', 60))
+    # Build inside the request when no artefact exists yet (e.g. no builder running)
+    MAP_BUILD_ON_MISS = os.environ.get('MAP_BUILD_ON_MISS', 'true').lower() == 'true'
+    # Processes per web worker for the CPU-bound stages of those builds (0: in
+    # the request thread)
+    MAP_BUILD_PROCESSES = int(os.environ.get('MAP_BUILD_PROCESSES', 1))
+    # Profile every map build with cProfile (see mapa/profiling.py); single
+    # builds can also be profiled with map_builder.py --profile or by an admin
+    MAP_PROFILE = os.environ.get('MAP_PROFILE', 'false').lower() == 'true'
+    MAP_PROFILE_DIR = os.environ.get('MAP_PROFILE_DIR', '/tmp/mapa_perfiles')
+    MAP_PROFILE_KEEP = int(os.environ.get('MAP_PROFILE_KEEP', 20))
+
+    # Nearest-neighbour index over Articulo.embeddings for related articles and
+    # semantic search (see vector_index.py), refreshed by map_builder.py
+    VECTOR_INDEX_DIR = os.environ.get('VECTOR_INDEX_DIR', '/tmp/clickbait_vectors')
+    VECTOR_INDEX_NPROBE = int(os.environ.get('VECTOR_INDEX_NPROBE', 8))
+    VECTOR_INDEX_REFRESH_MINUTES = int(os.environ.get('VECTOR_INDEX_REFRESH_MINUTES', 5))
+
+    # Materialized category counts (see category_counts.py), refreshed by map_builder.py.
+    # Event relinks and subcategory moves are only picked up by the full rebuild
+    COUNTS_REFRESH_MINUTES = int(os.environ.get('COUNTS_REFRESH_MINUTES', 5))
+    COUNTS_FULL_REFRESH_HOURS = int(os.environ.get('COUNTS_FULL_REFRESH_HOURS', 24))
+
+    # Events per /api/posturas page, and how often map_builder.py parses new
+    # gpt_desinformacion strings into Evento.posturas (see posturas.py)
+    POSTURAS_PAGE_SIZE = int(os.environ.get('POSTURAS_PAGE_SIZE', 20))
+    POSTURAS_REFRESH_MINUTES = int(os.environ.get('POSTURAS_REFRESH_MINUTES', 5))
+
+    # Per-worker LRU of article details for the article modal, checked against
+    # Articulo.updated_on on every lookup (see article_details.py)
+    ARTICLE_DETAIL_CACHE_SIZE = int(os.environ.get('ARTICLE_DETAIL_CACHE_SIZE', 2048))
+
+    # Cache-Control max-age (seconds) of each /api endpoint. After it expires,
+    # browsers and proxies revalidate with If-None-Match (see conditional.py).
+    API_MAX_AGE = {
+        'api_articles': 60,
+        'api_posturas': 60,
+        'api_subcategories': 60,
+        'api_search': 60,
+        'api_mapa_data': 300,
+        'api_article': 3600,
+        'api_articles_batch': 3600,
+        'api_related': 300,
+    }
+
+    # Per-endpoint request metrics served at /metrics, one snapshot file per
+    # worker in METRICS_DIR, and the threshold for logging slow SQL statements
+    # (see instrumentation.py). Scrapers send METRICS_TOKEN as a bearer token;
+    # without it /metrics is only readable by admins
+    METRICS_DIR = os.environ.get('METRICS_DIR', '/tmp/clickbait_metrics')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 200))
+
+    # Shared cross-process cache (see cache_backends.py). Use
+    # CACHE_TYPE=cache_backends.RedisStatsCache with CACHE_REDIS_URL for several hosts.
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'cache_backends.SQLiteLRUCache')
+    CACHE_DIR = os.environ.get('CACHE_DIR', '/tmp/clickbait_cache')
+    CACHE_THRESHOLD = int(os.environ.get('CACHE_THRESHOLD', 5000))
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))
+    CACHE_KEY_PREFIX = 'clickbait:'
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
@@ -1,3 +1,18 @@
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from db_pool import configure_pool
+from replicas import RoutingSession
+
+# Reads may go to the replica bind, see replicas.py
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def create_db_app(name):
+    """Bare app with only config and the database, for CLI tools and background workers."""
+    app = Flask(name)
+    app.config.from_object('config.Config')
+    # One thread, which may hold a session and a raw connection at once
+    configure_pool(app, workers=1, threads=2)
+    db.init_app(app)
+    return app
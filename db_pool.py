@@ -0,0 +1,161 @@
+"""Connection pool sizing and checkout timing for the database engines.
+
+SQLALCHEMY_ENGINE_OPTIONS only holds what doesn't depend on the deployment;
+configure_pool() fills in the pool before db.init_app():
+
+- DB_POOL_MODE='queue' (default): a QueuePool per worker process, sized so
+  that WEB_CONCURRENCY workers stay within DB_MAX_CONNECTIONS minus
+  DB_RESERVED_CONNECTIONS (map_builder.py, migrations, psql...). Each worker
+  keeps one connection per WEB_THREADS thread and may open overflow
+  connections with whatever is left of its share, up to as many again.
+  DB_POOL_SIZE / DB_MAX_OVERFLOW override the computed values.
+- DB_POOL_MODE='pgbouncer': DATABASE_URL points at PgBouncer (transaction
+  pooling), which does the pooling server side; the app opens a connection
+  per checkout (NullPool) and keeps none idle.
+
+Pre-ping is off unless DB_POOL_PRE_PING=true: it costs a round trip per
+checkout. Connections are recycled after pool_recycle seconds, and a
+disconnect error invalidates the whole pool, so after a database restart
+only the statements that were in flight fail.
+
+Both pool classes time Pool.connect(), i.e. how long a thread waited for a
+connection (including opening it). Per bind, /metrics gets checkouts,
+timeouts and the total wait next to the size/checked out/overflow gauges,
+and instrumentation.py keeps a histogram of the waits per endpoint.
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+_checkout_listeners = []
+
+
+def add_checkout_listener(listener):
+    """listener(pool, seconds) is called after every successful checkout."""
+    if listener not in _checkout_listeners:
+        _checkout_listeners.append(listener)
+
+
+class _TimedPool:
+    """Counts checkouts, timeouts and the seconds spent waiting in connect()."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+                self.wait_seconds += time.perf_counter() - started
+            raise
+        seconds = time.perf_counter() - started
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_seconds += seconds
+        for listener in _checkout_listeners:
+            listener(self, seconds)
+        return connection
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    def limit(self):
+        return self.size() + max(self._max_overflow, 0)
+
+
+class TimedNullPool(_TimedPool, NullPool):
+    """NullPool that also counts the connections currently checked out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_use = 0
+
+    def _do_get(self):
+        record = super()._do_get()
+        with self._stats_lock:
+            self.in_use += 1
+        return record
+
+    def _do_return_conn(self, record):
+        with self._stats_lock:
+            self.in_use -= 1
+        super()._do_return_conn(record)
+
+
+def pool_limits(max_connections, reserved, workers, threads):
+    """(pool_size, max_overflow) of one worker process."""
+    share = max((max_connections - reserved) // max(workers, 1), 1)
+    pool_size = min(threads, share)
+    return pool_size, max(min(threads, share - pool_size), 0)
+
+
+def engine_options(config, workers, threads):
+    """SQLALCHEMY_ENGINE_OPTIONS with the pool of a process running `threads` threads."""
+    options = dict(config['SQLALCHEMY_ENGINE_OPTIONS'])
+    if config['DB_POOL_MODE'] == 'pgbouncer':
+        for key in ('pool_size', 'max_overflow', 'pool_timeout', 'pool_pre_ping'):
+            options.pop(key, None)
+        options['poolclass'] = TimedNullPool
+        return options
+    if config['DB_POOL_MODE'] != 'queue':
+        raise ValueError(f"Unknown DB_POOL_MODE: {config['DB_POOL_MODE']}")
+
+    pool_size, max_overflow = pool_limits(config['DB_MAX_CONNECTIONS'], config['DB_RESERVED_CONNECTIONS'],
+                                          workers, threads)
+    if config['DB_POOL_SIZE'] is not None:
+        pool_size = config['DB_POOL_SIZE']
+    if config['DB_MAX_OVERFLOW'] is not None:
+        max_overflow = config['DB_MAX_OVERFLOW']
+    options.setdefault('pool_size', pool_size)
+    options.setdefault('max_overflow', max_overflow)
+    options.setdefault('pool_pre_ping', config['DB_POOL_PRE_PING'])
+    options['poolclass'] = TimedQueuePool
+    return options
+
+
+def configure_pool(app, workers=None, threads=None):
+    """Set SQLALCHEMY_ENGINE_OPTIONS of `app`; defaults to WEB_CONCURRENCY workers of WEB_THREADS threads."""
+    workers = workers or app.config['WEB_CONCURRENCY']
+    threads = threads or app.config['WEB_THREADS']
+    options = engine_options(app.config, workers, threads)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    if options['poolclass'] is TimedNullPool:
+        logger.info("Pool de conexiones: modo pgbouncer (una conexión por checkout)")
+    else:
+        logger.info(f"Pool de conexiones: {options['pool_size']} + {options['max_overflow']} overflow "
+                    f"({workers} workers x {threads} threads, máximo {app.config['DB_MAX_CONNECTIONS']})")
+    return options
+
+
+def pool_samples(bind, pool):
+    """Collector samples (see instrumentation.py) of one engine's pool."""
+    labels = f'bind="{bind}"'
+    if isinstance(pool, TimedQueuePool):
+        samples = [
+            ('gauge', 'db_pool_size', labels, pool.size()),
+            ('gauge', 'db_pool_limit', labels, pool.limit()),
+            ('gauge', 'db_pool_checked_out', labels, pool.checkedout()),
+            ('gauge', 'db_pool_overflow', labels, max(pool.overflow(), 0)),
+        ]
+    elif isinstance(pool, TimedNullPool):
+        samples = [('gauge', 'db_pool_checked_out', labels, pool.in_use)]
+    else:
+        return []
+    with pool._stats_lock:
+        samples.extend([
+            ('counter', 'db_pool_checkouts_total', labels, pool.checkouts),
+            ('counter', 'db_pool_checkout_timeouts_total', labels, pool.timeouts),
+            ('counter', 'db_pool_checkout_wait_seconds_total', labels, pool.wait_seconds),
+        ])
+    return samples
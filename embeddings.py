@@ -0,0 +1,169 @@
+"""Binary float32 storage for the embedding columns.
+
+The ingest pipeline writes embeddings as Postgres array literals ('{0.1,0.2,...}')
+into text columns. Parsing those strings on every map build is slow, so a copy
+is kept as little-endian float32 bytes in the *_embedding sidecar tables and
+decoded with np.frombuffer, which does not copy the data.
+"""
+import logging
+from statistics import mode
+
+import numpy as np
+from sqlalchemy import case, func, null, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from models import (Articulo, Evento, Subcategoria, ArticuloEmbedding,
+                    EventoEmbedding, SubcategoriaEmbedding)
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DTYPE = np.dtype('<f4')
+
+# (source model, sidecar model, key column, embedding columns, version column of
+# the sidecar, its value in the source). A copy is stale when the versions
+# differ: Articulo has updated_on, eventos and subcategorías don't, so their
+# copies keep the md5 of the text they were made from.
+SIDECARS = [
+    (Articulo, ArticuloEmbedding, 'articulo_id', ('embeddings', 'palabras_clave_embeddings'),
+     'updated_on', Articulo.__table__.c.updated_on),
+    (Evento, EventoEmbedding, 'evento_id', ('embeddings',),
+     'fuente_md5', func.md5(Evento.__table__.c.embeddings)),
+    (Subcategoria, SubcategoriaEmbedding, 'subcategoria_id', ('palabras_clave_embeddings',),
+     'fuente_md5', func.md5(Subcategoria.__table__.c.palabras_clave_embeddings)),
+]
+
+
+def parse_embedding_text(text):
+    """Parse a '{...}' / '[...]' embedding string into a float32 vector (empty on failure)."""
+    if text is None or not isinstance(text, str):
+        return np.array([], dtype=EMBEDDING_DTYPE)
+    try:
+        return np.fromstring(text.strip().strip('{}[]'), sep=',').astype(EMBEDDING_DTYPE)
+    except Exception:
+        return np.array([], dtype=EMBEDDING_DTYPE)
+
+
+def encode_embedding(values):
+    """Encode a vector (or embedding string) as float32 bytes; None if empty."""
+    if isinstance(values, str):
+        values = parse_embedding_text(values)
+    if values is None:
+        return None
+    array = np.asarray(values, dtype=EMBEDDING_DTYPE)
+    if array.size == 0:
+        return None
+    return array.tobytes()
+
+
+def decode_embedding(blob):
+    """Zero-copy view of a float32 blob as a numpy vector."""
+    if blob is None:
+        return np.array([], dtype=EMBEDDING_DTYPE)
+    return np.frombuffer(blob, dtype=EMBEDDING_DTYPE)
+
+
+def embedding_columns(text_column, binary_column):
+    """Select the binary copy, and the text column only for rows that have no copy yet.
+
+    Returns two labelled columns, 'embedding_bin' and 'embedding_text', to be
+    decoded with row_embedding().
+    """
+    return (
+        binary_column.label('embedding_bin'),
+        case((binary_column.is_(None), text_column), else_=null()).label('embedding_text'),
+    )
+
+
+def add_articulo_embedding(query, column='palabras_clave_embeddings', storage='binary'):
+    """Add embedding_bin/embedding_text columns for Articulo.<column> to an Articulo query."""
+    text_column = getattr(Articulo, column)
+    if storage == 'text':
+        return query.add_columns(null().label('embedding_bin'), text_column.label('embedding_text'))
+    return query.add_columns(
+        *embedding_columns(text_column, getattr(ArticuloEmbedding, column))
+    ).outerjoin(
+        ArticuloEmbedding, ArticuloEmbedding.articulo_id == Articulo.articulo_id
+    )
+
+
+def row_embedding(binary, text):
+    """Decode a row selected with embedding_columns()."""
+    if binary is not None:
+        return decode_embedding(binary)
+    return parse_embedding_text(text)
+
+
+def stack_embeddings(vectors):
+    """Stack vectors into a float32 matrix, padding/trimming to the most common length."""
+    lengths = [len(v) for v in vectors]
+    target_length = mode(lengths)
+    if all(length == target_length for length in lengths):
+        return np.vstack(vectors).astype(EMBEDDING_DTYPE, copy=False)
+
+    matrix = np.zeros((len(vectors), target_length), dtype=EMBEDDING_DTYPE)
+    for i, vector in enumerate(vectors):
+        n = min(len(vector), target_length)
+        matrix[i, :n] = vector[:n]
+    return matrix
+
+
+def _sync_sidecar(connection, source, sidecar, key, columns, version, source_version, batch_size):
+    source_table = source.__table__
+    sidecar_table = sidecar.__table__
+    source_key = source_table.c[key]
+    sidecar_key = sidecar_table.c[key]
+
+    stale = [sidecar_key.is_(None), sidecar_table.c[version].is_distinct_from(source_version)]
+    selected = [source_key] + [source_table.c[c] for c in columns] + [source_version.label(version)]
+
+    total = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(*selected)
+            .select_from(source_table.outerjoin(sidecar_table, sidecar_key == source_key))
+            .where(
+                source_key > last_id,
+                or_(*stale),
+                or_(*[source_table.c[c].isnot(None) for c in columns])
+            )
+            .order_by(source_key)
+            .limit(batch_size)
+        ).mappings().all()
+
+        if not rows:
+            break
+
+        values = []
+        for row in rows:
+            value = {key: row[key]}
+            for column in columns:
+                value[column] = encode_embedding(row[column])
+            value[version] = row[version]
+            values.append(value)
+
+        stmt = pg_insert(sidecar_table).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[sidecar_key],
+            set_={c: stmt.excluded[c] for c in values[0] if c != key}
+        )
+        connection.execute(stmt)
+
+        last_id = rows[-1][key]
+        total += len(rows)
+
+    return total
+
+
+def sync_embeddings(connection, batch_size=500):
+    """Copy new or changed text embeddings into the binary sidecar tables.
+
+    Safe to run repeatedly: only rows without an up-to-date copy are touched.
+    Returns the number of rows written per sidecar table.
+    """
+    written = {}
+    for source, sidecar, key, columns, version, source_version in SIDECARS:
+        written[sidecar.__tablename__] = _sync_sidecar(connection, source, sidecar, key, columns,
+                                                       version, source_version, batch_size)
+    logger.info(f"Embeddings binarios sincronizados: {written}")
+    return written
@@ -0,0 +1,259 @@
+"""Per-endpoint request metrics and slow-query logging, exported at /metrics.
+
+SQLAlchemy cursor events time every statement and Flask's request signals
+attribute them to the view (request.endpoint) that ran them, so for each
+endpoint we keep:
+
+    clickbait_requests_total{endpoint,status}
+    clickbait_request_seconds            histogram of wall time in the view
+    clickbait_request_queries            histogram of SQL statements per request
+    clickbait_request_db_seconds_total   time inside cursor.execute
+    clickbait_request_python_seconds_total  the rest: numpy/sklearn, serialization...
+    clickbait_response_bytes_total       body size (streamed bodies count as 0)
+    clickbait_db_checkout_seconds        histogram of waits for a pool connection
+
+Statements slower than SLOW_QUERY_MS are logged with the endpoint that ran
+them, also outside requests (map_builder.py).
+
+Every worker process keeps its own counters and writes a snapshot to
+METRICS_DIR/<pid>.json at most every FLUSH_SECONDS; /metrics sums the
+snapshots of all workers (the same idea as the cache stats in
+cache_backends.py), so any worker can answer a scrape. Scrapes need the
+METRICS_TOKEN bearer token (or an admin session).
+
+Other modules add process-level metrics with RequestMetrics.add_collector()
+(e.g. the connection pools of each database bind, see replicas.py).
+Collected gauges are summed over workers too, except those in MAX_GAUGES,
+and only taken from snapshots newer than GAUGE_MAX_AGE (so exited workers
+stop counting; their counters are kept).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app, g, has_request_context, request, request_finished, request_started
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from db_pool import add_checkout_listener
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'clickbait'
+FLUSH_SECONDS = 10
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+HISTOGRAMS = {'request_seconds': SECONDS_BUCKETS, 'request_queries': QUERY_BUCKETS,
+              'db_checkout_seconds': CHECKOUT_BUCKETS}
+COUNTERS = ('request_db_seconds_total', 'request_python_seconds_total', 'response_bytes_total')
+# Collected gauges where the worst worker matters, not the total
+MAX_GAUGES = {'db_replica_lag_seconds'}
+GAUGE_MAX_AGE = 5 * FLUSH_SECONDS
+
+_slow_query_ms = 200
+
+
+def _endpoint():
+    return request.endpoint or 'unknown'
+
+
+class RequestMetrics:
+    """Counters and histograms of this process, keyed by endpoint."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._requests = defaultdict(int)  # (endpoint, status) -> n
+        self._counters = {name: defaultdict(float) for name in COUNTERS}
+        # name -> endpoint -> [bucket counts..., +Inf count, sum]
+        self._histograms = {name: {} for name in HISTOGRAMS}
+        self._collectors = []
+        self._last_flush = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+
+    def add_collector(self, collect):
+        """collect() returns [(kind, metric, labels, value)], kind 'counter' or 'gauge', labels like 'bind="x"'."""
+        self._collectors.append(collect)
+
+    def _collect(self):
+        collected = []
+        for collect in self._collectors:
+            try:
+                collected.extend([list(sample) for sample in collect()])
+            except Exception as e:
+                logger.error(f"Error collecting metrics: {str(e)}")
+        return collected
+
+    def _observe(self, name, endpoint, value):
+        buckets = HISTOGRAMS[name]
+        counts = self._histograms[name].setdefault(endpoint, [0] * (len(buckets) + 2))
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-2] += 1
+        counts[-1] += value
+
+    def record(self, endpoint, status, seconds, db_seconds, queries, size):
+        with self._lock:
+            self._requests[(endpoint, status)] += 1
+            self._observe('request_seconds', endpoint, seconds)
+            self._observe('request_queries', endpoint, queries)
+            self._counters['request_db_seconds_total'][endpoint] += db_seconds
+            self._counters['request_python_seconds_total'][endpoint] += max(seconds - db_seconds, 0)
+            self._counters['response_bytes_total'][endpoint] += size
+            due = time.monotonic() - self._last_flush >= FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def observe_checkout(self, endpoint, seconds):
+        with self._lock:
+            self._observe('db_checkout_seconds', endpoint, seconds)
+
+    def snapshot(self):
+        collected = self._collect()
+        with self._lock:
+            return {
+                'requests': [[endpoint, status, n] for (endpoint, status), n in self._requests.items()],
+                'counters': {name: dict(values) for name, values in self._counters.items()},
+                'histograms': {name: {e: list(c) for e, c in values.items()}
+                               for name, values in self._histograms.items()},
+                'collected': collected
+            }
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        try:
+            with open(f'{path}.tmp', 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(f'{path}.tmp', path)
+        except OSError as e:
+            logger.error(f"Error writing metrics snapshot: {str(e)}")
+
+    def _merged(self):
+        """Snapshots of every worker, summed."""
+        self.flush()
+        requests = defaultdict(int)
+        counters = {name: defaultdict(float) for name in COUNTERS}
+        histograms = {name: {} for name in HISTOGRAMS}
+        collected = {}  # (kind, metric, labels) -> value
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                path = os.path.join(self.directory, name)
+                with open(path) as f:
+                    snapshot = json.load(f)
+                fresh = time.time() - os.path.getmtime(path) <= GAUGE_MAX_AGE
+            except (OSError, ValueError):
+                continue
+            for endpoint, status, n in snapshot['requests']:
+                requests[(endpoint, status)] += n
+            for metric, values in snapshot['counters'].items():
+                for endpoint, value in values.items():
+                    counters[metric][endpoint] += value
+            for metric, values in snapshot['histograms'].items():
+                for endpoint, counts in values.items():
+                    total = histograms[metric].setdefault(endpoint, [0] * len(counts))
+                    for i, value in enumerate(counts):
+                        total[i] += value
+            for kind, metric, labels, value in snapshot.get('collected', []):
+                if kind == 'gauge' and not fresh:
+                    continue
+                key = (kind, metric, labels)
+                if metric in MAX_GAUGES:
+                    collected[key] = max(collected.get(key, value), value)
+                else:
+                    collected[key] = collected.get(key, 0) + value
+        return requests, counters, histograms, collected
+
+    def render(self):
+        """All workers' metrics in the Prometheus text exposition format."""
+        requests, counters, histograms, collected = self._merged()
+        lines = [f'# TYPE {PREFIX}_requests_total counter']
+        for (endpoint, status), n in sorted(requests.items()):
+            lines.append(f'{PREFIX}_requests_total{{endpoint="{endpoint}",status="{status}"}} {n}')
+        for metric in COUNTERS:
+            lines.append(f'# TYPE {PREFIX}_{metric} counter')
+            for endpoint, value in sorted(counters[metric].items()):
+                lines.append(f'{PREFIX}_{metric}{{endpoint="{endpoint}"}} {value:g}')
+        for metric, buckets in HISTOGRAMS.items():
+            lines.append(f'# TYPE {PREFIX}_{metric} histogram')
+            for endpoint, counts in sorted(histograms[metric].items()):
+                for bound, count in zip(buckets, counts):
+                    lines.append(f'{PREFIX}_{metric}_bucket{{endpoint="{endpoint}",le="{bound:g}"}} {count}')
+                lines.append(f'{PREFIX}_{metric}_bucket{{endpoint="{endpoint}",le="+Inf"}} {counts[-2]}')
+                lines.append(f'{PREFIX}_{metric}_sum{{endpoint="{endpoint}"}} {counts[-1]:g}')
+                lines.append(f'{PREFIX}_{metric}_count{{endpoint="{endpoint}"}} {counts[-2]}')
+        typed = set()
+        for (kind, metric, labels), value in sorted(collected.items(), key=lambda item: item[0][1:]):
+            if metric not in typed:
+                lines.append(f'# TYPE {PREFIX}_{metric} {kind}')
+                typed.add(metric)
+            lines.append(f'{PREFIX}_{metric}{{{labels}}} {value:g}' if labels else f'{PREFIX}_{metric} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop('query_started', time.perf_counter())
+    endpoint = None
+    if has_request_context() and 'metrics_started' in g:
+        g.metrics_queries += 1
+        g.metrics_db_seconds += elapsed
+        endpoint = _endpoint()
+    if elapsed * 1000 >= _slow_query_ms:
+        logger.warning(f"Slow query ({elapsed * 1000:.0f} ms, {endpoint or 'no request'}): "
+                       f"{' '.join(statement.split())[:500]}")
+
+
+def _request_started(sender, **extra):
+    g.metrics_started = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_db_seconds = 0.0
+
+
+def _request_finished(sender, response, **extra):
+    if 'metrics_started' not in g or request.endpoint == 'main.metrics':
+        return
+    sender.extensions['request_metrics'].record(
+        _endpoint(),
+        response.status_code,
+        time.perf_counter() - g.metrics_started,
+        g.metrics_db_seconds,
+        g.metrics_queries,
+        response.content_length or 0
+    )
+
+
+
+def _checkout_finished(pool, seconds):
+    if has_request_context() and 'metrics_started' in g:
+        current_app.extensions['request_metrics'].observe_checkout(_endpoint(), seconds)
+
+
+def init_query_logging(slow_query_ms):
+    """Time every SQL statement and log the slow ones (also used without Flask requests)."""
+    global _slow_query_ms
+    _slow_query_ms = slow_query_ms
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_instrumentation(app):
+    """Record per-endpoint metrics for `app`; returns the RequestMetrics behind /metrics."""
+    init_query_logging(app.config['SLOW_QUERY_MS'])
+    metrics = RequestMetrics(app.config['METRICS_DIR'])
+    app.extensions['request_metrics'] = metrics
+    request_started.connect(_request_started, app)
+    request_finished.connect(_request_finished, app)
+    add_checkout_listener(_checkout_finished)
+    return metrics
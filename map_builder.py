@@ -0,0 +1,121 @@
+"""Standalone map builder process.
+
+Builds the /api/mapa-data artefacts for every window in MAP_TIME_FILTERS and
+reducer in MAP_BUILD_REDUCERS, and writes them to the shared artefact store
+that the web workers read from. It also keeps the materialized category
+counts (category_counts.py), the article vector index (vector_index.py) and
+the parsed event posturas (posturas.py) fresh. Run one instance alongside
+the web server:
+
+    python map_builder.py            # maps every MAP_BUILD_INTERVAL_MINUTES,
+                                     # counts every COUNTS_REFRESH_MINUTES
+                                     # (full rebuild at startup and every
+                                     # COUNTS_FULL_REFRESH_HOURS),
+                                     # vectors every VECTOR_INDEX_REFRESH_MINUTES,
+                                     # posturas every POSTURAS_REFRESH_MINUTES
+    python map_builder.py --once     # single pass, e.g. from cron
+    python map_builder.py --once --full-counts   # ... rebuilding all the counts
+    python map_builder.py --time-filter 72h --profile   # one profiled build
+"""
+import argparse
+import logging
+import time
+
+from category_counts import refresh_counts
+from database import create_db_app, db
+from instrumentation import init_query_logging
+from mapa.artifacts import get_artifact_store
+from mapa.builder import build_all, build_and_store, resolve_reducer
+from posturas import normalize_posturas
+from replicas import init_replicas, replica_reads
+from vector_index import VectorIndexWriter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def refresh_category_counts(full=False):
+    try:
+        with db.engine.begin() as connection:
+            refresh_counts(connection, full=full)
+    except Exception as e:
+        logger.error(f"Error refreshing category counts: {str(e)}")
+
+
+def refresh_vector_index(writer, config):
+    try:
+        writer.refresh(config)
+    except Exception as e:
+        logger.error(f"Error refreshing vector index: {str(e)}", exc_info=True)
+        db.session.rollback()
+
+
+def refresh_posturas():
+    try:
+        with db.engine.begin() as connection:
+            parsed, failed, days = normalize_posturas(connection)
+            # Postura badges count parsed events, which doesn't touch articulo.updated_on
+            if days:
+                refresh_counts(connection, extra_days=days)
+    except Exception as e:
+        logger.error(f"Error normalizing posturas: {str(e)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build precomputed map artefacts')
+    parser.add_argument('--once', action='store_true', help='Build once and exit')
+    parser.add_argument('--time-filter', help='Only build this window (implies --once)')
+    parser.add_argument('--full-counts', action='store_true',
+                        help='With --once, rebuild all the category counts instead of the recent days')
+    parser.add_argument('--reducer', help='Reducer for --time-filter (default MAP_REDUCER)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile the map builds into MAP_PROFILE_DIR (see mapa/profiling.py)')
+    args = parser.parse_args(argv)
+
+    app = create_db_app(__name__)
+    init_query_logging(app.config['SLOW_QUERY_MS'])
+    # Map and vector index reads go to DATABASE_REPLICA_URL when set; writes stay on the primary
+    init_replicas(app, web=False)
+    if args.profile:
+        app.config['MAP_PROFILE'] = True
+    with app.app_context(), replica_reads():
+        store = get_artifact_store(app.config)
+        vectors = VectorIndexWriter(app.config['VECTOR_INDEX_DIR'])
+
+        if args.time_filter:
+            build_and_store(store, args.time_filter, resolve_reducer(app.config, args.reducer), app.config)
+            return
+
+        # (name, interval in seconds, task); the full counts rebuild runs at
+        # startup too, it is the only one that sees event relinks and
+        # subcategory moves (see category_counts.py)
+        tasks = [
+            ('mapas', app.config['MAP_BUILD_INTERVAL_MINUTES'] * 60, lambda: build_all(store, app.config)),
+            ('conteos', app.config['COUNTS_REFRESH_MINUTES'] * 60, refresh_category_counts),
+            ('conteos completos', app.config['COUNTS_FULL_REFRESH_HOURS'] * 3600,
+             lambda: refresh_category_counts(full=True)),
+            ('vectores', app.config['VECTOR_INDEX_REFRESH_MINUTES'] * 60,
+             lambda: refresh_vector_index(vectors, app.config)),
+            ('posturas', app.config['POSTURAS_REFRESH_MINUTES'] * 60, refresh_posturas),
+        ]
+        now = time.monotonic()
+        next_run = [now] * len(tasks)
+        while True:
+            for i, (name, interval, task) in enumerate(tasks):
+                due = time.monotonic() >= next_run[i]
+                if args.once:
+                    due = name != ('conteos' if args.full_counts else 'conteos completos')
+                if due:
+                    started = time.monotonic()
+                    task()
+                    # New session per task: one that wrote sticks to the primary
+                    db.session.remove()
+                    next_run[i] = started + interval
+                    logger.info(f"Tarea '{name}' terminada en {time.monotonic() - started:.1f}s")
+            if args.once:
+                return
+            time.sleep(max(0, min(next_run) - time.monotonic()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Map (t-SNE) computation for /mapa and /api/mapa-data."""
@@ -0,0 +1,244 @@
+"""Versioned map artefacts shared between the map builder and the web workers.
+
+An artefact is the /api/mapa-data payload for one (time_filter, reducer),
+gzip-compressed in every format of mapa.formats, plus the layout/cluster state
+needed to warm-start the next build, stored as a numpy .npz blob. Two stores
+are available, selected with MAP_ARTIFACT_STORE:
+
+- 'db': the public.mapa_artefacto table (shared by every host).
+- 'fs': files under MAP_ARTIFACT_DIR (shared by processes on one host).
+
+Artefacts are dicts: {'version', 'created_on', 'n_points', 'payload', 'state'},
+where payload is the one format asked for.
+"""
+import gzip
+import io
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.orm import defer
+
+from database import db
+from mapa.formats import FORMATS, encode_formats
+from models import MapaArtefacto
+
+logger = logging.getLogger(__name__)
+
+
+# Artefact column holding each payload format
+PAYLOAD_COLUMNS = {
+    'json': 'payload',
+    'columnar': 'payload_columnar',
+    'binary': 'payload_binary',
+}
+
+
+def decode_payload(payload):
+    return json.loads(gzip.decompress(payload))
+
+
+def derive_payload(json_payload, fmt):
+    """Encode a format from the full JSON payload, for artefacts built before the format existed."""
+    return FORMATS[fmt][0](decode_payload(json_payload))
+
+
+def pack_state(state):
+    """Serialize the builder state to .npz bytes (no pickle)."""
+    arrays = {}
+    layout = (state or {}).get('layout')
+    if layout:
+        arrays['layout_ids'] = layout['ids']
+        arrays['layout_coords'] = layout['coords']
+        arrays['layout_fitted_at'] = np.array([layout['fitted_at'].timestamp()])
+    clusters = (state or {}).get('clusters')
+    if clusters:
+        arrays['cluster_centroids'] = clusters['centroids']
+        arrays['cluster_ids'] = clusters['cluster_ids']
+    if not arrays:
+        return None
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def unpack_state(blob):
+    if not blob:
+        return None
+    with np.load(io.BytesIO(blob), allow_pickle=False) as arrays:
+        state = {}
+        if 'layout_ids' in arrays:
+            state['layout'] = {
+                'ids': arrays['layout_ids'],
+                'coords': arrays['layout_coords'],
+                'fitted_at': datetime.fromtimestamp(float(arrays['layout_fitted_at'][0]))
+            }
+        if 'cluster_ids' in arrays:
+            state['clusters'] = {
+                'centroids': arrays['cluster_centroids'],
+                'cluster_ids': arrays['cluster_ids']
+            }
+    return state
+
+
+def _n_points(data):
+    return len(data.get('points', [])) if isinstance(data, dict) else 0
+
+
+class DatabaseArtifactStore:
+    """Artefacts in public.mapa_artefacto; the version is the row id."""
+
+    def latest_version(self, time_filter, reducer):
+        """(version, created_on) of the latest artefact, without loading it."""
+        return db.session.query(MapaArtefacto.artefacto_id, MapaArtefacto.created_on).filter(
+            MapaArtefacto.time_filter == time_filter,
+            MapaArtefacto.reducer == reducer
+        ).order_by(MapaArtefacto.artefacto_id.desc()).first()
+
+    def latest(self, time_filter, reducer, with_state=False, fmt='json'):
+        query = db.session.query(MapaArtefacto).filter(
+            MapaArtefacto.time_filter == time_filter,
+            MapaArtefacto.reducer == reducer
+        )
+        # Only load the payload column that was asked for (the JSON one is
+        # loaded lazily if that format is missing from an older artefact)
+        deferred = [getattr(MapaArtefacto, column) for column in PAYLOAD_COLUMNS.values()
+                    if column != PAYLOAD_COLUMNS[fmt]]
+        if not with_state:
+            deferred.append(MapaArtefacto.state)
+        query = query.options(*[defer(column) for column in deferred])
+        row = query.order_by(MapaArtefacto.artefacto_id.desc()).first()
+        if row is None:
+            return None
+
+        payload = getattr(row, PAYLOAD_COLUMNS[fmt])
+        return {
+            'version': row.artefacto_id,
+            'created_on': row.created_on,
+            'n_points': row.n_points,
+            'payload': bytes(payload) if payload is not None else derive_payload(bytes(row.payload), fmt),
+            'state': unpack_state(row.state) if with_state else None
+        }
+
+    def save(self, time_filter, reducer, data, state=None):
+        payloads = encode_formats(data)
+        row = MapaArtefacto(
+            time_filter=time_filter,
+            reducer=reducer,
+            created_on=datetime.now(),
+            n_points=_n_points(data),
+            state=pack_state(state),
+            **{PAYLOAD_COLUMNS[fmt]: payload for fmt, payload in payloads.items()}
+        )
+        db.session.add(row)
+        db.session.commit()
+        return row.artefacto_id
+
+    def prune(self, time_filter, reducer, keep=5):
+        keep_ids = db.session.query(MapaArtefacto.artefacto_id).filter(
+            MapaArtefacto.time_filter == time_filter,
+            MapaArtefacto.reducer == reducer
+        ).order_by(MapaArtefacto.artefacto_id.desc()).limit(keep)
+        db.session.query(MapaArtefacto).filter(
+            MapaArtefacto.time_filter == time_filter,
+            MapaArtefacto.reducer == reducer,
+            MapaArtefacto.artefacto_id.notin_(keep_ids.scalar_subquery())
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def _file_suffix(fmt):
+    return '.json.gz' if fmt == 'json' else f'.{fmt}.gz'
+
+
+class FileArtifactStore:
+    """Artefacts as <root>/<time_filter>/<reducer>/<version>.json.gz (+ .<format>.gz, .npz state).
+
+    The version is a millisecond timestamp. Files are written to a temporary
+    name and renamed, so readers never see a partial artefact.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _directory(self, time_filter, reducer):
+        return os.path.join(self.root, time_filter, reducer)
+
+    def _versions(self, time_filter, reducer):
+        directory = self._directory(time_filter, reducer)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(name[:-len('.json.gz')]) for name in os.listdir(directory)
+                      if name.endswith('.json.gz') and name[:-len('.json.gz')].isdigit())
+
+    def _write(self, path, content):
+        tmp_path = f'{path}.tmp{os.getpid()}'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def latest_version(self, time_filter, reducer):
+        versions = self._versions(time_filter, reducer)
+        if not versions:
+            return None
+        return versions[-1], datetime.fromtimestamp(versions[-1] / 1000)
+
+    def latest(self, time_filter, reducer, with_state=False, fmt='json'):
+        versions = self._versions(time_filter, reducer)
+        if not versions:
+            return None
+        version = versions[-1]
+        base = os.path.join(self._directory(time_filter, reducer), str(version))
+        if os.path.exists(f'{base}{_file_suffix(fmt)}'):
+            with open(f'{base}{_file_suffix(fmt)}', 'rb') as f:
+                payload = f.read()
+        else:
+            with open(f'{base}.json.gz', 'rb') as f:
+                payload = derive_payload(f.read(), fmt)
+
+        state = None
+        if with_state and os.path.exists(f'{base}.npz'):
+            with open(f'{base}.npz', 'rb') as f:
+                state = unpack_state(f.read())
+
+        return {
+            'version': version,
+            'created_on': datetime.fromtimestamp(version / 1000),
+            'n_points': None,
+            'payload': payload,
+            'state': state
+        }
+
+    def save(self, time_filter, reducer, data, state=None):
+        directory = self._directory(time_filter, reducer)
+        os.makedirs(directory, exist_ok=True)
+        version = max([int(time.time() * 1000)] + [v + 1 for v in self._versions(time_filter, reducer)])
+        base = os.path.join(directory, str(version))
+
+        packed_state = pack_state(state)
+        if packed_state:
+            self._write(f'{base}.npz', packed_state)
+        # The .json.gz file makes the version visible, so it is written last
+        payloads = encode_formats(data)
+        for fmt, payload in payloads.items():
+            if fmt != 'json':
+                self._write(f'{base}{_file_suffix(fmt)}', payload)
+        self._write(f'{base}.json.gz', payloads['json'])
+        return version
+
+    def prune(self, time_filter, reducer, keep=5):
+        directory = self._directory(time_filter, reducer)
+        for version in self._versions(time_filter, reducer)[:-keep]:
+            for suffix in [_file_suffix(fmt) for fmt in FORMATS] + ['.npz']:
+                path = os.path.join(directory, f'{version}{suffix}')
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def get_artifact_store(config):
+    if config['MAP_ARTIFACT_STORE'] == 'fs':
+        return FileArtifactStore(config['MAP_ARTIFACT_DIR'])
+    return DatabaseArtifactStore()
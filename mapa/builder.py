@@ -0,0 +1,200 @@
+"""Map builds, run by the map builder process (map_builder.py).
+
+build_map_data() runs the map pipeline (mapa.pipeline) over the articles of a
+time window. The layout and cluster state of the previous build is passed in
+and returned, so refreshes stay incremental and cluster ids stay stable (see
+mapa.layout and mapa.clustering).
+
+When the web app builds a missing map inside a request (MAP_BUILD_ON_MISS),
+the CPU-bound stages (decode..serialize) run in a process pool of
+MAP_BUILD_PROCESSES processes (BuildProcesses), so the build doesn't hold
+the GIL of the worker serving the other requests. Only one request, across
+all worker processes and hosts, builds a given map: the others wait on a
+Postgres advisory lock and then serve the artefact it saved.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from sqlalchemy import text
+
+from database import db
+from embeddings import sync_embeddings
+from mapa import pipeline
+from mapa.profiling import BuildProfiler
+from mapa.reducers import REDUCERS
+from time_window import time_window
+
+logger = logging.getLogger(__name__)
+
+# The part of the config run_pipeline() reads, sent to the build processes
+PIPELINE_SETTINGS = ('MAP_PCA_COMPONENTS', 'MAP_LAYOUT_MODE', 'MAP_FULL_REFIT_HOURS')
+
+_build_locks = {}  # (time_filter, reducer) -> lock of this process's threads
+_build_locks_lock = threading.Lock()
+# Transaction-level, so it also works through PgBouncer in transaction mode
+BUILD_LOCK_SQL = text("SELECT pg_advisory_xact_lock(hashtext(:key))")
+
+
+def resolve_reducer(config, reducer=None):
+    """Validate a reducer name, defaulting to MAP_REDUCER."""
+    reducer = reducer or config['MAP_REDUCER']
+    if reducer not in REDUCERS:
+        raise ValueError(f"Unknown reducer: {reducer}")
+    return reducer
+
+
+class BuildProcesses:
+    """Process pool for the pipeline of in-request builds, started on the first build.
+
+    Processes are forked from a forkserver that only preloads this module, not
+    from the multithreaded web worker, and they don't re-import the server's
+    main module (main.py would run create_app() again). If one dies (e.g.
+    killed for memory) that build fails and the next one gets a new pool.
+    """
+
+    def __init__(self, processes):
+        self.processes = processes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def run(self, function, *args):
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload([__name__])
+                self._executor = ProcessPoolExecutor(self.processes, mp_context=context)
+            executor = self._executor
+        try:
+            return executor.submit(function, *args).result()
+        except BrokenProcessPool:
+            logger.error("Un proceso de construcción de mapas terminó abruptamente, se reinicia el pool")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+
+
+def new_build_processes(config):
+    """BuildProcesses of MAP_BUILD_PROCESSES processes; None (build in the request thread) if it is 0."""
+    if config['MAP_BUILD_PROCESSES'] <= 0:
+        return None
+    return BuildProcesses(config['MAP_BUILD_PROCESSES'])
+
+
+def _pipeline_job(rows, settings, reducer, previous_state, now):
+    timer = pipeline.StageTimer()
+    data, state = pipeline.run_pipeline(rows, settings, reducer, previous_state, now, timer)
+    return data, state, timer.timings
+
+
+def build_map_data(time_filter, reducer, config, previous_state=None, now=None, timer=None, processes=None):
+    """Calculate map visualization data for the given time filter.
+
+    Returns (data, state); data is the /api/mapa-data payload and state must be
+    passed back as previous_state on the next build of the same window. With
+    `processes` (BuildProcesses), everything after the fetch runs there.
+    """
+    now = now or datetime.now()
+    logger.info(f"Calculating map data for time filter: {time_filter} (reducer: {reducer})")
+    window = time_window(time_filter, config, now)
+    timer = timer or pipeline.StageTimer()
+
+    with timer.stage('fetch'):
+        rows = pipeline.fetch(config, window.start, window.end)
+    if not rows:
+        logger.warning("No articles found with valid embeddings")
+        return {"error": "no_articles", "message": "No hay suficientes artículos para generar la visualización"}, previous_state or {}
+
+    if processes is None:
+        data, state = pipeline.run_pipeline(rows, config, reducer, previous_state, now, timer)
+    else:
+        settings = {key: config[key] for key in PIPELINE_SETTINGS}
+        data, state, timings = processes.run(_pipeline_job, rows, settings, reducer, previous_state, now)
+        timer.timings.update(timings)
+    logger.info(f"Mapa {time_filter}/{reducer}: {len(rows)} artículos, {timer.summary()}")
+    return data, state
+
+
+def new_profiler(time_filter, reducer, config):
+    return BuildProfiler(config['MAP_PROFILE_DIR'], time_filter, reducer, keep=config['MAP_PROFILE_KEEP'])
+
+
+def build_and_store(store, time_filter, reducer, config, fmt='json', profiler=None, processes=None):
+    """Build one map, warm-started from the latest artefact, and save it. Returns the new artefact in `fmt`.
+
+    When the window has no usable articles nothing is saved, so the last good
+    map stays the one served and warm-started from; the previous artefact (or
+    None) is returned.
+
+    The build runs under `profiler` (a mapa.profiling.BuildProfiler) if one is
+    given, or under a new one when MAP_PROFILE is set; profiled builds ignore
+    `processes`, cProfile only sees this process.
+    """
+    if profiler is None and config['MAP_PROFILE']:
+        profiler = new_profiler(time_filter, reducer, config)
+    timer = profiler.timer if profiler else pipeline.StageTimer()
+
+    with profiler or nullcontext():
+        previous = store.latest(time_filter, reducer, with_state=True)
+        data, state = build_map_data(time_filter, reducer, config,
+                                     previous_state=previous['state'] if previous else None, timer=timer,
+                                     processes=None if profiler else processes)
+        if 'error' in data:
+            logger.warning(f"Mapa {time_filter}/{reducer} no guardado: {data['error']}")
+            return store.latest(time_filter, reducer, fmt=fmt)
+        with timer.stage('store'):
+            version = store.save(time_filter, reducer, data, state)
+    store.prune(time_filter, reducer, keep=config['MAP_ARTIFACT_KEEP'])
+    logger.info(f"Mapa {time_filter}/{reducer} guardado como versión {version}"
+                + (f", perfil {profiler.name}" if profiler else ''))
+    return store.latest(time_filter, reducer, fmt=fmt)
+
+
+@contextmanager
+def _build_lock(time_filter, reducer):
+    """Held while building a map on a miss: a thread lock, then an advisory lock shared by all workers."""
+    with _build_locks_lock:
+        thread_lock = _build_locks.setdefault((time_filter, reducer), threading.Lock())
+    with thread_lock, db.engine.connect() as connection, connection.begin():
+        connection.execute(BUILD_LOCK_SQL, {'key': f'mapa:{time_filter}:{reducer}'})
+        yield
+
+
+def latest_or_build(store, time_filter, reducer, config, fmt='json', processes=None):
+    """Latest artefact of a map, built here if there is none yet.
+
+    Concurrent misses of one map, in any worker, share the build: the others
+    wait for it and return the artefact it saved.
+    """
+    artifact = store.latest(time_filter, reducer, fmt=fmt)
+    if artifact is not None:
+        return artifact
+    with _build_lock(time_filter, reducer):
+        artifact = store.latest(time_filter, reducer, fmt=fmt)
+        if artifact is None:
+            logger.info(f"No map artefact for {time_filter}/{reducer}, building it in-process")
+            artifact = build_and_store(store, time_filter, reducer, config, fmt=fmt, processes=processes)
+    return artifact
+
+
+def build_all(store, config):
+    """Sync binary embeddings, then rebuild every configured window and reducer."""
+    if config['EMBEDDING_STORAGE'] == 'binary':
+        try:
+            with db.engine.begin() as connection:
+                sync_embeddings(connection)
+        except Exception as e:
+            logger.error(f"Error syncing binary embeddings: {str(e)}")
+
+    for time_filter in config['MAP_TIME_FILTERS']:
+        for reducer in config['MAP_BUILD_REDUCERS']:
+            try:
+                build_and_store(store, time_filter, reducer, config)
+            except Exception as e:
+                logger.error(f"Error building map {time_filter}/{reducer}: {str(e)}", exc_info=True)
+                db.session.rollback()
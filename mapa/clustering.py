@@ -0,0 +1,123 @@
+"""Topic clustering for the article map.
+
+MiniBatchKMeans on L2-normalised embeddings, warm-started from the centroids
+of the previous refresh. Fitted clusters are matched to the previous ones
+(Hungarian assignment on centroid distance) so each topic keeps its cluster
+id from one refresh to the next and the map labels don't reshuffle.
+
+The state is a plain dict so it can be stored in the cache:
+{'centroids': float32 (k, d) array, 'cluster_ids': int array of length k}.
+
+The whole window is refitted (cheaply, from the previous centroids) rather
+than streamed with partial_fit, because articles also leave the window and
+partial_fit has no way to forget them.
+
+Each cluster is labelled with its most common keyword (keyword_counts,
+cluster_labels); labels are unique across clusters, a cluster whose best
+keyword is already taken gets its next best one.
+"""
+import logging
+from collections import Counter
+
+import numpy as np
+
+from mapa.reducers import l2_normalize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_N_CLUSTERS = 16
+BATCH_SIZE = 1024
+WARM_MAX_ITER = 20
+
+
+def _can_warm_start(previous, n_clusters, n_features):
+    if previous is None:
+        return False
+    centroids = previous.get('centroids')
+    return centroids is not None and centroids.shape == (n_clusters, n_features)
+
+
+def _stable_ids(centroids, previous):
+    """Give each new centroid the id of the closest previous centroid (one-to-one)."""
+    if previous is None or previous.get('centroids') is None \
+            or previous['centroids'].shape[1] != centroids.shape[1]:
+        return np.arange(len(centroids))
+
+    from scipy.optimize import linear_sum_assignment
+
+    old_centroids = previous['centroids']
+    old_ids = np.asarray(previous['cluster_ids'])
+    cost = ((centroids[:, None, :] - old_centroids[None, :, :]) ** 2).sum(axis=2)
+    rows, cols = linear_sum_assignment(cost)
+
+    ids = np.full(len(centroids), -1, dtype=np.int64)
+    ids[rows] = old_ids[cols]
+    unmatched = ids < 0
+    if unmatched.any():
+        next_id = int(old_ids.max()) + 1 if len(old_ids) else 0
+        ids[unmatched] = np.arange(next_id, next_id + unmatched.sum())
+    return ids
+
+
+def keyword_tokens(keywords):
+    """Normalised keywords of a gpt_palabras_clave string ('Gobierno, elecciones,,')."""
+    tokens = (' '.join(token.split()).lower() for token in (keywords or '').split(','))
+    return [token for token in tokens if token]
+
+
+def keyword_counts(keywords, labels):
+    """{cluster_id: Counter of keyword_tokens} for per-row keyword strings and cluster ids."""
+    counts = {}
+    for row_keywords, cluster_id in zip(keywords, labels):
+        counts.setdefault(int(cluster_id), Counter()).update(keyword_tokens(row_keywords))
+    return counts
+
+
+def cluster_labels(counts):
+    """{cluster_id: label} from keyword_counts(), unique across clusters where possible.
+
+    Clusters pick in order of how common their best keyword is, so the
+    clearest topic keeps it; a cluster with every keyword taken repeats its
+    best one. Clusters without keywords get no label.
+    """
+    ranked = sorted(
+        ((cluster_id, counter.most_common()) for cluster_id, counter in counts.items() if counter),
+        key=lambda item: (-item[1][0][1], item[0])
+    )
+    taken, result = set(), {}
+    for cluster_id, keywords in ranked:
+        label = next((keyword for keyword, _ in keywords if keyword not in taken), keywords[0][0])
+        taken.add(label)
+        result[cluster_id] = label
+    return result
+
+
+def cluster_embeddings(embeddings, previous=None, n_clusters=DEFAULT_N_CLUSTERS):
+    """Return (labels, state) where labels are stable cluster ids per row."""
+    from sklearn.cluster import MiniBatchKMeans
+
+    matrix = l2_normalize(embeddings)
+    n_clusters = min(n_clusters, len(matrix))
+
+    if _can_warm_start(previous, n_clusters, matrix.shape[1]):
+        model = MiniBatchKMeans(
+            n_clusters=n_clusters,
+            init=previous['centroids'],
+            n_init=1,
+            max_iter=WARM_MAX_ITER,
+            batch_size=BATCH_SIZE,
+            random_state=42
+        )
+    else:
+        model = MiniBatchKMeans(
+            n_clusters=n_clusters,
+            n_init=3,
+            batch_size=BATCH_SIZE,
+            random_state=42
+        )
+
+    local_labels = model.fit_predict(matrix)
+    centroids = model.cluster_centers_.astype(np.float32)
+    cluster_ids = _stable_ids(centroids, previous)
+
+    return cluster_ids[local_labels], {'centroids': centroids, 'cluster_ids': cluster_ids}
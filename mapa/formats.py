@@ -0,0 +1,139 @@
+"""Payload formats of /api/mapa-data (?format=).
+
+Every format is encoded once per build, by the map builder, and stored
+gzip-compressed next to the artefact; requests only stream stored bytes.
+
+- 'json': the full payload, {'points': [{id, coordinates, titular, resumen,
+  keywords, ...}], 'clusters': [...]}.
+- 'columnar': parallel arrays instead of one object per point, with the
+  category/subcategory/newspaper names dictionary-encoded and no per-point
+  text; the front end fetches titular/resumen lazily from /api/article/<id>.
+  Roughly an order of magnitude smaller than 'json':
+
+    {'format': 'columnar', 'ids': [...], 'x': [...], 'y': [...],
+     'cluster': [...], 'categoria': [codes], 'subcategoria': [codes],
+     'periodico': [codes], 'strings': {'categoria': [names], ...},
+     'clusters': [...]}
+
+- 'binary': the columnar payload as little-endian typed arrays, read by
+  mapa.js without any JSON parsing of the points:
+
+    uint32 header length | header JSON | padding to 4 bytes | column data
+
+  The header is {'format': 'binary', 'n': ..., 'strings': ..., 'clusters':
+  ..., 'columns': [[name, dtype, byte offset], ...]}, with offsets relative to
+  the start of the column data and dtypes named after the JavaScript typed
+  arrays: ids/cluster Int32, x/y Float32, dictionary codes Uint16 (Int32
+  if a table has more than 65535 names). Every column starts 4-byte aligned.
+
+Error payloads ({'error': ...}) are the same in every format ('binary' sends
+them as a header without columns).
+"""
+import gzip
+import json
+import struct
+import zlib
+
+import numpy as np
+
+COORDINATE_DECIMALS = 3
+STREAM_CHUNK_SIZE = 64 * 1024
+DICTIONARY_COLUMNS = ('categoria', 'subcategoria', 'periodico')
+
+
+def encode_json(data):
+    return gzip.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), compresslevel=6)
+
+
+def dictionary_encode(values):
+    """(codes, table): each value replaced by its index in the table of distinct values."""
+    index = {}
+    codes = [index.setdefault(value, len(index)) for value in values]
+    return codes, list(index)
+
+
+def to_columnar(data):
+    if 'points' not in data:
+        return data
+    points = data['points']
+    columnar = {
+        'format': 'columnar',
+        'ids': [p['id'] for p in points],
+        'x': [round(p['coordinates'][0], COORDINATE_DECIMALS) for p in points],
+        'y': [round(p['coordinates'][1], COORDINATE_DECIMALS) for p in points],
+        'cluster': [p['cluster'] for p in points],
+        'strings': {},
+        'clusters': data['clusters']
+    }
+    for column in DICTIONARY_COLUMNS:
+        columnar[column], columnar['strings'][column] = dictionary_encode(p.get(column) for p in points)
+    return columnar
+
+
+def encode_columnar(data):
+    return encode_json(to_columnar(data))
+
+
+def _code_dtype(table):
+    return ('Uint16', '<u2') if len(table) <= np.iinfo(np.uint16).max else ('Int32', '<i4')
+
+
+def to_binary(data):
+    columnar = to_columnar(data)
+    if 'ids' not in columnar:
+        header, columns = columnar, []
+    else:
+        columns = [
+            ('ids', 'Int32', np.asarray(columnar['ids'], dtype='<i4')),
+            ('x', 'Float32', np.asarray(columnar['x'], dtype='<f4')),
+            ('y', 'Float32', np.asarray(columnar['y'], dtype='<f4')),
+            ('cluster', 'Int32', np.asarray(columnar['cluster'], dtype='<i4')),
+        ]
+        for column in DICTIONARY_COLUMNS:
+            name, dtype = _code_dtype(columnar['strings'][column])
+            columns.append((column, name, np.asarray(columnar[column], dtype=dtype)))
+        header = {
+            'format': 'binary',
+            'n': len(columnar['ids']),
+            'strings': columnar['strings'],
+            'clusters': columnar['clusters'],
+            'columns': []
+        }
+
+    body = bytearray()
+    for name, dtype, values in columns:
+        body += b'\0' * (-len(body) % 4)
+        header['columns'].append([name, dtype, len(body)])
+        body += values.tobytes()
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * (-(4 + len(header_bytes)) % 4)
+    return struct.pack('<I', len(header_bytes)) + header_bytes + bytes(body)
+
+
+def encode_binary(data):
+    return gzip.compress(to_binary(data), compresslevel=6)
+
+
+# format -> (encoder over the full payload, mimetype)
+FORMATS = {
+    'json': (encode_json, 'application/json'),
+    'columnar': (encode_columnar, 'application/json'),
+    'binary': (encode_binary, 'application/octet-stream'),
+}
+
+
+def encode_formats(data):
+    return {name: encoder(data) for name, (encoder, _) in FORMATS.items()}
+
+
+def gunzip_chunks(payload):
+    """Decompress a stored payload chunk by chunk, for clients that don't accept gzip."""
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    for start in range(0, len(payload), STREAM_CHUNK_SIZE):
+        chunk = decompressor.decompress(payload[start:start + STREAM_CHUNK_SIZE])
+        if chunk:
+            yield chunk
+    tail = decompressor.flush()
+    if tail:
+        yield tail
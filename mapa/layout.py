@@ -0,0 +1,81 @@
+"""Incremental 2D layout for the article map.
+
+A full t-SNE fit is only done every MAP_FULL_REFIT_HOURS. In between, the
+coordinates of articles already on the map are kept and new articles are
+placed at the similarity-weighted mean of their nearest placed neighbours
+(cosine kNN in embedding space), so a refresh costs O(new x placed) instead
+of a full t-SNE over the whole window. Articles that left the window are
+simply not carried over.
+
+The layout state is a plain dict so it can be stored in the cache:
+{'ids': int64 array, 'coords': float32 (n, 2) array, 'fitted_at': datetime}.
+"""
+import logging
+from datetime import timedelta
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+KNN_NEIGHBOURS = 10
+KNN_CHUNK = 1024
+# Refit from scratch when fewer than this share of the current articles was already placed
+MIN_KNOWN_FRACTION = 0.5
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def knn_place(new_embeddings, known_embeddings, known_coords, k=KNN_NEIGHBOURS):
+    """Place new points at the similarity-weighted mean of their k nearest known points."""
+    k = min(k, len(known_embeddings))
+    known = _normalize(known_embeddings.astype(np.float32, copy=False))
+    placed = np.empty((len(new_embeddings), 2), dtype=np.float32)
+
+    for start in range(0, len(new_embeddings), KNN_CHUNK):
+        chunk = _normalize(new_embeddings[start:start + KNN_CHUNK].astype(np.float32, copy=False))
+        similarities = chunk @ known.T
+        neighbours = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        weights = np.clip(np.take_along_axis(similarities, neighbours, axis=1), 1e-6, None)
+        weights /= weights.sum(axis=1, keepdims=True)
+        placed[start:start + len(chunk)] = np.einsum('nk,nkd->nd', weights, known_coords[neighbours])
+
+    return placed
+
+
+def needs_full_fit(previous, ids, now, refit_interval):
+    if previous is None or len(previous.get('ids', [])) == 0:
+        return True
+    if now - previous['fitted_at'] >= refit_interval:
+        return True
+    known_fraction = np.isin(ids, previous['ids']).mean() if len(ids) else 0.0
+    return known_fraction < MIN_KNOWN_FRACTION
+
+
+def update_layout(ids, embeddings, previous, fit, now, refit_hours=24):
+    """Return (coords, state) for the articles in ids.
+
+    fit(embeddings) -> (n, 2) coordinates is only called for a full refit.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+
+    if needs_full_fit(previous, ids, now, timedelta(hours=refit_hours)):
+        logger.info(f"Layout: ajuste completo de {len(ids)} artículos")
+        coords = np.asarray(fit(embeddings), dtype=np.float32)
+        return coords, {'ids': ids, 'coords': coords, 'fitted_at': now}
+
+    position = {article_id: i for i, article_id in enumerate(previous['ids'].tolist())}
+    previous_index = np.array([position.get(article_id, -1) for article_id in ids.tolist()], dtype=np.int64)
+    known = previous_index >= 0
+
+    coords = np.empty((len(ids), 2), dtype=np.float32)
+    coords[known] = previous['coords'][previous_index[known]]
+    if (~known).any():
+        coords[~known] = knn_place(embeddings[~known], embeddings[known], coords[known])
+
+    logger.info(f"Layout incremental: {int(known.sum())} conservados, {int((~known).sum())} nuevos, "
+                f"{len(previous['ids']) - int(known.sum())} retirados")
+    return coords, {'ids': ids, 'coords': coords, 'fitted_at': previous['fitted_at']}
@@ -0,0 +1,191 @@
+"""The map pipeline: every /api/mapa-data payload is computed here.
+
+Stages, each a plain function so they can be run and timed separately (see
+benchmarks/map_pipeline.py):
+
+    fetch      articles of the window with their embedding column (database)
+    decode     embedding bytes/strings -> float32 matrix + article metadata
+    reduce     matrix -> 2D coordinates (incremental layout, mapa.layout)
+    cluster    matrix -> stable cluster ids (mapa.clustering)
+    label      keyword (unique per cluster) and 2D centre of each cluster
+    serialize  the JSON-ready payload
+
+run_pipeline() chains decode..serialize over already fetched rows; the
+builder (mapa.builder) adds the fetch and stores the result.
+"""
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+from database import db
+from embeddings import add_articulo_embedding, row_embedding, stack_embeddings
+from mapa.clustering import cluster_embeddings, cluster_labels, keyword_counts
+from mapa.layout import update_layout
+from mapa.reducers import INCREMENTAL_REDUCERS, reduce_embeddings
+from models import Articulo, Categoria, Evento, Periodico, Subcategoria, articulo_evento
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('fetch', 'decode', 'reduce', 'cluster', 'label', 'serialize')
+
+
+class StageTimer:
+    """Wall time (and optionally peak traced memory) per pipeline stage."""
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.timings = {}
+        self.peak_memory = {}
+
+    @contextmanager
+    def stage(self, name):
+        if self.track_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - started
+            if self.track_memory:
+                self.peak_memory[name] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+    def summary(self):
+        return ', '.join(f'{name}={seconds:.2f}s' for name, seconds in self.timings.items())
+
+
+def fetch(config, start_date, end_date):
+    """Articles of the window that have keyword embeddings, with their labels."""
+    articles_query = db.session.query(
+        Articulo.articulo_id,
+        Articulo.titular,
+        Articulo.gpt_resumen,
+        Articulo.gpt_palabras_clave,
+        Categoria.nombre.label('categoria'),
+        Subcategoria.nombre.label('subcategoria'),
+        Periodico.nombre.label('periodico')
+    ).join(
+        articulo_evento, Articulo.articulo_id == articulo_evento.c.articulo_id
+    ).join(
+        Evento, Evento.evento_id == articulo_evento.c.evento_id
+    ).join(
+        Subcategoria, Evento.subcategoria_id == Subcategoria.subcategoria_id
+    ).join(
+        Categoria, Subcategoria.categoria_id == Categoria.categoria_id
+    ).join(
+        Periodico, Articulo.periodico_id == Periodico.periodico_id
+    ).filter(
+        Articulo.fecha_publicacion.between(start_date, end_date),
+        Articulo.palabras_clave_embeddings.isnot(None)
+    )
+    return add_articulo_embedding(
+        articles_query, 'palabras_clave_embeddings', config['EMBEDDING_STORAGE']
+    ).all()
+
+
+def decode(rows):
+    """(articles, matrix): metadata of the rows with a usable embedding and their stacked vectors."""
+    embeddings_list = []
+    articles = []
+    for row in rows:
+        try:
+            embedding = row_embedding(row.embedding_bin, row.embedding_text)
+        except Exception as e:
+            logger.error(f"Error processing embedding for article {row.articulo_id}: {str(e)}")
+            continue
+        if len(embedding) > 0:
+            embeddings_list.append(embedding)
+            articles.append({
+                'id': row.articulo_id,
+                'titular': row.titular,
+                'categoria': row.categoria,
+                'subcategoria': row.subcategoria,
+                'periodico': row.periodico,
+                'keywords': row.gpt_palabras_clave,
+                'resumen': row.gpt_resumen
+            })
+    if not embeddings_list:
+        return articles, None
+    return articles, stack_embeddings(embeddings_list)
+
+
+def reduce(config, reducer, ids, matrix, previous=None, now=None):
+    """2D layout, updated incrementally between full refits when MAP_LAYOUT_MODE is 'incremental'."""
+    def fit(m):
+        return reduce_embeddings(m, reducer, config['MAP_PCA_COMPONENTS'])
+
+    if config['MAP_LAYOUT_MODE'] != 'incremental' or reducer not in INCREMENTAL_REDUCERS:
+        return fit(matrix), None
+
+    return update_layout(ids, matrix, previous, fit,
+                         now=now, refit_hours=config['MAP_FULL_REFIT_HOURS'])
+
+
+def cluster(matrix, previous=None):
+    """Stable cluster id per row, and the state for the next build."""
+    return cluster_embeddings(matrix, previous)
+
+
+def label(articles, coords, labels):
+    """Centre and keyword of each cluster (clusters without keywords are left out)."""
+    keywords = cluster_labels(keyword_counts([article['keywords'] for article in articles], labels))
+    cluster_data = []
+    for cluster_id in np.unique(labels):
+        if int(cluster_id) in keywords:
+            cluster_data.append({
+                'id': int(cluster_id),
+                'center': coords[labels == cluster_id].mean(axis=0).tolist(),
+                'keyword': keywords[int(cluster_id)]
+            })
+    return cluster_data
+
+
+def serialize(articles, coords, labels, cluster_data):
+    coords = np.asarray(coords).tolist()
+    labels = labels.tolist()
+    points = [
+        {
+            'id': article['id'],
+            'coordinates': coords[i],
+            'titular': article['titular'],
+            'categoria': article['categoria'],
+            'subcategoria': article['subcategoria'],
+            'periodico': article['periodico'],
+            'keywords': article['keywords'],
+            'resumen': article['resumen'],
+            'cluster': labels[i]
+        }
+        for i, article in enumerate(articles)
+    ]
+    return {'points': points, 'clusters': cluster_data}
+
+
+def run_pipeline(rows, config, reducer, previous_state=None, now=None, timer=None):
+    """decode -> reduce -> cluster -> label -> serialize over fetched rows.
+
+    Returns (data, state); state must be passed back as previous_state on the
+    next build of the same window.
+    """
+    previous_state = previous_state or {}
+    timer = timer or StageTimer()
+
+    with timer.stage('decode'):
+        articles, matrix = decode(rows)
+    if matrix is None:
+        logger.warning("No valid embeddings found")
+        return {"error": "no_embeddings", "message": "No hay suficientes embeddings válidos para generar la visualización"}, previous_state
+
+    with timer.stage('reduce'):
+        coords, layout_state = reduce(config, reducer, [a['id'] for a in articles], matrix,
+                                      previous_state.get('layout'), now)
+    with timer.stage('cluster'):
+        labels, cluster_state = cluster(matrix, previous_state.get('clusters'))
+    with timer.stage('label'):
+        cluster_data = label(articles, coords, labels)
+    with timer.stage('serialize'):
+        data = serialize(articles, coords, labels, cluster_data)
+
+    return data, {'layout': layout_state, 'clusters': cluster_state}
@@ -0,0 +1,114 @@
+"""Opt-in profiles of single map builds.
+
+A profiled build runs under cProfile with a StageTimer, so both the time
+per pipeline stage (fetch, decode, reduce, cluster, label, serialize, store)
+and the functions inside each stage are recorded. Each profile is saved
+under MAP_PROFILE_DIR as
+
+    <name>.prof   pstats dump (python -m pstats, snakeviz...)
+    <name>.json   {'time_filter', 'reducer', 'created_on', 'total_seconds',
+                   'stages': {stage: seconds}, 'top': the slowest functions}
+
+Builds are profiled with MAP_PROFILE=true (every build of map_builder.py),
+`map_builder.py --profile`, or by an admin with POST /admin/map-profiles.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import time
+from datetime import datetime
+
+from mapa.pipeline import StageTimer
+
+TOP_FUNCTIONS = 30
+PROFILE_NAME = re.compile(r'^[0-9]+-[0-9a-z]+-[a-z_]+$')
+
+
+def _function_name(key):
+    filename, line, name = key
+    return f'{filename}:{line}({name})' if line else name
+
+
+class BuildProfiler:
+    """Context manager profiling everything run inside it; .timer times the stages."""
+
+    def __init__(self, directory, time_filter, reducer, keep=20):
+        self.directory = directory
+        self.time_filter = time_filter
+        self.reducer = reducer
+        self.keep = keep
+        self.timer = StageTimer()
+        self.name = None
+        self._profiler = cProfile.Profile()
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profiler.disable()
+        self.total_seconds = time.perf_counter() - self._started
+        self.name = self.save()
+        return False
+
+    def summary(self):
+        stats = pstats.Stats(self._profiler, stream=io.StringIO())
+        stats.sort_stats('cumulative')
+        top = []
+        for key in stats.fcn_list[:TOP_FUNCTIONS]:
+            _, ncalls, tottime, cumtime, _ = stats.stats[key]
+            top.append({
+                'function': _function_name(key),
+                'ncalls': ncalls,
+                'tottime': round(tottime, 4),
+                'cumtime': round(cumtime, 4)
+            })
+        return {
+            'name': self.name,
+            'time_filter': self.time_filter,
+            'reducer': self.reducer,
+            'created_on': datetime.now().isoformat(),
+            'total_seconds': round(self.total_seconds, 4),
+            'stages': {stage: round(seconds, 4) for stage, seconds in self.timer.timings.items()},
+            'top': top
+        }
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.name = f'{int(time.time() * 1000)}-{self.time_filter}-{self.reducer}'
+        base = os.path.join(self.directory, self.name)
+        self._profiler.dump_stats(f'{base}.prof.tmp')
+        os.replace(f'{base}.prof.tmp', f'{base}.prof')
+        with open(f'{base}.json.tmp', 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        os.replace(f'{base}.json.tmp', f'{base}.json')
+        self._prune()
+        return self.name
+
+    def _prune(self):
+        for name in list_profile_names(self.directory)[self.keep:]:
+            for suffix in ('.prof', '.json'):
+                path = os.path.join(self.directory, f'{name}{suffix}')
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def list_profile_names(directory):
+    """Names of the saved profiles, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    names = [name[:-len('.json')] for name in os.listdir(directory)
+             if name.endswith('.json') and PROFILE_NAME.match(name[:-len('.json')])]
+    return sorted(names, key=lambda name: int(name.split('-', 1)[0]), reverse=True)
+
+
+def load_summary(directory, name):
+    """Summary of a saved profile; ValueError for names that are not profiles."""
+    if not PROFILE_NAME.match(name):
+        raise ValueError(f"Invalid profile name: {name}")
+    with open(os.path.join(directory, f'{name}.json')) as f:
+        return json.load(f)
@@ -0,0 +1,98 @@
+"""Dimensionality reduction engines for the article map.
+
+All reducers work on L2-normalised embeddings, where euclidean distance is a
+monotonic function of cosine distance, so no N x N cosine distance matrix is
+ever built. Available reducers:
+
+- 'tsne': PCA pre-reduction to MAP_PCA_COMPONENTS, then Barnes-Hut t-SNE.
+- 'umap': PCA pre-reduction, then UMAP (needs the optional umap-learn package;
+  falls back to 'tsne' when it is not installed).
+- 'random_projection': Gaussian random projection straight to 2D. Linear and
+  near-instant, meant as a cheap preview for very large windows.
+
+scikit-learn is imported inside the reducers, so web workers that import
+this module (e.g. for l2_normalize) don't load it until a map is built.
+"""
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PCA_COMPONENTS = 50
+
+# Reducers whose output is worth keeping between refreshes (see mapa.layout)
+INCREMENTAL_REDUCERS = {'tsne', 'umap'}
+
+
+def l2_normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def pca_reduce(matrix, n_components=DEFAULT_PCA_COMPONENTS):
+    """Project onto the first principal components when that actually reduces the width."""
+    n_components = min(n_components, matrix.shape[0], matrix.shape[1])
+    if n_components >= matrix.shape[1]:
+        return matrix
+    from sklearn.decomposition import PCA
+    return PCA(n_components=n_components, svd_solver='randomized', random_state=42).fit_transform(matrix)
+
+
+def _trivial_layout(matrix):
+    """Layout for windows too small for any reducer (fewer than 3 articles)."""
+    coords = np.zeros((matrix.shape[0], 2), dtype=np.float32)
+    width = min(2, matrix.shape[1])
+    coords[:, :width] = matrix[:, :width]
+    return coords
+
+
+def tsne_reduce(matrix, pca_components=DEFAULT_PCA_COMPONENTS):
+    from sklearn.manifold import TSNE
+    reduced = pca_reduce(l2_normalize(matrix), pca_components)
+    tsne = TSNE(
+        n_components=2,
+        method='barnes_hut',
+        init='pca',
+        perplexity=min(30, len(reduced) - 1),
+        random_state=42
+    )
+    return tsne.fit_transform(reduced)
+
+
+def umap_reduce(matrix, pca_components=DEFAULT_PCA_COMPONENTS):
+    try:
+        import umap
+    except ImportError:
+        logger.warning("umap-learn no está instalado, usando t-SNE")
+        return tsne_reduce(matrix, pca_components)
+
+    reduced = pca_reduce(l2_normalize(matrix), pca_components)
+    return umap.UMAP(
+        n_components=2,
+        n_neighbors=min(15, len(reduced) - 1),
+        random_state=42
+    ).fit_transform(reduced)
+
+
+def random_projection_reduce(matrix, pca_components=DEFAULT_PCA_COMPONENTS):
+    from sklearn.random_projection import GaussianRandomProjection
+    return GaussianRandomProjection(n_components=2, random_state=42).fit_transform(l2_normalize(matrix))
+
+
+REDUCERS = {
+    'tsne': tsne_reduce,
+    'umap': umap_reduce,
+    'random_projection': random_projection_reduce,
+}
+
+
+def reduce_embeddings(matrix, reducer='tsne', pca_components=DEFAULT_PCA_COMPONENTS):
+    """Reduce an (n, d) embedding matrix to (n, 2) map coordinates."""
+    if reducer not in REDUCERS:
+        raise ValueError(f"Unknown reducer '{reducer}', expected one of {sorted(REDUCERS)}")
+    if matrix.shape[0] < 3:
+        return _trivial_layout(matrix)
+    return np.asarray(REDUCERS[reducer](matrix, pca_components), dtype=np.float32)
@@ -0,0 +1,66 @@
+"""Schema migrations for tables and indexes owned by this app.
+
+The core news schema is created by the ingest pipeline, so there is no ORM
+create_all(). Each module in this package named vNNN_<slug>.py exposes
+VERSION, DESCRIPTION and upgrade(connection); applied versions are recorded
+in public.schema_migration.
+
+Run pending migrations with:  python -m migrations upgrade
+"""
+import importlib
+import logging
+import pkgutil
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+VERSION_TABLE = 'public.schema_migration'
+
+
+def discover():
+    """Return all migration modules sorted by VERSION."""
+    modules = []
+    for info in pkgutil.iter_modules(__path__):
+        if info.name.startswith('v') and info.name[1:4].isdigit():
+            modules.append(importlib.import_module(f'{__name__}.{info.name}'))
+    return sorted(modules, key=lambda m: m.VERSION)
+
+
+def ensure_version_table(connection):
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+        " version INTEGER PRIMARY KEY,"
+        " description VARCHAR(255),"
+        " applied_on TIMESTAMP DEFAULT now())"
+    ))
+
+
+def applied_versions(connection):
+    ensure_version_table(connection)
+    return {row[0] for row in connection.execute(text(f"SELECT version FROM {VERSION_TABLE}"))}
+
+
+def pending(connection):
+    applied = applied_versions(connection)
+    return [m for m in discover() if m.VERSION not in applied]
+
+
+def upgrade(engine, target=None):
+    """Apply pending migrations up to and including target, each in its own transaction."""
+    with engine.begin() as connection:
+        to_apply = pending(connection)
+
+    applied = []
+    for module in to_apply:
+        if target is not None and module.VERSION > target:
+            break
+        logger.info(f"Aplicando migración {module.VERSION:03d}: {module.DESCRIPTION}")
+        with engine.begin() as connection:
+            module.upgrade(connection)
+            connection.execute(
+                text(f"INSERT INTO {VERSION_TABLE} (version, description) VALUES (:version, :description)"),
+                {'version': module.VERSION, 'description': module.DESCRIPTION}
+            )
+        applied.append(module.VERSION)
+    return applied
@@ -0,0 +1,31 @@
+"""Command line entry point: python -m migrations [upgrade|status] [--target N]."""
+import argparse
+import logging
+
+from database import create_db_app, db
+from migrations import applied_versions, discover, upgrade
+
+logging.basicConfig(level=logging.INFO)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m migrations')
+    parser.add_argument('command', choices=['upgrade', 'status'], nargs='?', default='upgrade')
+    parser.add_argument('--target', type=int, default=None, help='Stop after this version')
+    args = parser.parse_args(argv)
+
+    app = create_db_app(__name__)
+    with app.app_context():
+        if args.command == 'status':
+            with db.engine.begin() as connection:
+                applied = applied_versions(connection)
+            for module in discover():
+                state = 'applied' if module.VERSION in applied else 'pending'
+                print(f"{module.VERSION:03d}  {state:8}  {module.DESCRIPTION}")
+        else:
+            applied = upgrade(db.engine, target=args.target)
+            print(f"Applied {len(applied)} migration(s): {applied}")
+
+
+if __name__ == '__main__':
+    main()
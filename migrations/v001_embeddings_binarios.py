@@ -0,0 +1,12 @@
+"""Sidecar tables with float32 embeddings, backfilled from the text columns."""
+from embeddings import sync_embeddings
+from models import ArticuloEmbedding, EventoEmbedding, SubcategoriaEmbedding
+
+VERSION = 1
+DESCRIPTION = 'Binary float32 embedding sidecar tables'
+
+
+def upgrade(connection):
+    for model in (ArticuloEmbedding, EventoEmbedding, SubcategoriaEmbedding):
+        model.__table__.create(connection, checkfirst=True)
+    sync_embeddings(connection)
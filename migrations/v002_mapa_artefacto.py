@@ -0,0 +1,9 @@
+"""Table for the precomputed map artefacts written by map_builder.py."""
+from models import MapaArtefacto
+
+VERSION = 2
+DESCRIPTION = 'Map artefact table'
+
+
+def upgrade(connection):
+    MapaArtefacto.__table__.create(connection, checkfirst=True)
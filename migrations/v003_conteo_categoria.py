@@ -0,0 +1,14 @@
+"""Materialized per-day category/subcategory counts.
+
+Only creates the table: the counts read evento.posturas, which doesn't exist
+before migration 007. Migration 010 does the first full build (and
+map_builder.py another one at startup).
+"""
+from models import ConteoCategoria
+
+VERSION = 3
+DESCRIPTION = 'Materialized category/subcategory counts'
+
+
+def upgrade(connection):
+    ConteoCategoria.__table__.create(connection, checkfirst=True)
@@ -0,0 +1,22 @@
+"""Generated Spanish tsvector column on articulo with a GIN index, for /api/search.
+
+Adding a stored generated column rewrites public.articulo, so run this
+migration outside peak hours.
+"""
+from sqlalchemy import text
+
+from models import ARTICULO_BUSQUEDA_SQL
+
+VERSION = 4
+DESCRIPTION = 'Full-text search column and GIN index on articulo'
+
+
+def upgrade(connection):
+    connection.execute(text(
+        "ALTER TABLE public.articulo ADD COLUMN IF NOT EXISTS busqueda tsvector "
+        f"GENERATED ALWAYS AS ({ARTICULO_BUSQUEDA_SQL}) STORED"
+    ))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_articulo_busqueda ON public.articulo USING gin (busqueda)"
+    ))
+    connection.execute(text("ANALYZE public.articulo"))
@@ -0,0 +1,15 @@
+"""Columnar payload column on mapa_artefacto (see mapa/formats.py).
+
+Artefacts built before this migration have no columnar payload; the stores
+derive it from the JSON payload until the next build replaces them.
+"""
+from sqlalchemy import text
+
+VERSION = 5
+DESCRIPTION = 'Columnar map payload'
+
+
+def upgrade(connection):
+    connection.execute(text(
+        "ALTER TABLE public.mapa_artefacto ADD COLUMN IF NOT EXISTS payload_columnar bytea"
+    ))
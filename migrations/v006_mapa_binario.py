@@ -0,0 +1,11 @@
+"""Binary (typed array) payload column on mapa_artefacto (see mapa/formats.py)."""
+from sqlalchemy import text
+
+VERSION = 6
+DESCRIPTION = 'Binary map payload'
+
+
+def upgrade(connection):
+    connection.execute(text(
+        "ALTER TABLE public.mapa_artefacto ADD COLUMN IF NOT EXISTS payload_binary bytea"
+    ))
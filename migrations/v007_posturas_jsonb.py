@@ -0,0 +1,18 @@
+"""Posturas parsed into jsonb on evento, with the index /api/posturas pages over."""
+from sqlalchemy import text
+
+from posturas import normalize_posturas
+
+VERSION = 7
+DESCRIPTION = 'Posturas as jsonb on evento'
+
+
+def upgrade(connection):
+    connection.execute(text("ALTER TABLE public.evento ADD COLUMN IF NOT EXISTS posturas jsonb"))
+    connection.execute(text("ALTER TABLE public.evento ADD COLUMN IF NOT EXISTS posturas_md5 varchar(32)"))
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_evento_posturas_fecha ON public.evento (fecha_evento, evento_id) "
+        "WHERE posturas IS NOT NULL"
+    ))
+    normalize_posturas(connection, full=True)
+    connection.execute(text("ANALYZE public.evento"))
@@ -0,0 +1,33 @@
+"""Secondary indexes for the window filters and joins of the listing queries.
+
+- articulo (fecha_publicacion, articulo_id) INCLUDE (periodico_id, updated_on):
+  every listing filters on the publication date, and articles_version() can
+  answer count/max(updated_on) of a window from the index alone.
+- articulo (updated_on): incremental category counts and vector index deltas.
+- articulo_evento (evento_id, articulo_id): the primary key leads with
+  articulo_id, but /api/articles and the counts join from the event side.
+- evento (subcategoria_id, fecha_evento): category and subcategory filters.
+
+Plain CREATE INDEX locks writes to each table while it builds, so run this
+migration outside ingest hours. benchmarks/query_plans.py checks that the
+plans of the app's queries use them.
+"""
+from sqlalchemy import text
+
+VERSION = 8
+DESCRIPTION = 'Listing indexes on articulo, articulo_evento and evento'
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_articulo_fecha ON public.articulo "
+    "(fecha_publicacion, articulo_id) INCLUDE (periodico_id, updated_on)",
+    "CREATE INDEX IF NOT EXISTS ix_articulo_updated_on ON public.articulo (updated_on)",
+    "CREATE INDEX IF NOT EXISTS ix_articulo_evento_evento ON public.articulo_evento (evento_id, articulo_id)",
+    "CREATE INDEX IF NOT EXISTS ix_evento_subcategoria_fecha ON public.evento (subcategoria_id, fecha_evento)",
+]
+
+
+def upgrade(connection):
+    for statement in INDEXES:
+        connection.execute(text(statement))
+    for table in ('articulo', 'articulo_evento', 'evento'):
+        connection.execute(text(f"ANALYZE public.{table}"))
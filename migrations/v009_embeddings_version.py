@@ -0,0 +1,19 @@
+"""md5 version column for the evento and subcategoría embedding sidecars.
+
+Their sources have no updated_on, so a copy was only made once and never
+refreshed when the text embedding changed. Each copy now keeps the md5 of
+the text it was made from; existing copies have none, so the sync below
+rewrites them once.
+"""
+from sqlalchemy import text
+
+from embeddings import sync_embeddings
+
+VERSION = 9
+DESCRIPTION = 'Source md5 of the evento/subcategoria embedding copies'
+
+
+def upgrade(connection):
+    for table in ('evento_embedding', 'subcategoria_embedding'):
+        connection.execute(text(f"ALTER TABLE public.{table} ADD COLUMN IF NOT EXISTS fuente_md5 VARCHAR(32)"))
+    sync_embeddings(connection)
@@ -0,0 +1,13 @@
+"""First full build of the materialized category counts (see migration 003).
+
+It runs after migration 007, because postura_count counts the events with
+parsed posturas (evento.posturas).
+"""
+from category_counts import refresh_counts
+
+VERSION = 10
+DESCRIPTION = 'Full build of the category/subcategory counts'
+
+
+def upgrade(connection):
+    refresh_counts(connection, full=True)
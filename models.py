@@ -2,9 +2,9 @@ from database import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-from sqlalchemy.dialects.postgresql import ENUM
-from sqlalchemy import Column, Integer, String, Text, Date, TIMESTAMP, Boolean, ForeignKey, func, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import ENUM, JSONB, TSVECTOR
+from sqlalchemy import Column, Integer, String, Text, Date, TIMESTAMP, Boolean, ForeignKey, Table, LargeBinary, Index, Computed, text
+from sqlalchemy.orm import relationship, deferred
 import re
 
 # Define ENUM types
@@ -16,6 +16,8 @@ articulo_evento = Table('articulo_evento', db.Model.metadata,
     Column('evento_id', Integer, ForeignKey('public.evento.evento_id'), primary_key=True),
     Column('cluster_id', Integer),
     Column('cluster_descripcion', String(255)),
+    # The primary key leads with articulo_id; listings join from the event side (migration 008)
+    Index('ix_articulo_evento_evento', 'evento_id', 'articulo_id'),
     schema='public'
 )
 
@@ -118,7 +120,12 @@ class Subcategoria(db.Model):
 
 class Evento(db.Model):
     __tablename__ = 'evento'
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index('ix_evento_posturas_fecha', 'fecha_evento', 'evento_id',
+              postgresql_where=text('posturas IS NOT NULL')),
+        Index('ix_evento_subcategoria_fecha', 'subcategoria_id', 'fecha_evento'),
+        {'schema': 'public'}
+    )
 
     evento_id = Column(Integer, primary_key=True)
     subcategoria_id = Column(Integer, ForeignKey('public.subcategoria.subcategoria_id'))
@@ -133,6 +140,9 @@ class Evento(db.Model):
     gpt_palabras_clave = Column(String)
     embeddings = Column(String)
     gpt_desinformacion = Column(String)
+    # gpt_desinformacion parsed by posturas.py (migration 007), not loaded with the entity
+    posturas = deferred(Column(JSONB(none_as_null=True)))
+    posturas_md5 = deferred(Column(String(32)))
 
     subcategoria = relationship('Subcategoria', back_populates='eventos')
     articulos = relationship('Articulo', secondary=articulo_evento, back_populates='eventos')
@@ -155,9 +165,24 @@ class Periodista(db.Model):
 
     articulos = relationship('Articulo', back_populates='periodista')
 
+# Spanish full-text search document of an article; titles weigh most (see search.py)
+ARTICULO_BUSQUEDA_SQL = (
+    "setweight(to_tsvector('spanish', coalesce(titular, '')), 'A') || "
+    "setweight(to_tsvector('spanish', coalesce(subtitular, '')), 'B') || "
+    "setweight(to_tsvector('spanish', coalesce(gpt_palabras_clave, '')), 'B') || "
+    "setweight(to_tsvector('spanish', coalesce(gpt_resumen, '')), 'C')"
+)
+
 class Articulo(db.Model):
     __tablename__ = 'articulo'
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index('ix_articulo_busqueda', 'busqueda', postgresql_using='gin'),
+        # Window filters of the listings and of conditional.articles_version (migration 008)
+        Index('ix_articulo_fecha', 'fecha_publicacion', 'articulo_id',
+              postgresql_include=['periodico_id', 'updated_on']),
+        Index('ix_articulo_updated_on', 'updated_on'),
+        {'schema': 'public'}
+    )
 
     articulo_id = Column(Integer, primary_key=True)
     periodico_id = Column(Integer, ForeignKey('public.periodico.periodico_id'))
@@ -175,6 +200,8 @@ class Articulo(db.Model):
     gpt_palabras_clave = Column(String(1000))
     embeddings = Column(String)
     palabras_clave_embeddings = Column(String)
+    # Generated column added by migration 004, not loaded with the entity
+    busqueda = deferred(Column(TSVECTOR, Computed(ARTICULO_BUSQUEDA_SQL, persisted=True)))
 
     periodico = relationship('Periodico', back_populates='articulos')
     periodista = relationship('Periodista', back_populates='articulos')
@@ -205,3 +232,61 @@ class Region(db.Model):
     nombre = Column(String(255), nullable=False)
 
     eventos = relationship('Evento', secondary=evento_region, back_populates='regiones')
+
+# Binary float32 copies of the embedding text columns (see embeddings.py).
+# Kept in sidecar tables so the source tables stay untouched by the ingest pipeline.
+class ArticuloEmbedding(db.Model):
+    __tablename__ = 'articulo_embedding'
+    __table_args__ = {'schema': 'public'}
+
+    articulo_id = Column(Integer, ForeignKey('public.articulo.articulo_id', ondelete='CASCADE'), primary_key=True)
+    embeddings = Column(LargeBinary)
+    palabras_clave_embeddings = Column(LargeBinary)
+    updated_on = Column(TIMESTAMP)  # Articulo.updated_on when the copy was made
+
+class EventoEmbedding(db.Model):
+    __tablename__ = 'evento_embedding'
+    __table_args__ = {'schema': 'public'}
+
+    evento_id = Column(Integer, ForeignKey('public.evento.evento_id', ondelete='CASCADE'), primary_key=True)
+    embeddings = Column(LargeBinary)
+    fuente_md5 = Column(String(32))  # md5 of Evento.embeddings when the copy was made
+
+class SubcategoriaEmbedding(db.Model):
+    __tablename__ = 'subcategoria_embedding'
+    __table_args__ = {'schema': 'public'}
+
+    subcategoria_id = Column(Integer, ForeignKey('public.subcategoria.subcategoria_id', ondelete='CASCADE'), primary_key=True)
+    palabras_clave_embeddings = Column(LargeBinary)
+    fuente_md5 = Column(String(32))  # md5 of Subcategoria.palabras_clave_embeddings when the copy was made
+
+# Precomputed /api/mapa-data payloads written by map_builder.py (see mapa/artifacts.py)
+class MapaArtefacto(db.Model):
+    __tablename__ = 'mapa_artefacto'
+    __table_args__ = (
+        Index('ix_mapa_artefacto_lookup', 'time_filter', 'reducer', 'artefacto_id'),
+        {'schema': 'public'}
+    )
+
+    artefacto_id = Column(Integer, primary_key=True)
+    time_filter = Column(String(10), nullable=False)
+    reducer = Column(String(50), nullable=False)
+    created_on = Column(TIMESTAMP)
+    n_points = Column(Integer)
+    payload = Column(LargeBinary, nullable=False)  # gzip-compressed JSON
+    payload_columnar = Column(LargeBinary)  # gzip-compressed columnar JSON (see mapa/formats.py)
+    payload_binary = Column(LargeBinary)  # gzip-compressed typed arrays (see mapa/formats.py)
+    state = Column(LargeBinary)  # .npz with the layout/cluster state for the next build
+
+# Per-day article/postura counts by (sub)category, refreshed by map_builder.py (see category_counts.py).
+# subcategoria_id 0 holds the distinct count for the whole category.
+class ConteoCategoria(db.Model):
+    __tablename__ = 'conteo_categoria'
+    __table_args__ = {'schema': 'public'}
+
+    fecha = Column(Date, primary_key=True)
+    categoria_id = Column(Integer, primary_key=True)
+    subcategoria_id = Column(Integer, primary_key=True)
+    article_count = Column(Integer, nullable=False, default=0)
+    postura_count = Column(Integer, nullable=False, default=0)
+    refreshed_on = Column(TIMESTAMP)
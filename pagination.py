@@ -0,0 +1,43 @@
+"""Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last row of a page, JSON-encoded and base64'd
+so clients treat it as opaque. The next page is every row strictly after it in
+the query's ordering, which stays cheap however deep the client scrolls and
+doesn't skip or repeat rows when new ones are inserted (unlike OFFSET).
+"""
+import base64
+import json
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, size):
+    """Values of a cursor with `size` sort keys; ValueError if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def page_limit(value, default, maximum):
+    """Clamp a ?limit= value to [1, maximum]."""
+    if value is None:
+        return default
+    return max(1, min(value, maximum))
+
+
+def keyset_after(keys, values):
+    """Filter for rows after `values` in the ordering given by keys [(column, descending), ...]."""
+    conditions = []
+    for i, (column, descending) in enumerate(keys):
+        previous_equal = [keys[j][0] == values[j] for j in range(i)]
+        after = column < values[i] if descending else column > values[i]
+        conditions.append(and_(*previous_equal, after))
+    return or_(*conditions)
@@ -0,0 +1,125 @@
+"""Posturas of each event, parsed once from Evento.gpt_desinformacion into jsonb.
+
+gpt_desinformacion is written by the GPT pipeline as a string that is often
+not valid JSON (escaped quotes, stray backslashes, wrapped in quotes), and
+/api/posturas used to repair and json.loads every one of them on every
+request. normalize_posturas() now does it once per event: the validated list
+goes to Evento.posturas (jsonb) and the md5 of the source string to
+Evento.posturas_md5, so only new or changed events are parsed again. Events
+whose string can't be parsed keep posturas NULL and are left out of
+/api/posturas.
+
+map_builder.py runs it every POSTURAS_REFRESH_MINUTES, and recounts the
+postura badges (category_counts.py) of the days of the events it changed;
+migration 007 does the first full pass.
+"""
+import hashlib
+import json
+import logging
+
+from sqlalchemy import bindparam, func, or_, select, update
+
+from category_counts import NULL_DAY
+from models import Evento
+
+logger = logging.getLogger(__name__)
+
+ID_LISTS = ('articulos_ids_conjunto_1', 'articulos_ids_conjunto_2')
+BATCH_SIZE = 500
+
+
+def _loads(raw):
+    """json.loads, falling back to the repairs /api/posturas used to do per request."""
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        repaired = raw.replace('\\"', '"').replace('\\', '')
+        if repaired.startswith('"') and repaired.endswith('"'):
+            repaired = repaired[1:-1]
+        value = json.loads(repaired)
+    # Doubly encoded strings
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value
+
+
+def _article_ids(values):
+    ids = []
+    for value in values if isinstance(values, list) else [values]:
+        try:
+            ids.append(int(value))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def parse_posturas(raw):
+    """Validated list of postura objects from a gpt_desinformacion string; ValueError if unusable."""
+    value = _loads(raw)
+    items = value if isinstance(value, list) else [value]
+    posturas = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        postura = dict(item)
+        for key in ID_LISTS:
+            if key in postura:
+                postura[key] = _article_ids(postura[key])
+        posturas.append(postura)
+    if not posturas:
+        raise ValueError('No postura objects')
+    return posturas
+
+
+def _md5(raw):
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def normalize_posturas(connection, full=False):
+    """Parse the gpt_desinformacion of new or changed events (all of them with full=True).
+
+    Returns (parsed, failed, days): days are the fecha_evento buckets (NULL_DAY
+    for undated events) of every event whose posturas were written.
+    """
+    table = Evento.__table__
+    query = select(table.c.evento_id, table.c.fecha_evento, table.c.gpt_desinformacion).where(
+        table.c.gpt_desinformacion.isnot(None)
+    )
+    if not full:
+        query = query.where(or_(
+            table.c.posturas_md5.is_(None),
+            table.c.posturas_md5 != func.md5(table.c.gpt_desinformacion)
+        ))
+
+    statement = update(table).where(table.c.evento_id == bindparam('b_evento_id')).values(
+        posturas=bindparam('b_posturas'), posturas_md5=bindparam('b_md5')
+    )
+    parsed = failed = 0
+    days = set()
+    batch = []
+    for evento_id, fecha_evento, raw in connection.execute(query).all():
+        try:
+            posturas = parse_posturas(raw)
+            parsed += 1
+        except ValueError as e:
+            logger.warning(f"Posturas inválidas en evento {evento_id}: {str(e)}")
+            posturas = None
+            failed += 1
+        batch.append({'b_evento_id': evento_id, 'b_posturas': posturas, 'b_md5': _md5(raw)})
+        days.add(fecha_evento or NULL_DAY)
+        if len(batch) >= BATCH_SIZE:
+            connection.execute(statement, batch)
+            batch = []
+    if batch:
+        connection.execute(statement, batch)
+
+    # Events whose gpt_desinformacion was removed
+    removed = connection.execute(update(table).where(
+        table.c.gpt_desinformacion.is_(None),
+        table.c.posturas_md5.isnot(None)
+    ).values(posturas=None, posturas_md5=None).returning(table.c.fecha_evento)).scalars().all()
+    days.update(fecha_evento or NULL_DAY for fecha_evento in removed)
+
+    if parsed or failed:
+        logger.info(f"Posturas normalizadas: {parsed} eventos, {failed} inválidos")
+    return parsed, failed, days
@@ -0,0 +1,188 @@
+"""Read replica routing for db.session.
+
+With DATABASE_REPLICA_URL set, Flask-SQLAlchemy creates a second engine for
+the 'replica' bind (SQLALCHEMY_BINDS, same SQLALCHEMY_ENGINE_OPTIONS) and
+RoutingSession.get_bind() picks the engine per statement:
+
+- reads of GET/HEAD requests (except PRIMARY_ENDPOINTS) and of map_builder.py
+  go to the replica;
+- writes (flushes, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE) always go to
+  the primary, and so do all later statements of that session, so a request
+  or builder task reads its own writes;
+- the replica's lag is measured at most every REPLICA_CHECK_SECONDS; while it
+  is over REPLICA_MAX_LAG_SECONDS, or the replica can't be reached, reads
+  fall back to the primary.
+
+db.engine is always the primary: the counts, posturas and embedding syncs
+that map_builder.py runs on raw connections read and write there.
+
+Pool usage per bind (see db_pool.py), statements per bind, replica lag and
+fallbacks are exported at /metrics (see instrumentation.py). To try it locally, start a
+second Postgres as a streaming standby of the first (pg_basebackup -R) and
+set DATABASE_REPLICA_URL to it.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+
+from db_pool import pool_samples
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica'
+# GET views that must see writes immediately
+PRIMARY_ENDPOINTS = {'main.login', 'main.register', 'main.logout'}
+
+# Seconds behind the primary; 0 when the replica has replayed all it received
+LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_monitors = {}  # replica engine -> ReplicaMonitor
+_stats_lock = threading.Lock()
+_statements = defaultdict(int)  # bind -> statements routed to it
+_fallbacks = 0
+
+
+def _count(bind, fallback=False):
+    global _fallbacks
+    with _stats_lock:
+        _statements[bind] += 1
+        if fallback:
+            _fallbacks += 1
+
+
+class ReplicaMonitor:
+    """Whether a replica is reachable and close enough to the primary, re-checked every `interval` seconds."""
+
+    def __init__(self, engine, max_lag, interval):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag = None
+        self.available = False
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def usable(self):
+        due = self._checked is None or time.monotonic() - self._checked >= self.interval
+        # One thread checks; the others use the last result meanwhile
+        if due and self._lock.acquire(blocking=False):
+            try:
+                self.check()
+            finally:
+                self._lock.release()
+        return self.available
+
+    def check(self):
+        self._checked = time.monotonic()
+        try:
+            with self.engine.connect() as connection:
+                self.lag = float(connection.execute(LAG_SQL).scalar() or 0)
+        except Exception as e:
+            self._set_available(False, f"no disponible: {str(e).splitlines()[0]}")
+            self.lag = None
+            return
+        self._set_available(self.lag <= self.max_lag, f"retraso {self.lag:.1f}s")
+
+    def mark_down(self, reason):
+        self._checked = time.monotonic()
+        self._set_available(False, reason)
+
+    def _set_available(self, available, reason):
+        if available != self.available:
+            if available:
+                logger.info(f"Réplica disponible para lecturas ({reason})")
+            else:
+                logger.warning(f"Réplica fuera de servicio, leyendo del primario ({reason})")
+        self.available = available
+
+
+class RoutingSession(Session):
+    """db.session that sends reads to the replica bind when the current context allows it."""
+
+    def _must_use_primary(self, clause):
+        if self._flushing or getattr(clause, 'is_dml', False) \
+                or getattr(clause, '_for_update_arg', None) is not None:
+            self.info['wrote'] = True
+        return self.info.get('wrote', False)
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        fallback = False
+        if bind is None and _replica_reads.get() and not self._must_use_primary(clause):
+            monitor = _monitors.get(self._db.engines.get(REPLICA_BIND))
+            if monitor is not None:
+                if monitor.usable():
+                    _count(REPLICA_BIND)
+                    return monitor.engine
+                fallback = True
+        _count('primary', fallback)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Route db.session reads inside the block to the replica (or, with enabled=False, to the primary)."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def _route_request():
+    if request.method in ('GET', 'HEAD') and request.endpoint not in PRIMARY_ENDPOINTS:
+        g.replica_reads_token = _replica_reads.set(True)
+
+
+def _end_request(exc):
+    token = g.pop('replica_reads_token', None)
+    if token is not None:
+        _replica_reads.reset(token)
+
+
+def init_replicas(app, web=True):
+    """Watch the replica bind of `app` (if configured), route GET requests to it and export pool metrics."""
+    db = app.extensions['sqlalchemy']
+    with app.app_context():
+        engines = {('primary' if key is None else key): engine for key, engine in db.engines.items()}
+
+    replica = engines.get(REPLICA_BIND)
+    if replica is not None and replica not in _monitors:
+        monitor = ReplicaMonitor(replica, app.config['REPLICA_MAX_LAG_SECONDS'], app.config['REPLICA_CHECK_SECONDS'])
+        _monitors[replica] = monitor
+
+        @event.listens_for(replica, 'handle_error')
+        def replica_error(context):
+            if context.is_disconnect:
+                monitor.mark_down('conexión perdida')
+
+    if web:
+        app.before_request(_route_request)
+        app.teardown_request(_end_request)
+
+    def collect():
+        samples = []
+        for bind, engine in engines.items():
+            samples.extend(pool_samples(bind, engine.pool))
+        with _stats_lock:
+            samples.extend(('counter', 'db_statements_total', f'bind="{bind}"', n)
+                           for bind, n in _statements.items())
+            samples.append(('counter', 'db_replica_fallbacks_total', '', _fallbacks))
+        if replica is not None and _monitors[replica].lag is not None:
+            samples.append(('gauge', 'db_replica_lag_seconds', '', _monitors[replica].lag))
+        return samples
+
+    if 'request_metrics' in app.extensions:
+        app.extensions['request_metrics'].add_collector(collect)
+    return replica is not None
@@ -0,0 +1,124 @@
+"""Full-text article search over the generated articulo.busqueda tsvector.
+
+The document covers titular, subtitular, gpt_palabras_clave and gpt_resumen
+(Spanish configuration, weighted in that order; see ARTICULO_BUSQUEDA_SQL in
+models.py) and is indexed with GIN, so a search only touches the matching
+rows and never scans cuerpo. Queries use websearch_to_tsquery syntax:
+"frase exacta", -excluir, a or b.
+
+Results are ordered by ts_rank_cd and paginated with a (rank, articulo_id)
+cursor (see pagination.py). semantic_search() and article_summaries() serve
+nearest-neighbour results from the vector index (see vector_index.py).
+"""
+import logging
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import cast, desc, func
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+
+from database import db
+from models import Articulo, Evento, Periodico, Subcategoria, articulo_evento
+from pagination import decode_cursor, encode_cursor, keyset_after
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'spanish'
+MAX_QUERY_LENGTH = 200
+SEMANTIC_SEEDS = 5
+SEMANTIC_OVERFETCH = 3
+
+
+def _summary_query(*extra_columns):
+    """Article fields returned by the search APIs."""
+    return db.session.query(
+        Articulo.articulo_id,
+        Articulo.titular,
+        Articulo.subtitular,
+        Articulo.url,
+        Articulo.fecha_publicacion,
+        Articulo.paywall,
+        Articulo.gpt_resumen,
+        Articulo.gpt_opinion,
+        Periodico.nombre.label('periodico_nombre'),
+        Periodico.logo_url.label('periodico_logo'),
+        *extra_columns
+    ).join(
+        Periodico, Periodico.periodico_id == Articulo.periodico_id
+    )
+
+
+def _filter_articles(query, start_date=None, end_date=None, category_id=None):
+    if start_date is not None:
+        query = query.filter(Articulo.fecha_publicacion >= start_date)
+    if end_date is not None:
+        query = query.filter(Articulo.fecha_publicacion <= end_date)
+    if category_id:
+        in_category = db.session.query(articulo_evento.c.articulo_id).join(
+            Evento, Evento.evento_id == articulo_evento.c.evento_id
+        ).join(
+            Subcategoria, Subcategoria.subcategoria_id == Evento.subcategoria_id
+        ).filter(Subcategoria.categoria_id == category_id)
+        query = query.filter(Articulo.articulo_id.in_(in_category))
+    return query
+
+
+def search_articles(query_text, limit, cursor=None, start_date=None, end_date=None, category_id=None):
+    """Return (rows, next_cursor) for a search; ValueError on an empty query or bad cursor."""
+    query_text = (query_text or '').strip()[:MAX_QUERY_LENGTH]
+    if not query_text:
+        raise ValueError('Empty search query')
+
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, query_text)
+    # ts_rank_cd returns real; as double precision the rank round-trips
+    # exactly through the cursor
+    rank = cast(func.ts_rank_cd(Articulo.busqueda, tsquery), DOUBLE_PRECISION).label('rank')
+
+    query = _summary_query(rank).filter(Articulo.busqueda.op('@@')(tsquery))
+    query = _filter_articles(query, start_date, end_date, category_id)
+
+    sort_keys = [(rank, True), (Articulo.articulo_id, True)]
+    if cursor:
+        last_rank, last_id = decode_cursor(cursor, 2)
+        try:
+            last_rank, last_id = float(last_rank), int(last_id)
+        except (TypeError, ValueError):
+            # e.g. [null, null]: well-formed JSON, but not a rank and an id
+            raise ValueError('Invalid cursor')
+        query = query.filter(keyset_after(sort_keys, [last_rank, last_id]))
+
+    rows = query.order_by(desc(rank), desc(Articulo.articulo_id)).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].rank, rows[-1].articulo_id])
+    return rows, next_cursor
+
+
+def article_summaries(scored_ids, limit, start_date=None, end_date=None, category_id=None):
+    """Search rows for [(articulo_id, score)], in that order, with the score as `rank`."""
+    if not scored_ids:
+        return []
+    scores = dict(scored_ids)
+    query = _filter_articles(
+        _summary_query().filter(Articulo.articulo_id.in_(list(scores))),
+        start_date, end_date, category_id
+    )
+    rows = sorted(query.all(), key=lambda row: -scores[row.articulo_id])[:limit]
+    return [SimpleNamespace(**row._asdict(), rank=scores[row.articulo_id]) for row in rows]
+
+
+def semantic_search(index, query_text, limit, start_date=None, end_date=None, category_id=None):
+    """Articles closest in embedding space to the best full-text matches of the query.
+
+    There is no model here to embed free text, so the query vector is the mean
+    embedding of the top SEMANTIC_SEEDS full-text hits, which also finds related
+    articles that share none of the query words.
+    """
+    seeds, _ = search_articles(query_text, SEMANTIC_SEEDS)
+    vectors = [v for v in (index.vector(row.articulo_id) for row in seeds) if v is not None]
+    if not vectors:
+        return []
+    # Over-fetch so the date/category filters still leave `limit` results
+    neighbours = index.search(np.mean(vectors, axis=0), k=limit * SEMANTIC_OVERFETCH)
+    return article_summaries(neighbours, limit, start_date, end_date, category_id)
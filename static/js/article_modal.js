@@ -1,6 +1,11 @@
 // Global modal instance
 let articleModal;
 
+// Article details by id, fetched on click or prefetched a carousel at a time
+const articleDetailsCache = new Map();
+const ARTICLE_BATCH_SIZE = 100;  // ARTICLES_MAX_PAGE_SIZE on the server
+let carouselPrefetchObserver;
+
 document.addEventListener('DOMContentLoaded', function() {
     console.log('Initializing article modal...');
     
@@ -130,8 +135,50 @@ function showError(message, error = null, retryCallback = null) {
     errorDiv.classList.remove('d-none');
 }
 
+function prefetchArticleDetails(articleIds) {
+    const ids = [...new Set(articleIds)].filter(id => id && !articleDetailsCache.has(String(id)));
+    for (let start = 0; start < ids.length; start += ARTICLE_BATCH_SIZE) {
+        const batch = ids.slice(start, start + ARTICLE_BATCH_SIZE);
+        fetch(`/api/articles/batch?ids=${batch.join(',')}`)
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+                return response.json();
+            })
+            .then(data => {
+                (data.articles || []).forEach(article => articleDetailsCache.set(String(article.id), article));
+            })
+            .catch(error => console.warn('Error prefetching article details:', error));
+    }
+}
+
+// Prefetch the details of a carousel's cards in one request when it scrolls into view
+function observeCarouselPrefetch(eventArticles) {
+    if (!('IntersectionObserver' in window)) return;
+    if (!carouselPrefetchObserver) {
+        carouselPrefetchObserver = new IntersectionObserver(entries => {
+            entries.filter(entry => entry.isIntersecting).forEach(entry => {
+                carouselPrefetchObserver.unobserve(entry.target);
+                const ids = Array.from(entry.target.querySelectorAll('.article-card'))
+                    .map(card => card.dataset.articleId);
+                prefetchArticleDetails(ids);
+            });
+        }, { rootMargin: '200px' });
+    }
+    eventArticles.forEach(eventArticle => {
+        eventArticle.querySelectorAll('.articles-carousel').forEach(carousel => {
+            carouselPrefetchObserver.observe(carousel);
+        });
+    });
+}
+
 function fetchArticleDetails(articleId, retryCount = 0) {
     console.log('Fetching article details:', articleId);
+
+    const cached = articleDetailsCache.get(String(articleId));
+    if (cached) {
+        updateModalContent(cached);
+        return;
+    }
     
     const maxRetries = 3;
     const controller = new AbortController();
@@ -156,6 +203,7 @@ function fetchArticleDetails(articleId, retryCount = 0) {
             if (!article || typeof article !== 'object') {
                 throw new Error('Invalid article data received');
             }
+            articleDetailsCache.set(String(articleId), article);
             updateModalContent(article);
         })
         .catch(error => {
@@ -64,9 +64,7 @@ function reloadArticles(date, order = 'desc') {
         .then(data => {
             if (!data.categories) throw new Error('Invalid response format');
 
-            updateDisplay(data);
-            initializeCarousels();
-            initializeScrollButtons();
+            updateDisplay(data, params);
         })
         .catch(error => {
             console.error('Error loading articles:', error);
@@ -76,6 +74,9 @@ function reloadArticles(date, order = 'desc') {
 
 function initializeScrollButtons() {
     document.querySelectorAll('.articles-carousel, .nav-tabs-wrapper, .nav-pills-wrapper').forEach(container => {
+        // Already wired up (this runs again whenever more events are loaded)
+        if (container.dataset.scrollButtons === 'true') return;
+
         // Add scroll buttons if not present
         if (!container.querySelector('.scroll-button.left')) {
             const leftButton = document.createElement('button');
@@ -98,6 +99,7 @@ function initializeScrollButtons() {
         const rightBtn = container.querySelector('.scroll-button.right');
         
         if (!wrapper || !leftBtn || !rightBtn) return;
+        container.dataset.scrollButtons = 'true';
 
         const updateButtons = () => {
             const hasOverflow = wrapper.scrollWidth > wrapper.clientWidth;
@@ -152,6 +154,9 @@ function initializeScrollButtons() {
 
 function initializeCarousels() {
     document.querySelectorAll('.carousel-wrapper').forEach(wrapper => {
+        if (wrapper.dataset.carousel === 'true') return;
+        wrapper.dataset.carousel = 'true';
+
         let touchStartX = 0;
         let touchEndX = 0;
         let isSwiping = false;
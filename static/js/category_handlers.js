@@ -1,3 +1,8 @@
+// Lazy loading state for /api/articles pages: the query of the current
+// listing and the cursor of its next page
+let articlesPaging = null;
+let articlesObserver = null;
+
 document.addEventListener('DOMContentLoaded', function() {
     initializeTabNavigation();
     loadDefaultCategory();
@@ -84,6 +89,9 @@ function updateNavigation() {
 }
 
 function loadDefaultCategory() {
+    // A search from another page (/?q=) replaces the listing, see search.js
+    if (new URLSearchParams(window.location.search).get('q')) return;
+
     try {
         const categoryTabs = document.querySelectorAll('#categoryTabs .nav-link');
         if (categoryTabs.length > 0) {
@@ -115,6 +123,7 @@ function loadCategoryContent(categoryId) {
     }
 
     const timeFilter = document.querySelector('input[name="timeFilter"]:checked').value;
+    const articlesParams = new URLSearchParams({ category_id: categoryId, time_filter: timeFilter });
     const subcategoryTabs = document.getElementById('subcategoryTabs');
     
     // Clear existing subcategories
@@ -129,7 +138,7 @@ function loadCategoryContent(categoryId) {
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
             return response.json();
         }),
-        fetch(`/api/articles?category_id=${categoryId}&time_filter=${timeFilter}`).then(response => {
+        fetch(`/api/articles?${articlesParams}`).then(response => {
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
             return response.json();
         })
@@ -143,7 +152,7 @@ function loadCategoryContent(categoryId) {
         subcategories.sort((a, b) => (b.article_count || 0) - (a.article_count || 0));
         
         updateSubcategoryTabs(subcategories);
-        updateDisplay(articlesData);
+        updateDisplay(articlesData, articlesParams);
         hideLoadingState();
         updateNavigation();
     })
@@ -198,15 +207,16 @@ function loadArticlesForSubcategory(subcategoryId) {
     }
 
     const timeFilter = document.querySelector('input[name="timeFilter"]:checked').value;
+    const articlesParams = new URLSearchParams({ subcategory_id: subcategoryId, time_filter: timeFilter });
     showLoadingState();
     
-    fetch(`/api/articles?subcategory_id=${subcategoryId}&time_filter=${timeFilter}`)
+    fetch(`/api/articles?${articlesParams}`)
         .then(response => {
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
             return response.json();
         })
         .then(data => {
-            updateDisplay(data);
+            updateDisplay(data, articlesParams);
             hideLoadingState();
             updateNavigation();
         })
@@ -256,7 +266,203 @@ function showError(message, error = null) {
     eventsContent.appendChild(errorDiv);
 }
 
-function updateDisplay(data) {
+function renderEvent(event) {
+    // Sort articles by fecha_publicacion
+    const sortedArticles = (event.articles || []).sort((a, b) => {
+        return new Date(b.fecha_publicacion || 0) - new Date(a.fecha_publicacion || 0);
+    });
+
+    return `
+        <div class="event-articles mb-4">
+            <div class="row">
+                <div class="col-md-3">
+                    <div class="event-info">
+                        <h4 class="event-title">${event.titulo || 'Untitled Event'}</h4>
+                        <p class="event-description">${event.descripcion || ''}</p>
+                        <div class="event-meta">
+                            <small class="text-muted">${event.fecha_evento || ''}</small>
+                        </div>
+                    </div>
+                </div>
+                <div class="col-md-9">
+                    <div class="articles-carousel">
+                        <div class="carousel-wrapper">
+                            ${sortedArticles.map(article => `
+                                <div class="article-card" data-article-id="${article.id}" data-article-url="${article.url || ''}" role="button">
+                                    <div class="card h-100">
+                                        <div class="card-body">
+                                            <img src="${article.periodico_logo || '/static/img/default-newspaper.svg'}" 
+                                                 class="newspaper-logo mb-2" alt="Newspaper logo">
+                                            <h5 class="card-title article-title ${article.paywall ? 'text-muted' : ''}">
+                                                ${article.titular || 'No Title'}
+                                            </h5>
+                                            ${article.gpt_opinion ? `<div class="article-opinion">${article.gpt_opinion}</div>` : ''}
+                                            ${article.paywall ? '<span class="badge bg-secondary">Paywall</span>' : ''}
+                                        </div>
+                                    </div>
+                                </div>
+                            `).join('')}
+                        </div>
+                    </div>
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+function setupLazyLoading(params, nextCursor) {
+    if (articlesObserver) articlesObserver.disconnect();
+    const oldSentinel = document.getElementById('events-sentinel');
+    if (oldSentinel) oldSentinel.remove();
+
+    articlesPaging = params ? { params: params, cursor: nextCursor, loading: false } : null;
+    if (!articlesPaging || !nextCursor) return;
+
+    const eventsContent = document.getElementById('events-content');
+    const sentinel = document.createElement('div');
+    sentinel.id = 'events-sentinel';
+    sentinel.className = 'text-center my-4';
+    sentinel.innerHTML = `
+        <div class="spinner-border spinner-border-sm text-primary" role="status">
+            <span class="visually-hidden">Loading...</span>
+        </div>
+    `;
+    eventsContent.appendChild(sentinel);
+
+    // Fetch the next page when the end of the listing scrolls into view
+    articlesObserver = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) loadMoreEvents();
+    }, { rootMargin: '400px' });
+    articlesObserver.observe(sentinel);
+}
+
+function loadMoreEvents() {
+    const paging = articlesPaging;
+    if (!paging || !paging.cursor || paging.loading) return;
+    paging.loading = true;
+
+    const params = new URLSearchParams(paging.params);
+    params.set('cursor', paging.cursor);
+
+    fetch(`/api/articles?${params}`)
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            // Ignore pages of a listing that has been replaced meanwhile
+            if (paging !== articlesPaging) return;
+            const events = (data.categories || []).flatMap(category =>
+                (category.subcategories || []).flatMap(subcategory => subcategory.events || []));
+            const containers = document.querySelectorAll('#events-content .events-container');
+            const container = containers[containers.length - 1];
+            if (container && events.length > 0) {
+                const page = document.createElement('div');
+                page.innerHTML = events.map(renderEvent).join('');
+                const newEvents = Array.from(page.children);
+                newEvents.forEach(eventArticle => container.appendChild(eventArticle));
+                initializeEventCards(newEvents);
+            }
+            paging.loading = false;
+            setupLazyLoading(paging.params, data.next_cursor);
+        })
+        .catch(error => {
+            console.error('Error loading more events:', error);
+            paging.loading = false;
+        });
+}
+
+function initializeEventCards(eventArticles) {
+    eventArticles.forEach(eventArticle => {
+        eventArticle.querySelectorAll('.article-card').forEach(card => {
+            card.style.cursor = 'pointer';
+            card.classList.add('article-card-clickable');
+        });
+        // Initialize mobile swipe events
+        if (window.innerWidth <= 767) {
+            initializeEventSwipe(eventArticle);
+        }
+    });
+
+    initializeCarousels();
+    initializeScrollButtons();
+    if (typeof observeCarouselPrefetch === 'function') observeCarouselPrefetch(eventArticles);
+}
+
+function initializeEventSwipe(eventArticle) {
+    const row = eventArticle.querySelector('.row');
+    let startX = 0;
+    let startY = 0;
+    let isDragging = false;
+    let isHorizontalScroll = false;
+
+    eventArticle.addEventListener('touchstart', (e) => {
+        if (e.target.closest('.event-info')) {
+            startX = e.touches[0].clientX;
+            startY = e.touches[0].clientY;
+            isDragging = true;
+            isHorizontalScroll = false;
+            row.style.transition = 'none';
+        }
+    }, { passive: true });
+
+    eventArticle.addEventListener('touchmove', (e) => {
+        if (!isDragging || !e.target.closest('.event-info')) return;
+        
+        const currentX = e.touches[0].clientX;
+        const currentY = e.touches[0].clientY;
+        const diffX = startX - currentX;
+        const diffY = startY - currentY;
+        
+        // Determine scroll direction on first significant movement
+        if (!isHorizontalScroll && (Math.abs(diffX) > 5 || Math.abs(diffY) > 5)) {
+            isHorizontalScroll = Math.abs(diffX) > Math.abs(diffY);
+            if (!isHorizontalScroll) {
+                isDragging = false;
+                return;
+            }
+        }
+        
+        if (isHorizontalScroll) {
+            e.preventDefault();
+            if (diffX > 0) { // Solo permitir deslizamiento hacia la izquierda
+                const maxTranslate = eventArticle.offsetWidth / 3;
+                const progress = Math.min(diffX / maxTranslate, 1);
+                const transform = progress * maxTranslate;
+                row.style.transform = `translateX(-${transform}px)`;
+            }
+        }
+    }, { passive: false });
+
+    eventArticle.addEventListener('touchend', (e) => {
+        if (!isDragging || !isHorizontalScroll) return;
+        isDragging = false;
+        
+        const currentX = e.changedTouches[0].clientX;
+        const diffX = startX - currentX;
+        row.style.transition = 'transform 0.3s cubic-bezier(0.4, 0, 0.2, 1)';
+        
+        // Si el deslizamiento es más del 10% del ancho, completar la transición
+        const eventInfo = eventArticle.querySelector('.event-info');
+        if (diffX > eventArticle.offsetWidth * 0.10) {
+            row.style.transform = `translateX(-${eventArticle.offsetWidth / 1.10}px)`;
+            eventArticle.classList.add('swiped');
+            // Ocultar la flecha del event-info
+            if (eventInfo) {
+                eventInfo.style.opacity = '0.5';
+            }
+        } else {
+            row.style.transform = 'translateX(0)';
+            eventArticle.classList.remove('swiped');
+            // Mostrar la flecha del event-info
+            if (eventInfo) {
+                eventInfo.style.opacity = '1';
+            }
+        }
+    }, { passive: true });
+}
+
+function updateDisplay(data, params = null) {
     const eventsContent = document.getElementById('events-content');
     if (!eventsContent) return;
 
@@ -285,69 +491,20 @@ function updateDisplay(data) {
             
             // Sort subcategories by article count (if available)
             const sortedSubcategories = (category.subcategories || []).sort((a, b) => {
-                const aCount = (a.events || []).reduce((sum, event) => sum + (event.articles || []).length, 0);
-                const bCount = (b.events || []).reduce((sum, event) => sum + (event.articles || []).length, 0);
+                const aCount = (a.events || []).reduce((sum, event) => sum + (event.article_count || 0), 0);
+                const bCount = (b.events || []).reduce((sum, event) => sum + (event.article_count || 0), 0);
                 return bCount - aCount;
             });
             
             categorySection.innerHTML = `
                 <div class="category-content">
-                    ${sortedSubcategories.map(subcategory => {
-                        // Sort events by article count
-                        const sortedEvents = (subcategory.events || []).sort((a, b) => {
-                            return (b.articles || []).length - (a.articles || []).length;
-                        });
-                        
-                        return `
-                            <div class="subcategory-section mb-4">
-                                <div class="events-container">
-                                    ${sortedEvents.map(event => {
-                                        // Sort articles by fecha_publicacion
-                                        const sortedArticles = (event.articles || []).sort((a, b) => {
-                                            return new Date(b.fecha_publicacion || 0) - new Date(a.fecha_publicacion || 0);
-                                        });
-                                        
-                                        return `
-                                            <div class="event-articles mb-4">
-                                                <div class="row">
-                                                    <div class="col-md-3">
-                                                        <div class="event-info">
-                                                            <h4 class="event-title">${event.titulo || 'Untitled Event'}</h4>
-                                                            <p class="event-description">${event.descripcion || ''}</p>
-                                                            <div class="event-meta">
-                                                                <small class="text-muted">${event.fecha_evento || ''}</small>
-                                                            </div>
-                                                        </div>
-                                                    </div>
-                                                    <div class="col-md-9">
-                                                        <div class="articles-carousel">
-                                                            <div class="carousel-wrapper">
-                                                                ${sortedArticles.map(article => `
-                                                                    <div class="article-card" data-article-id="${article.id}" data-article-url="${article.url || ''}" role="button">
-                                                                        <div class="card h-100">
-                                                                            <div class="card-body">
-                                                                                <img src="${article.periodico_logo || '/static/img/default-newspaper.svg'}" 
-                                                                                     class="newspaper-logo mb-2" alt="Newspaper logo">
-                                                                                <h5 class="card-title article-title ${article.paywall ? 'text-muted' : ''}">
-                                                                                    ${article.titular || 'No Title'}
-                                                                                </h5>
-                                                                                ${article.gpt_opinion ? `<div class="article-opinion">${article.gpt_opinion}</div>` : ''}
-                                                                                ${article.paywall ? '<span class="badge bg-secondary">Paywall</span>' : ''}
-                                                                            </div>
-                                                                        </div>
-                                                                    </div>
-                                                                `).join('')}
-                                                            </div>
-                                                        </div>
-                                                    </div>
-                                                </div>
-                                            </div>
-                                        `;
-                                    }).join('')}
-                                </div>
+                    ${sortedSubcategories.map(subcategory => `
+                        <div class="subcategory-section mb-4">
+                            <div class="events-container">
+                                ${(subcategory.events || []).map(renderEvent).join('')}
                             </div>
-                        `;
-                    }).join('')}
+                        </div>
+                    `).join('')}
                 </div>
             `;
             
@@ -357,100 +514,9 @@ function updateDisplay(data) {
         eventsContent.innerHTML = '';
         eventsContent.appendChild(fragment);
 
-        // Initialize article cards and touch events
-        document.querySelectorAll('.article-card').forEach(card => {
-            card.style.cursor = 'pointer';
-            card.classList.add('article-card-clickable');
-        });
-        
-        // Initialize mobile swipe events
-        if (window.innerWidth <= 767) {
-            document.querySelectorAll('.event-articles').forEach(eventArticle => {
-                const row = eventArticle.querySelector('.row');
-                const eventInfo = eventArticle.querySelector('.event-info');
-                let startX = 0;
-                let startY = 0;
-                let isDragging = false;
-                let isHorizontalScroll = false;
-                let initialTransform = 0;
-
-                eventArticle.addEventListener('touchstart', (e) => {
-                    if (e.target.closest('.event-info')) {
-                        startX = e.touches[0].clientX;
-                        startY = e.touches[0].clientY;
-                        isDragging = true;
-                        isHorizontalScroll = false;
-                        row.style.transition = 'none';
-                    }
-                }, { passive: true });
-
-                eventArticle.addEventListener('touchmove', (e) => {
-                    if (!isDragging || !e.target.closest('.event-info')) return;
-                    
-                    const currentX = e.touches[0].clientX;
-                    const currentY = e.touches[0].clientY;
-                    const diffX = startX - currentX;
-                    const diffY = startY - currentY;
-                    
-                    // Determine scroll direction on first significant movement
-                    if (!isHorizontalScroll && (Math.abs(diffX) > 5 || Math.abs(diffY) > 5)) {
-                        isHorizontalScroll = Math.abs(diffX) > Math.abs(diffY);
-                        if (!isHorizontalScroll) {
-                            isDragging = false;
-                            return;
-                        }
-                    }
-                    
-                    if (isHorizontalScroll) {
-                        e.preventDefault();
-                        if (diffX > 0) { // Solo permitir deslizamiento hacia la izquierda
-                            const maxTranslate = eventArticle.offsetWidth / 3;
-                            const progress = Math.min(diffX / maxTranslate, 1);
-                            const transform = progress * maxTranslate;
-                            row.style.transform = `translateX(-${transform}px)`;
-                        }
-                    }
-                }, { passive: false });
-
-                eventArticle.addEventListener('touchend', (e) => {
-                    if (!isDragging || !isHorizontalScroll) return;
-                    isDragging = false;
-                    
-                    const currentX = e.changedTouches[0].clientX;
-                    const diffX = startX - currentX;
-                    row.style.transition = 'transform 0.3s cubic-bezier(0.4, 0, 0.2, 1)';
-                    
-                    // Si el deslizamiento es más del 10% del ancho, completar la transición
-                    if (diffX > eventArticle.offsetWidth * 0.10) {
-                        row.style.transform = `translateX(-${eventArticle.offsetWidth / 1.10}px)`;
-                        eventArticle.classList.add('swiped');
-                        // Ocultar la flecha del event-info
-                        const eventInfo = eventArticle.querySelector('.event-info');
-                        if (eventInfo) {
-                            eventInfo.style.opacity = '0.5';
-                        }
-                    } else {
-                        row.style.transform = 'translateX(0)';
-                        eventArticle.classList.remove('swiped');
-                        // Mostrar la flecha del event-info
-                        const eventInfo = eventArticle.querySelector('.event-info');
-                        if (eventInfo) {
-                            eventInfo.style.opacity = '1';
-                        }
-                    }
-                }, { passive: true });
-
-                // Helper function to get current transform X value
-                function getTransformX(element) {
-                    const style = window.getComputedStyle(element);
-                    const matrix = new WebKitCSSMatrix(style.transform);
-                    return matrix.m41;
-                }
-            });
-        }
-        
-        initializeCarousels();
-        initializeScrollButtons();
+        // Events come sorted by the server; later pages are appended as the user scrolls
+        initializeEventCards(Array.from(eventsContent.querySelectorAll('.event-articles')));
+        setupLazyLoading(params, data.next_cursor);
         
     } catch (error) {
         console.error('Error updating display:', error);
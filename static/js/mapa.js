@@ -1,4 +1,7 @@
-let articleModal;
+// articleModal is declared in article_modal.js
+const articleSummaries = new Map();
+const TYPED_ARRAYS = { Int32: Int32Array, Float32: Float32Array, Uint16: Uint16Array };
+
 document.addEventListener('DOMContentLoaded', function() {
     const modalElement = document.getElementById('articleModal');
     if (modalElement) {
@@ -34,18 +37,19 @@ function loadMapData() {
         </div>
     `;
     
-    fetch(`/api/mapa-data?time_filter=${timeFilter}`)
+    fetch(`/api/mapa-data?time_filter=${timeFilter}&format=binary`)
         .then(response => {
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-            return response.json();
+            return response.arrayBuffer();
         })
+        .then(decodeMapPayload)
         .then(data => {
             if (data.error === 'no_articles') {
                 showError(data.message || 'No hay suficientes datos para generar la visualización.');
                 return;
             }
             
-            if (!data.points || data.points.length === 0) {
+            if (!data.ids || data.ids.length === 0) {
                 showError('No hay suficientes artículos con embeddings válidos para generar la visualización.');
                 return;
             }
@@ -53,7 +57,7 @@ function loadMapData() {
             // Update articles count in the UI
             const countBadge = document.querySelector('.badge.bg-info');
             if (countBadge) {
-                countBadge.textContent = `Artículos visualizados: ${data.points.length}`;
+                countBadge.textContent = `Artículos visualizados: ${data.ids.length}`;
             }
             
             createVisualization(data);
@@ -64,39 +68,86 @@ function loadMapData() {
         });
 }
 
+function decodeMapPayload(buffer) {
+    // Binary payload of mapa/formats.py: uint32 header length, JSON header, typed array columns
+    const headerLength = new DataView(buffer).getUint32(0, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+    const dataStart = 4 + headerLength;
+    (header.columns || []).forEach(([name, dtype, offset]) => {
+        header[name] = new TYPED_ARRAYS[dtype](buffer, dataStart + offset, header.n);
+    });
+    return header;
+}
+
+function fetchArticleSummary(articleId) {
+    // Titular and resumen are not in the columnar payload; fetch them once per article
+    if (!articleSummaries.has(articleId)) {
+        articleSummaries.set(articleId, fetch(`/api/article/${articleId}`)
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+                return response.json();
+            })
+            .catch(error => {
+                articleSummaries.delete(articleId);
+                throw error;
+            }));
+    }
+    return articleSummaries.get(articleId);
+}
+
+function showArticleSummary(articleId) {
+    const details = document.getElementById('map-article-details');
+    if (!details) return;
+    fetchArticleSummary(articleId)
+        .then(article => {
+            const title = document.createElement('h6');
+            title.textContent = article.titular || 'No Title';
+            const summary = document.createElement('p');
+            summary.className = 'mb-0 text-muted';
+            summary.textContent = article.gpt_resumen || '';
+            details.replaceChildren(title, summary);
+        })
+        .catch(error => console.error('Error loading article summary:', error));
+}
+
 function createVisualization(data) {
-    const { points, clusters } = data;
-    
-    // Create scatter plot for articles
-    // Group points by category
-    const categories = [...new Set(points.map(p => p.categoria || 'Sin categoría'))];
-    const traces = categories.map(cat => {
-        const catPoints = points.filter(p => (p.categoria || 'Sin categoría') === cat);
-        return {
-            name: cat,
-            x: catPoints.map(p => p.coordinates[0]),
-            y: catPoints.map(p => p.coordinates[1]),
-            mode: 'markers',
-            type: 'scatter',
-            marker: {
-                size: 8,
-                opacity: 0.7
-            },
-            text: catPoints.map(p => 
-                `<b>${p.titular}</b><br>` +
-                `<b>Periódico:</b> ${p.periodico}<br>` +
-                `<b>Categoría:</b> ${p.categoria || 'N/A'}<br>` +
-                `<b>Subcategoría:</b> ${p.subcategoria || 'N/A'}<br>` +
-                `<b>Keywords:</b> ${p.keywords || 'N/A'}<br>` +
-                `<b>Resumen:</b> ${p.resumen || 'N/A'}`
-            ),
-            hoverinfo: 'text',
-            hovertemplate: '%{text}<extra></extra>'
-        };
+    const { ids, x, y, cluster, strings, clusters } = data;
+
+    // Cluster ids are stable across refreshes, so labels stay attached to the same topic
+    const clusterLabels = new Map(clusters.map(c => [c.id, c.keyword]));
+
+    // One trace per category code; customdata keeps the article id of each point
+    const byCategory = new Map();
+    data.categoria.forEach((code, i) => {
+        if (!byCategory.has(code)) byCategory.set(code, []);
+        byCategory.get(code).push(i);
     });
+    const label = (column, i) => strings[column][data[column][i]] || 'N/A';
+
+    const traces = [...byCategory.entries()].map(([code, indices]) => ({
+        name: strings.categoria[code] || 'Sin categoría',
+        x: indices.map(i => x[i]),
+        y: indices.map(i => y[i]),
+        customdata: indices.map(i => ids[i]),
+        mode: 'markers',
+        type: 'scattergl',
+        marker: {
+            size: 8,
+            opacity: 0.7
+        },
+        text: indices.map(i =>
+            `<b>Periódico:</b> ${label('periodico', i)}<br>` +
+            `<b>Categoría:</b> ${label('categoria', i)}<br>` +
+            `<b>Subcategoría:</b> ${label('subcategoria', i)}<br>` +
+            `<b>Tema:</b> ${clusterLabels.get(cluster[i]) || 'N/A'}`
+        ),
+        hoverinfo: 'text',
+        hovertemplate: '%{text}<extra></extra>'
+    }));
 
     // Create annotations for cluster keywords
-    const annotations = clusters.map(cluster => ({
+    const annotations = [...clusters].sort((a, b) => a.id - b.id).map(cluster => ({
+        name: `cluster-${cluster.id}`,
         x: cluster.center[0],
         y: cluster.center[1],
         text: cluster.keyword,
@@ -162,13 +213,17 @@ function createVisualization(data) {
                 loadingContainer.remove();
             }
             
+            const plot = document.getElementById('tsne-plot');
+            plot.on('plotly_hover', function(data) {
+                showArticleSummary(data.points[0].customdata);
+            });
+
             // Add click handler for points
-            document.getElementById('tsne-plot').on('plotly_click', function(data) {
-                const point = data.points[0];
-                const articleData = points[point.pointIndex];
-                if (articleModal && articleData) {
+            plot.on('plotly_click', function(data) {
+                const articleId = data.points[0].customdata;
+                if (articleModal && articleId) {
                     articleModal.show();
-                    fetchArticleDetails(articleData.id);
+                    fetchArticleDetails(articleId);
                 }
             });
         })
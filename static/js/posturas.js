@@ -10,28 +10,33 @@ document.addEventListener('DOMContentLoaded', function() {
     loadDefaultCategory();
 });
 
+// Params of the listing on screen; pages of a replaced listing are ignored
+let posturasParams = null;
+
+function fetchPosturas(params) {
+    return fetch(`/api/posturas?${params}`)
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+            return response.json();
+        });
+}
+
 function loadPosturas(categoryId = null, subcategoryId = null) {
-    const posturasContent = document.getElementById('posturas-content');
     const timeFilter = document.querySelector('input[name="timeFilter"]:checked').value;
     
-    let url = '/api/posturas';
     const params = new URLSearchParams();
     
     if (categoryId) params.append('category_id', categoryId);
     if (subcategoryId) params.append('subcategory_id', subcategoryId);
     params.append('time_filter', timeFilter);
-    
-    url += `?${params.toString()}`;
+    posturasParams = params;
     
     showLoading();
     
-    fetch(url)
-        .then(response => {
-            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-            return response.json();
-        })
+    fetchPosturas(params)
         .then(data => {
-            updatePosturasDisplay(data);
+            if (params !== posturasParams) return;
+            updatePosturasDisplay(data, params);
         })
         .catch(error => {
             console.error('Error loading posturas:', error);
@@ -39,11 +44,27 @@ function loadPosturas(categoryId = null, subcategoryId = null) {
         });
 }
 
-function updatePosturasDisplay(data) {
+function loadMorePosturas(button) {
+    const params = posturasParams;
+    if (!params) return;
+    button.disabled = true;
+
+    fetchPosturas(params)
+        .then(data => {
+            if (params !== posturasParams) return;
+            appendPosturas(data, params);
+        })
+        .catch(error => {
+            console.error('Error loading posturas:', error);
+            button.disabled = false;
+        });
+}
+
+function updatePosturasDisplay(data, params) {
     const posturasContent = document.getElementById('posturas-content');
     hideLoading();
     
-    if (!Array.isArray(data) || data.length === 0) {
+    if (!data.eventos || data.eventos.length === 0) {
         posturasContent.innerHTML = `
             <div class="col-12">
                 <div class="alert alert-info">
@@ -54,7 +75,49 @@ function updatePosturasDisplay(data) {
         return;
     }
 
-    posturasContent.innerHTML = data.map(evento => `
+    posturasContent.innerHTML = `
+        <div class="posturas-list"></div>
+        <div class="text-center my-3">
+            <button type="button" class="btn btn-outline-primary posturas-more" style="display: none;">Más posturas</button>
+        </div>
+    `;
+    const moreButton = posturasContent.querySelector('.posturas-more');
+    moreButton.addEventListener('click', () => loadMorePosturas(moreButton));
+    appendPosturas(data, params);
+}
+
+function appendPosturas(data, params) {
+    const posturasContent = document.getElementById('posturas-content');
+    const list = posturasContent.querySelector('.posturas-list');
+    const moreButton = posturasContent.querySelector('.posturas-more');
+
+    const page = document.createElement('div');
+    page.innerHTML = data.eventos.map(renderEvento).join('');
+    const newEventos = Array.from(page.children);
+    newEventos.forEach(evento => list.appendChild(evento));
+
+    // Add click handlers for article links
+    newEventos.forEach(evento => evento.querySelectorAll('.article-link').forEach(button => {
+        button.addEventListener('click', function() {
+            const articleId = this.dataset.articleId;
+            if (articleModal) {
+                articleModal.show();
+            }
+            fetchArticleDetails(articleId);
+        });
+    }));
+
+    if (data.next_cursor) {
+        params.set('cursor', data.next_cursor);
+        moreButton.disabled = false;
+        moreButton.style.display = '';
+    } else {
+        moreButton.style.display = 'none';
+    }
+}
+
+function renderEvento(evento) {
+    return `
         <div class="evento-card mb-4">
             <div class="card">
                 <div class="card-header">
@@ -117,18 +180,7 @@ function updatePosturasDisplay(data) {
                 </div>
             </div>
         </div>
-    `).join('');
-
-    // Add click handlers for article links
-    document.querySelectorAll('.article-link').forEach(button => {
-        button.addEventListener('click', function() {
-            const articleId = this.dataset.articleId;
-            if (articleModal) {
-                articleModal.show();
-            }
-            fetchArticleDetails(articleId);
-        });
-    });
+    `;
 }
 
 function showLoading() {
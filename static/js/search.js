@@ -1,34 +1,107 @@
 document.addEventListener('DOMContentLoaded', function() {
     const searchInput = document.getElementById('searchInput');
     const searchButton = document.getElementById('searchButton');
-    
+    if (!searchInput || !searchButton) return;
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text || '';
+        return div.innerHTML;
+    }
+
+    function renderResult(article) {
+        return `
+            <div class="article-card search-result mb-3" data-article-id="${article.id}" data-article-url="${article.url || ''}" role="button">
+                <div class="card">
+                    <div class="card-body">
+                        <img src="${article.periodico_logo || '/static/img/default-newspaper.svg'}"
+                             class="newspaper-logo mb-2" alt="Newspaper logo">
+                        <h5 class="card-title article-title ${article.paywall ? 'text-muted' : ''}">
+                            ${escapeHtml(article.titular) || 'No Title'}
+                        </h5>
+                        ${article.gpt_resumen ? `<p class="card-text">${escapeHtml(article.gpt_resumen)}</p>` : ''}
+                        <small class="text-muted">${escapeHtml(article.periodico_nombre)} · ${article.fecha_publicacion || ''}</small>
+                        ${article.paywall ? '<span class="badge bg-secondary ms-2">Paywall</span>' : ''}
+                    </div>
+                </div>
+            </div>
+        `;
+    }
+
+    function loadSearchPage(params, resultsList, moreButton) {
+        moreButton.disabled = true;
+
+        fetch(`/api/search?${params}`)
+            .then(response => response.json().then(data => {
+                if (!response.ok) throw new Error(data.message || `HTTP error! status: ${response.status}`);
+                return data;
+            }))
+            .then(data => {
+                if (!params.has('cursor') && data.results.length === 0) {
+                    resultsList.innerHTML = '<div class="text-muted">No articles found</div>';
+                }
+                resultsList.insertAdjacentHTML('beforeend', data.results.map(renderResult).join(''));
+
+                if (data.next_cursor) {
+                    params.set('cursor', data.next_cursor);
+                    moreButton.disabled = false;
+                    moreButton.style.display = '';
+                } else {
+                    moreButton.style.display = 'none';
+                }
+            })
+            .catch(error => {
+                console.error('Error searching articles:', error);
+                resultsList.insertAdjacentHTML('beforeend',
+                    `<div class="alert alert-danger">Error en la búsqueda: ${escapeHtml(error.message)}</div>`);
+                moreButton.style.display = 'none';
+            });
+    }
+
     function performSearch() {
         const query = searchInput.value.trim();
-        const date = document.getElementById('dateSelector').value;
-        
-        document.querySelectorAll('.carousel-container').forEach(container => {
-            const categoryId = container.dataset.category;
-            let url = `/api/articles?category_id=${categoryId}&q=${encodeURIComponent(query)}`;
-            if (date) url += `&date=${date}`;
-            
-            fetch(url)
-                .then(response => response.json())
-                .then(articles => {
-                    const wrapper = container.querySelector('.carousel-wrapper');
-                    if (articles.length === 0) {
-                        wrapper.innerHTML = '<div class="text-muted">No articles found</div>';
-                    } else {
-                        loadArticles(container, categoryId, date);
-                    }
-                })
-                .catch(error => console.error('Error searching articles:', error));
-        });
+        if (!query) return;
+
+        // Pages without an events listing show the results on the index page
+        const eventsContent = document.getElementById('events-content');
+        if (!eventsContent) {
+            window.location.href = `/?q=${encodeURIComponent(query)}`;
+            return;
+        }
+
+        // Stop lazy loading of the events listing being replaced
+        if (typeof setupLazyLoading === 'function') setupLazyLoading(null);
+
+        const params = new URLSearchParams({ q: query });
+        const dateSelector = document.getElementById('dateSelector');
+        if (dateSelector && dateSelector.value) params.append('date', dateSelector.value);
+
+        eventsContent.innerHTML = `
+            <div class="search-results">
+                <h4 class="mb-3">Resultados para "${escapeHtml(query)}"</h4>
+                <div class="search-results-list"></div>
+                <div class="text-center my-3">
+                    <button type="button" class="btn btn-outline-primary search-more" style="display: none;">Más resultados</button>
+                </div>
+            </div>
+        `;
+        const resultsList = eventsContent.querySelector('.search-results-list');
+        const moreButton = eventsContent.querySelector('.search-more');
+        moreButton.addEventListener('click', () => loadSearchPage(params, resultsList, moreButton));
+        loadSearchPage(params, resultsList, moreButton);
     }
-    
+
     searchButton.addEventListener('click', performSearch);
     searchInput.addEventListener('keypress', function(e) {
         if (e.key === 'Enter') {
             performSearch();
         }
     });
+
+    // Searches submitted from other pages arrive as /?q=
+    const initialQuery = new URLSearchParams(window.location.search).get('q');
+    if (initialQuery) {
+        searchInput.value = initialQuery;
+        performSearch();
+    }
 });
@@ -0,0 +1,20 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine
+
+
+@pytest.fixture
+def pg_connection():
+    """Connection to DATABASE_URL in a transaction that is rolled back; skips without Postgres."""
+    url = os.environ.get('DATABASE_URL', '')
+    if not url.startswith('postgresql'):
+        pytest.skip('DATABASE_URL is not a PostgreSQL database')
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            yield connection
+        finally:
+            transaction.rollback()
+    engine.dispose()
@@ -0,0 +1,37 @@
+from flask import Flask
+from flask_caching import Cache
+
+from cache_backends import SQLiteLRUCache
+
+
+def make_cache(tmp_path, **config):
+    app = Flask(__name__)
+    app.config.update(CACHE_TYPE='cache_backends.SQLiteLRUCache', CACHE_DIR=str(tmp_path),
+                      CACHE_THRESHOLD=3, **config)
+    return Cache(app).cache
+
+
+def test_created_through_flask_caching(tmp_path):
+    cache = make_cache(tmp_path, CACHE_DEFAULT_TIMEOUT=60)
+    assert isinstance(cache, SQLiteLRUCache)
+    assert cache.set('api_articles:1', {'a': 1})
+    assert cache.get('api_articles:1') == {'a': 1}
+    assert cache.get('api_articles:2') is None
+    assert cache.stats() == {'api_articles': {'hits': 1, 'misses': 1}}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = SQLiteLRUCache(str(tmp_path / 'cache.sqlite3'), threshold=3)
+    for i in range(5):
+        cache.set(f'k:{i}', i)
+    cache._evict()
+    assert [cache.has(f'k:{i}') for i in range(5)] == [False, False, True, True, True]
+
+
+def test_add_and_delete(tmp_path):
+    cache = SQLiteLRUCache(str(tmp_path / 'cache.sqlite3'))
+    assert cache.add('k:1', 1)
+    assert not cache.add('k:1', 2)
+    assert cache.get('k:1') == 1
+    assert cache.delete('k:1')
+    assert not cache.has('k:1')
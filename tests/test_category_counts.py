@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from category_counts import window_days
+
+
+def test_window_days_skip_a_partial_first_day():
+    assert window_days(datetime(2024, 5, 1, 10, 5), datetime(2024, 5, 3, 10, 5)) == \
+        (datetime(2024, 5, 2).date(), datetime(2024, 5, 3).date())
+
+
+def test_window_days_keep_a_first_day_starting_at_midnight():
+    assert window_days(datetime(2024, 5, 1), datetime(2024, 5, 3, 10, 5)) == \
+        (datetime(2024, 5, 1).date(), datetime(2024, 5, 3).date())
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from mapa.clustering import _stable_ids, cluster_embeddings, cluster_labels, keyword_counts, keyword_tokens
+
+pytest.importorskip('scipy')
+
+
+def test_stable_ids_follow_the_closest_previous_centroid():
+    previous = {'centroids': np.array([[0, 0], [10, 0], [0, 10]], dtype=np.float32),
+                'cluster_ids': np.array([7, 3, 5])}
+    centroids = np.array([[0.5, 9.5], [0.2, 0.1], [9.8, 0.3]], dtype=np.float32)
+    assert _stable_ids(centroids, previous).tolist() == [5, 7, 3]
+
+
+def test_stable_ids_give_new_clusters_fresh_ids():
+    previous = {'centroids': np.array([[0, 0], [10, 0]], dtype=np.float32), 'cluster_ids': np.array([4, 9])}
+    centroids = np.array([[10, 1], [50, 50], [0, 1]], dtype=np.float32)
+    assert _stable_ids(centroids, previous).tolist() == [9, 10, 4]
+
+
+def test_stable_ids_without_previous_state():
+    centroids = np.zeros((3, 2), dtype=np.float32)
+    assert _stable_ids(centroids, None).tolist() == [0, 1, 2]
+    mismatched = {'centroids': np.zeros((3, 4), dtype=np.float32), 'cluster_ids': np.array([5, 6, 7])}
+    assert _stable_ids(centroids, mismatched).tolist() == [0, 1, 2]
+
+
+def test_cluster_ids_survive_a_refit():
+    pytest.importorskip('sklearn')
+    rng = np.random.default_rng(0)
+    centres = np.eye(4, 8, dtype=np.float32) * 10
+    embeddings = np.vstack([centre + rng.normal(0, 0.1, (20, 8)) for centre in centres]).astype(np.float32)
+    labels, state = cluster_embeddings(embeddings, n_clusters=4)
+    refit, _ = cluster_embeddings(embeddings[::-1], previous=state, n_clusters=4)
+    assert refit[::-1].tolist() == labels.tolist()
+
+
+def test_keyword_tokens_are_normalised():
+    assert keyword_tokens(' Gobierno ,elecciones,,  Banco   Central ') == ['gobierno', 'elecciones', 'banco central']
+    assert keyword_tokens(None) == []
+
+
+def test_cluster_labels_are_unique():
+    counts = keyword_counts(
+        ['gobierno, elecciones', 'Gobierno,elecciones', 'gobierno', 'gobierno, economía', 'gobierno', None],
+        [0, 0, 0, 1, 1, 2]
+    )
+    assert cluster_labels(counts) == {0: 'gobierno', 1: 'economía'}
+
+
+def test_cluster_labels_repeat_when_every_keyword_is_taken():
+    counts = keyword_counts(['gobierno', 'gobierno', 'gobierno'], [0, 0, 1])
+    assert cluster_labels(counts) == {0: 'gobierno', 1: 'gobierno'}
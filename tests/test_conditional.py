@@ -0,0 +1,91 @@
+from datetime import datetime
+
+import pytest
+from flask import Flask, jsonify
+
+from app import conditional_endpoint
+from database import db
+
+LAST_MODIFIED = datetime(2024, 5, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config['API_MAX_AGE'] = {'items': 60}
+    calls = []
+    version = {'value': ('v1', LAST_MODIFIED)}
+
+    @app.route('/items')
+    @conditional_endpoint('items', lambda **kwargs: version['value'])
+    def items():
+        calls.append(1)
+        return jsonify({'items': [1, 2]})
+
+    client = app.test_client()
+    client.calls = calls
+    client.version = version
+    return client
+
+
+def test_response_carries_validators(client):
+    response = client.get('/items?b=2&a=1')
+    assert response.status_code == 200
+    assert response.headers['ETag'].startswith('W/"')
+    assert response.last_modified == LAST_MODIFIED.replace(tzinfo=response.last_modified.tzinfo)
+    assert response.cache_control.max_age == 60
+    # Query string order doesn't change the ETag
+    assert client.get('/items?a=1&b=2').headers['ETag'] == response.headers['ETag']
+
+
+def test_if_none_match_gets_304_without_running_the_view(client):
+    etag = client.get('/items').headers['ETag']
+    response = client.get('/items', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert len(client.calls) == 1
+
+
+def test_new_version_changes_the_etag(client):
+    etag = client.get('/items').headers['ETag']
+    client.version['value'] = ('v2', LAST_MODIFIED)
+    response = client.get('/items', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_if_modified_since(client):
+    assert client.get('/items', headers={'If-Modified-Since': 'Wed, 01 May 2024 12:00:00 GMT'}).status_code == 304
+    assert client.get('/items', headers={'If-Modified-Since': 'Wed, 01 May 2024 11:59:59 GMT'}).status_code == 200
+
+
+def test_if_none_match_wins_over_if_modified_since(client):
+    response = client.get('/items', headers={'If-None-Match': 'W/"other"',
+                                             'If-Modified-Since': 'Wed, 01 May 2024 12:00:00 GMT'})
+    assert response.status_code == 200
+
+
+def test_version_errors_fall_through_to_the_view():
+    def broken(**kwargs):
+        raise RuntimeError('database is down')
+
+    app = Flask(__name__)
+    app.config.update(API_MAX_AGE={}, SQLALCHEMY_DATABASE_URI='sqlite://')
+    db.init_app(app)
+
+    @app.route('/items')
+    @conditional_endpoint('items', broken)
+    def items():
+        return jsonify({'error': 'Internal server error'}), 500
+
+    response = app.test_client().get('/items')
+    assert response.status_code == 500
+    assert response.get_json() == {'error': 'Internal server error'}
+    assert 'ETag' not in response.headers
+
+
+def test_no_version_skips_validation(client):
+    client.version['value'] = None
+    response = client.get('/items', headers={'If-None-Match': '*'})
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
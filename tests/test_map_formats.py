@@ -0,0 +1,78 @@
+import gzip
+import json
+import struct
+
+import numpy as np
+
+from mapa.formats import encode_binary, encode_columnar, encode_json, gunzip_chunks, to_binary
+
+TYPED_ARRAYS = {'Int32': '<i4', 'Float32': '<f4', 'Uint16': '<u2'}
+
+
+def sample_payload():
+    points = [
+        {'id': 1, 'coordinates': [0.12345, -1.5], 'titular': 'Uno', 'resumen': None, 'keywords': 'a,b',
+         'categoria': 'Política', 'subcategoria': 'Elecciones', 'periodico': 'El País', 'cluster': 0},
+        {'id': 2, 'coordinates': [2.0, 3.25], 'titular': 'Dos', 'resumen': 'r', 'keywords': None,
+         'categoria': 'Economía', 'subcategoria': None, 'periodico': 'El País', 'cluster': 3},
+        {'id': 3, 'coordinates': [-4.5, 0.0], 'titular': 'Tres', 'resumen': 'r', 'keywords': 'c',
+         'categoria': 'Política', 'subcategoria': 'Elecciones', 'periodico': 'ABC', 'cluster': 0},
+    ]
+    return {'points': points, 'clusters': [{'id': 0, 'center': [0.0, 0.0], 'keyword': 'a'}]}
+
+
+def read_binary(payload):
+    """Decode the binary format the way mapa.js does."""
+    (header_length,) = struct.unpack_from('<I', payload)
+    header = json.loads(payload[4:4 + header_length])
+    data = payload[4 + header_length:]
+    columns = {}
+    for name, dtype, offset in header.get('columns', []):
+        assert offset % 4 == 0
+        columns[name] = np.frombuffer(data, dtype=TYPED_ARRAYS[dtype], count=header['n'], offset=offset)
+    return header, columns
+
+
+def test_json_round_trip():
+    data = sample_payload()
+    assert json.loads(gzip.decompress(encode_json(data))) == data
+
+
+def test_columnar_round_trip():
+    data = sample_payload()
+    columnar = json.loads(gzip.decompress(encode_columnar(data)))
+    assert columnar['ids'] == [1, 2, 3]
+    assert columnar['x'] == [0.123, 2.0, -4.5]
+    assert columnar['cluster'] == [0, 3, 0]
+    for column in ('categoria', 'subcategoria', 'periodico'):
+        names = columnar['strings'][column]
+        assert [names[code] for code in columnar[column]] == [p[column] for p in data['points']]
+    assert columnar['clusters'] == data['clusters']
+
+
+def test_binary_round_trip():
+    data = sample_payload()
+    header, columns = read_binary(gzip.decompress(encode_binary(data)))
+    assert header['n'] == 3
+    assert columns['ids'].tolist() == [1, 2, 3]
+    assert columns['cluster'].tolist() == [0, 3, 0]
+    assert np.allclose(columns['y'], [-1.5, 3.25, 0.0])
+    names = header['strings']['periodico']
+    assert [names[code] for code in columns['periodico']] == ['El País', 'El País', 'ABC']
+    assert header['clusters'] == data['clusters']
+
+
+def test_binary_error_payload_is_a_header_without_columns():
+    header, columns = read_binary(to_binary({'error': 'no_articles', 'message': 'x'}))
+    assert header['error'] == 'no_articles'
+    assert columns == {}
+
+
+def test_error_payloads_pass_through():
+    error = {'error': 'no_articles', 'message': 'x'}
+    assert json.loads(gzip.decompress(encode_columnar(error))) == error
+
+
+def test_gunzip_chunks():
+    raw = bytes(range(256)) * 1000
+    assert b''.join(gunzip_chunks(gzip.compress(raw))) == raw
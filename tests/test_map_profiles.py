@@ -0,0 +1,49 @@
+import os
+
+import pytest
+from flask_login import UserMixin
+
+from app import create_app, login_manager
+
+
+class FakeUser(UserMixin):
+    def __init__(self, is_admin):
+        self.id = 1
+        self.is_admin = is_admin
+
+
+@pytest.fixture
+def app(tmp_path):
+    if not os.environ.get('DATABASE_URL', '').startswith('postgresql'):
+        pytest.skip('DATABASE_URL is not a PostgreSQL database')
+    app = create_app()
+    app.config['MAP_PROFILE_DIR'] = str(tmp_path)
+    return app
+
+
+def logged_in(app, monkeypatch, is_admin):
+    monkeypatch.setattr(login_manager, '_user_callback', lambda user_id: FakeUser(is_admin))
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+    return client
+
+
+def test_admin_post_runs_a_profiled_build(app, monkeypatch, tmp_path):
+    client = logged_in(app, monkeypatch, is_admin=True)
+    response = client.post('/admin/map-profiles?time_filter=24h')
+    assert response.status_code == 200
+    summary = response.get_json()
+    assert summary['time_filter'] == '24h'
+    assert 'fetch' in summary['stages']
+    assert (tmp_path / f"{summary['name']}.prof").exists()
+
+    listed = client.get('/admin/map-profiles').get_json()['profiles']
+    assert [profile['name'] for profile in listed] == [summary['name']]
+
+
+def test_only_admins_can_profile(app, monkeypatch):
+    client = logged_in(app, monkeypatch, is_admin=False)
+    assert client.post('/admin/map-profiles').status_code == 403
+    assert app.test_client().post('/admin/map-profiles').status_code in (302, 401)
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, desc, insert, select
+
+from pagination import decode_cursor, encode_cursor, keyset_after, page_limit
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor([0.25, '2024-05-01', 42])
+    assert decode_cursor(cursor, 3) == [0.25, '2024-05-01', 42]
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', encode_cursor({'a': 1}), encode_cursor([1]), 'W251bGw'])
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+def test_page_limit():
+    assert page_limit(None, 20, 100) == 20
+    assert page_limit(0, 20, 100) == 1
+    assert page_limit(500, 20, 100) == 100
+
+
+def test_keyset_pages_cover_every_row_once():
+    metadata = MetaData()
+    rows = Table('rows', metadata, Column('id', Integer, primary_key=True), Column('score', Integer))
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(rows), [{'id': i, 'score': i % 3} for i in range(1, 11)])
+
+        sort_keys = [(rows.c.score, True), (rows.c.id, False)]
+        query = select(rows.c.score, rows.c.id).order_by(desc(rows.c.score), rows.c.id)
+        seen, cursor = [], None
+        while True:
+            page_query = query
+            if cursor:
+                page_query = page_query.where(keyset_after(sort_keys, decode_cursor(cursor, 2)))
+            page = connection.execute(page_query.limit(3)).all()
+            if not page:
+                break
+            seen.extend(row.id for row in page)
+            cursor = encode_cursor(list(page[-1]))
+
+        assert seen == [row.id for row in connection.execute(query)]
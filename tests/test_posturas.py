@@ -0,0 +1,67 @@
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import func, insert, select
+
+from models import Evento
+from posturas import normalize_posturas, parse_posturas
+
+POSTURA = {'postura': 'A favor', 'articulos_ids_conjunto_1': ['1', 2, 'x'], 'articulos_ids_conjunto_2': 3}
+
+
+def test_parse_valid_json():
+    assert parse_posturas(json.dumps([POSTURA])) == [
+        {'postura': 'A favor', 'articulos_ids_conjunto_1': [1, 2], 'articulos_ids_conjunto_2': [3]}
+    ]
+
+
+def test_parse_single_object_and_doubly_encoded():
+    assert parse_posturas(json.dumps({'postura': 'x'})) == [{'postura': 'x'}]
+    assert parse_posturas(json.dumps(json.dumps([{'postura': 'x'}]))) == [{'postura': 'x'}]
+
+
+def test_parse_repairs_escaped_quotes():
+    raw = '"[{\\"postura\\": \\"x\\"}]"'
+    assert parse_posturas(raw) == [{'postura': 'x'}]
+
+
+def test_parse_skips_items_that_are_not_objects():
+    assert parse_posturas('[1, "a", {"postura": "x"}]') == [{'postura': 'x'}]
+
+
+@pytest.mark.parametrize('raw', ['', 'null', '[]', '[1, 2]', 'true', '"texto"', '[{"postura": ', '\\'])
+def test_parse_malformed_raises_value_error(raw):
+    with pytest.raises(ValueError):
+        parse_posturas(raw)
+
+
+def test_normalize_posturas(pg_connection):
+    table = Evento.__table__
+    rows = {
+        'valid': json.dumps([POSTURA]),
+        'broken': '[{"postura": ',
+    }
+    next_id = pg_connection.execute(select(func.coalesce(func.max(table.c.evento_id), 0))).scalar() + 1
+    ids = {}
+    for offset, (name, raw) in enumerate(rows.items()):
+        ids[name] = next_id + offset
+        pg_connection.execute(insert(table).values(
+            evento_id=ids[name], titulo=f'test {name}', fecha_evento=date(2000, 1, 2), gpt_desinformacion=raw
+        ))
+
+    parsed, failed, days = normalize_posturas(pg_connection)
+    assert parsed >= 1 and failed >= 1
+    assert date(2000, 1, 2) in days
+
+    stored = dict(pg_connection.execute(
+        select(table.c.evento_id, table.c.posturas).where(table.c.evento_id.in_(ids.values()))
+    ).all())
+    assert stored[ids['valid']][0]['articulos_ids_conjunto_1'] == [1, 2]
+    assert stored[ids['broken']] is None
+
+    # Events whose string was removed lose their posturas
+    pg_connection.execute(table.update().where(table.c.evento_id == ids['valid']).values(gpt_desinformacion=None))
+    parsed, failed, days = normalize_posturas(pg_connection)
+    assert date(2000, 1, 2) in days
+    assert pg_connection.execute(select(table.c.posturas).where(table.c.evento_id == ids['valid'])).scalar() is None
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from time_window import current_bucket, parse_time_filter, time_window
+
+CONFIG = {'TIME_FILTERS': ['24h', '48h', '72h'], 'TIME_BUCKET_SECONDS': 300}
+
+
+def test_parse_time_filter():
+    assert parse_time_filter('48h', CONFIG['TIME_FILTERS']) == 48
+    with pytest.raises(ValueError):
+        parse_time_filter('12h', CONFIG['TIME_FILTERS'])
+
+
+def test_requests_in_the_same_bucket_get_the_same_window():
+    first = time_window('24h', CONFIG, now=datetime(2024, 5, 1, 10, 0, 1))
+    last = time_window('24h', CONFIG, now=datetime(2024, 5, 1, 10, 4, 59))
+    assert first == last
+    assert first.end == datetime(2024, 5, 1, 10, 5)
+    assert first.start == first.end - timedelta(hours=24)
+
+
+def test_window_ends_at_the_next_bucket_boundary():
+    now = datetime(2024, 5, 1, 10, 5)
+    window = time_window('72h', CONFIG, now=now)
+    assert window.bucket == current_bucket(CONFIG, now)
+    assert window.end == datetime(2024, 5, 1, 10, 10)
+    assert time_window('72h', CONFIG, now=now - timedelta(seconds=1)).bucket == window.bucket - 1
+
@@ -0,0 +1,45 @@
+"""Time windows for the ?time_filter= parameter ('24h', '48h', '72h').
+
+Windows used to end at datetime.now(), so no two requests ever produced the
+same query parameters or cache key. They now end at the next boundary of a
+TIME_BUCKET_SECONDS bucket (5 minutes by default): every request within the
+same bucket gets exactly the same (start, end), and the bucket number can be
+used in cache keys and ETags.
+
+The end is rounded up rather than down so articles published in the current
+bucket are still included.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app, request
+
+DEFAULT_TIME_FILTER = '72h'
+
+TimeWindow = namedtuple('TimeWindow', ['time_filter', 'start', 'end', 'bucket'])
+
+
+def parse_time_filter(time_filter, allowed):
+    """Hours of a time filter such as '72h'; ValueError if it is not in `allowed`."""
+    if time_filter not in allowed:
+        raise ValueError(f"Unknown time filter: {time_filter}, expected one of {', '.join(allowed)}")
+    return int(time_filter[:-1])
+
+
+def current_bucket(config, now=None):
+    """Number of the bucket `now` falls in."""
+    now = now or datetime.now()
+    return int(now.timestamp()) // config['TIME_BUCKET_SECONDS']
+
+
+def time_window(time_filter, config, now=None):
+    """TimeWindow for `time_filter`, ending at the end of the current bucket."""
+    hours = parse_time_filter(time_filter, config['TIME_FILTERS'])
+    bucket = current_bucket(config, now)
+    end_date = datetime.fromtimestamp((bucket + 1) * config['TIME_BUCKET_SECONDS'])
+    return TimeWindow(time_filter, end_date - timedelta(hours=hours), end_date, bucket)
+
+
+def request_time_window(default=DEFAULT_TIME_FILTER):
+    """TimeWindow for the current request's ?time_filter=; ValueError if it is invalid."""
+    return time_window(request.args.get('time_filter', default), current_app.config)
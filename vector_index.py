@@ -0,0 +1,302 @@
+"""Approximate nearest-neighbour index over Articulo.embeddings.
+
+An IVF-Flat index in plain numpy: L2-normalised float32 vectors (so the dot
+product is the cosine similarity) are assigned to about sqrt(n) k-means
+lists, stored grouped by list, and a query only scans the
+VECTOR_INDEX_NPROBE lists whose centroids are closest to it. Articles that
+arrived since the lists were built go to a small delta segment that is
+scanned in full; VectorIndexWriter.refresh() appends to it every few minutes and
+re-clusters everything once the delta grows past a fraction of the base.
+
+Files under VECTOR_INDEX_DIR are written by map_builder.py and memory-mapped
+by the web workers, so all workers share one copy in the page cache:
+
+    base-<version>/{centroids,vectors,ids,offsets}.npy
+    delta-<version>-{vectors,ids}.npy
+    CURRENT    JSON manifest naming the live base and delta, swapped atomically
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from database import db
+from embeddings import EMBEDDING_DTYPE, add_articulo_embedding, row_embedding
+from mapa.reducers import l2_normalize
+from models import Articulo
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'CURRENT'
+MAX_LISTS = 4096
+KMEANS_SAMPLE = 50000
+REBUILD_FRACTION = 0.2
+MIN_REBUILD_DELTA = 1000
+
+
+def _number_of_lists(n):
+    return int(max(1, min(MAX_LISTS, round(np.sqrt(n)))))
+
+
+def fetch_article_vectors(config, updated_after=None):
+    """(ids, vectors, latest updated_on) of all article embeddings, or of those updated after a timestamp."""
+    query = db.session.query(Articulo.articulo_id, Articulo.updated_on).filter(
+        Articulo.embeddings.isnot(None)
+    )
+    if updated_after is not None:
+        query = query.filter(Articulo.updated_on > updated_after)
+    rows = add_articulo_embedding(query, 'embeddings', config['EMBEDDING_STORAGE']).all()
+
+    ids, vectors, latest = [], [], updated_after
+    for row in rows:
+        vector = row_embedding(row.embedding_bin, row.embedding_text)
+        if vector.size:
+            ids.append(row.articulo_id)
+            vectors.append(vector)
+        if row.updated_on and (latest is None or row.updated_on > latest):
+            latest = row.updated_on
+    return ids, vectors, latest
+
+
+def _matrix(vectors, dim):
+    """Normalised matrix of the vectors of length `dim` (others are skipped) and their mask."""
+    keep = np.array([len(v) == dim for v in vectors], dtype=bool)
+    if not keep.any():
+        return np.zeros((0, dim), dtype=EMBEDDING_DTYPE), keep
+    return l2_normalize(np.vstack([v for v, k in zip(vectors, keep) if k])), keep
+
+
+class VectorIndexWriter:
+    """Builds and refreshes the index files (used by map_builder.py)."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _manifest(self):
+        try:
+            with open(os.path.join(self.root, MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _save(self, name, array):
+        path = os.path.join(self.root, name)
+        np.save(f'{path}.tmp.npy', array)
+        os.replace(f'{path}.tmp.npy', path)
+
+    def _publish(self, manifest):
+        path = os.path.join(self.root, MANIFEST)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(f'{path}.tmp', path)
+
+    def _prune(self, manifest, previous):
+        # Keep the live files and the previous ones, which workers may still be loading
+        keep = {manifest['base'], f"delta-{manifest['delta']}-vectors.npy", f"delta-{manifest['delta']}-ids.npy"}
+        if previous:
+            keep |= {previous['base'], f"delta-{previous['delta']}-vectors.npy", f"delta-{previous['delta']}-ids.npy"}
+        for name in os.listdir(self.root):
+            if name == MANIFEST or name in keep or '.tmp' in name:
+                continue
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+    def build(self, config):
+        """Cluster every article embedding into a new base segment with an empty delta."""
+        os.makedirs(self.root, exist_ok=True)
+        previous = self._manifest()
+        ids, vectors, synced_until = fetch_article_vectors(config)
+        if not vectors:
+            logger.warning("No hay embeddings de artículos para el índice vectorial")
+            return None
+
+        dim = int(np.bincount([len(v) for v in vectors]).argmax())
+        matrix, keep = _matrix(vectors, dim)
+        ids = np.asarray(ids, dtype=np.int64)[keep]
+
+        # Only the writer (map_builder.py) clusters; web workers never load sklearn
+        from sklearn.cluster import MiniBatchKMeans
+
+        n_lists = min(_number_of_lists(len(matrix)), len(matrix))
+        sample = matrix
+        if len(matrix) > KMEANS_SAMPLE:
+            sample = matrix[np.random.default_rng(42).choice(len(matrix), KMEANS_SAMPLE, replace=False)]
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, n_init=3, batch_size=1024, random_state=42).fit(sample)
+        centroids = l2_normalize(kmeans.cluster_centers_)
+        lists = np.argmax(matrix @ centroids.T, axis=1)
+
+        # Rows grouped by inverted list; list l is rows offsets[l]:offsets[l + 1]
+        order = np.argsort(lists, kind='stable')
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(lists, minlength=n_lists))
+
+        version = str(int(time.time() * 1000))
+        base = f'base-{version}'
+        os.makedirs(os.path.join(self.root, base))
+        self._save(os.path.join(base, 'centroids.npy'), centroids.astype(EMBEDDING_DTYPE))
+        self._save(os.path.join(base, 'vectors.npy'), matrix[order])
+        self._save(os.path.join(base, 'ids.npy'), ids[order])
+        self._save(os.path.join(base, 'offsets.npy'), offsets)
+        self._save(f'delta-{version}-vectors.npy', np.zeros((0, dim), dtype=EMBEDDING_DTYPE))
+        self._save(f'delta-{version}-ids.npy', np.zeros(0, dtype=np.int64))
+
+        manifest = {
+            'base': base,
+            'delta': version,
+            'dim': dim,
+            'n_base': int(len(ids)),
+            'n_delta': 0,
+            'synced_until': synced_until.isoformat() if synced_until else None,
+            'built_on': datetime.now().isoformat()
+        }
+        self._publish(manifest)
+        self._prune(manifest, previous)
+        logger.info(f"Índice vectorial construido: {len(ids)} artículos en {n_lists} listas")
+        return manifest
+
+    def refresh(self, config):
+        """Append articles updated since the last refresh to the delta, rebuilding when it grows too big."""
+        manifest = self._manifest()
+        if manifest is None or not manifest.get('synced_until'):
+            return self.build(config)
+
+        synced_until = datetime.fromisoformat(manifest['synced_until'])
+        new_ids, vectors, latest = fetch_article_vectors(config, updated_after=synced_until)
+        if not new_ids:
+            return manifest
+
+        matrix, keep = _matrix(vectors, manifest['dim'])
+        new_ids = np.asarray(new_ids, dtype=np.int64)[keep]
+        delta_ids = np.load(os.path.join(self.root, f"delta-{manifest['delta']}-ids.npy"))
+        delta_vectors = np.load(os.path.join(self.root, f"delta-{manifest['delta']}-vectors.npy"))
+
+        # Updated articles replace their previous delta row
+        stale = np.isin(delta_ids, new_ids)
+        delta_ids = np.concatenate([delta_ids[~stale], new_ids])
+        delta_vectors = np.vstack([delta_vectors[~stale], matrix])
+
+        if len(delta_ids) > max(MIN_REBUILD_DELTA, REBUILD_FRACTION * manifest['n_base']):
+            return self.build(config)
+
+        previous = dict(manifest)
+        version = str(int(time.time() * 1000))
+        self._save(f'delta-{version}-vectors.npy', delta_vectors)
+        self._save(f'delta-{version}-ids.npy', delta_ids)
+        manifest.update(delta=version, n_delta=int(len(delta_ids)), synced_until=latest.isoformat())
+        self._publish(manifest)
+        self._prune(manifest, previous)
+        logger.info(f"Índice vectorial actualizado: {len(new_ids)} artículos nuevos, delta de {len(delta_ids)}")
+        return manifest
+
+
+class VectorIndex:
+    """Read side of the index, memory-mapped and reloaded when CURRENT changes."""
+
+    def __init__(self, root, nprobe=8):
+        self.root = root
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        self._segments = None
+
+    def _load(self):
+        path = os.path.join(self.root, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime == self._loaded_mtime:
+            return self._segments
+
+        with self._lock:
+            if mtime != self._loaded_mtime:
+                with open(path) as f:
+                    manifest = json.load(f)
+                base = os.path.join(self.root, manifest['base'])
+
+                def load(name):
+                    return np.load(name, mmap_mode='r')
+
+                base_ids = load(os.path.join(base, 'ids.npy'))
+                delta_ids = np.load(os.path.join(self.root, f"delta-{manifest['delta']}-ids.npy"))
+                self._segments = {
+                    'manifest': manifest,
+                    'centroids': np.load(os.path.join(base, 'centroids.npy')),
+                    'vectors': load(os.path.join(base, 'vectors.npy')),
+                    'ids': base_ids,
+                    'offsets': np.load(os.path.join(base, 'offsets.npy')),
+                    'id_order': np.argsort(base_ids),
+                    'delta_vectors': np.load(os.path.join(self.root, f"delta-{manifest['delta']}-vectors.npy")),
+                    'delta_ids': delta_ids,
+                    # Base rows superseded by a newer copy in the delta
+                    'superseded': set(delta_ids[np.isin(delta_ids, base_ids)].tolist())
+                }
+                self._loaded_mtime = mtime
+        return self._segments
+
+    def ready(self):
+        return self._load() is not None
+
+    def version(self):
+        """Version of the live base and delta, or None if there is no index yet."""
+        segments = self._load()
+        if segments is None:
+            return None
+        return f"{segments['manifest']['base']}:{segments['manifest']['delta']}"
+
+    def vector(self, article_id):
+        """Normalised vector of an indexed article, or None."""
+        segments = self._load()
+        if segments is None:
+            return None
+        match = np.flatnonzero(segments['delta_ids'] == article_id)
+        if len(match):
+            return np.asarray(segments['delta_vectors'][match[0]])
+        ids, order = segments['ids'], segments['id_order']
+        position = np.searchsorted(ids, article_id, sorter=order)
+        if position < len(order) and ids[order[position]] == article_id:
+            return np.asarray(segments['vectors'][order[position]])
+        return None
+
+    def search(self, vector, k=10, exclude=()):
+        """[(articulo_id, cosine similarity)] of the k nearest indexed articles."""
+        segments = self._load()
+        if segments is None:
+            return []
+        query = l2_normalize(np.asarray(vector, dtype=EMBEDDING_DTYPE).reshape(1, -1))[0]
+        if len(query) != segments['manifest']['dim']:
+            return []
+
+        # Scan the nprobe closest inverted lists plus the whole delta
+        offsets = segments['offsets']
+        probes = np.argsort(segments['centroids'] @ query)[::-1][:self.nprobe]
+        id_parts, score_parts = [segments['delta_ids']], [segments['delta_vectors'] @ query]
+        for l in probes:
+            start, end = offsets[l], offsets[l + 1]
+            if end > start:
+                id_parts.append(segments['ids'][start:end])
+                score_parts.append(segments['vectors'][start:end] @ query)
+        ids = np.concatenate(id_parts)
+        scores = np.concatenate(score_parts)
+
+        n_delta = len(segments['delta_ids'])
+        skip = set(exclude) | segments['superseded']
+        if skip:
+            mask = ~np.isin(ids, list(skip))
+            mask[:n_delta] = ~np.isin(ids[:n_delta], list(exclude))
+            ids, scores = ids[mask], scores[mask]
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]